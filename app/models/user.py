@@ -1,5 +1,9 @@
+import os
 from flask_login import UserMixin
 
+# Usernames allowed on the admin routes, comma-separated
+ADMIN_USERS = frozenset(name.strip() for name in os.environ.get('ADMIN_USERS', '').split(',') if name.strip())
+
 class User(UserMixin):
     def __init__(self, id, username, email, password):
         self.id = id
@@ -9,3 +13,7 @@ class User(UserMixin):
 
     def get_id(self):
         return str(self.id)
+
+    @property
+    def is_admin(self):
+        return self.username in ADMIN_USERS
@@ -1,14 +1,26 @@
-from flask import Blueprint, render_template, request, jsonify, send_file, current_app
+from flask import Blueprint, Response, render_template, request, jsonify, send_file, current_app, session
 from werkzeug.utils import secure_filename
 import os
 import re
 from app.utils.logging import initialize_logging
-from app.utils.data_manager import get_best_response, add_response, rate_response, initialize_data
+from app.utils.data_manager import RETRIEVAL_METHODS, get_best_response, get_best_responses, index_session_documents, add_response, rate_response, initialize_data
 from app.utils.pdf_generator import export_conversations
 from app.utils.image_processing import extract_text
+from app.utils.pdf_processing import process_pdf
+from app.utils.uploads import open_upload
+from app.utils.passages import detect_questions, split_document
 from flask_login import login_required, current_user
-from app.utils.history import get_conversations
+from app.utils.history import get_conversations, save_conversation
+from app.utils.extraction_cache import get_extraction_cache
+from app.utils.ocr_service import get_ocr_service
+from app.utils.session_index import get_session_id, get_session_index
+from app.utils.voice import AUDIO_RETRY_AFTER, generate_audio_async, get_audio_store, wait_for_audio
+from app.utils.web_search import get_web_response, get_provider_stats
 from app.utils.evaluate_model import cross_validate_model
+from app.utils.db import get_user_db
+from app.utils.metrics import METRICS_ENABLED, stage, count, get_metrics, metrics_access_allowed
+from app.utils.profiling import get_profile_store, PROFILE_ID_RE
+from app.routes.auth import admin_required
 logger = initialize_logging()
 api = Blueprint('api', __name__)
 supported_langs = ['fr', 'en', 'ar']
@@ -31,86 +43,133 @@ def chat_handler():
     try:
         pdf = request.files.get('pdf_file')
         image = request.files.get('image_file')
-        uploaded_files = []
-        extracted_text = ""
+        documents = []  # (filename, extracted text) of each upload
+        questions = []
+        pdf_pages = []
+        tts_enabled = request.form.get('tts', 'false').lower() == 'true'
+        output_lang = request.form.get('output_lang')
+        method = request.form.get('method', 'knn')
+        if output_lang and output_lang not in supported_langs:
+            return jsonify({'error': f"Unsupported language. Choose from {supported_langs}"}), 400
+        if method not in RETRIEVAL_METHODS:
+            return jsonify({'error': f"Unsupported method. Choose from {list(RETRIEVAL_METHODS)}"}), 400
         
-        # Ensure UPLOAD_FOLDER exists
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        try:
-            os.makedirs(upload_folder, exist_ok=True)
-        except Exception as e:
-            logger.error(f"Failed to create UPLOAD_FOLDER {upload_folder}: {e}")
-            return jsonify({'error': 'Failed to create upload directory'}), 500
-        
-        # Process PDF
+        # Process PDF (in memory, never written to UPLOAD_FOLDER)
         if pdf and pdf.filename:
-            logger.debug(f"Processing PDF: {pdf.filename}")
+            logger.debug("Processing PDF: %s", pdf.filename)
             if not pdf.filename.endswith('.pdf') or pdf.content_type != 'application/pdf':
                 return jsonify({'error': 'Invalid PDF file'}), 400
-            pdf.seek(0, os.SEEK_END)
-            if pdf.tell() > current_app.config['MAX_CONTENT_LENGTH']:
-                return jsonify({'error': 'PDF file too large (max 5 MB)'}), 400
-            pdf.seek(0)
             filename = secure_filename(pdf.filename)
             if not re.match(r'^[\w\-. ]+\.pdf$', filename):
                 return jsonify({'error': 'Invalid PDF filename'}), 400
-            pdf_path = os.path.join(upload_folder, filename)
-            pdf.save(pdf_path)
-            uploaded_files.append(pdf_path)
+            with open_upload(pdf) as data:
+                if len(data) > current_app.config['MAX_CONTENT_LENGTH']:
+                    return jsonify({'error': 'PDF file too large (max 5 MB)'}), 400
+                with stage('pdf_extraction'):
+                    extracted_text, questions, pdf_pages = process_pdf(data, with_report=True, filename=filename)
+            logger.info("Text extracted from PDF %s: %d characters", filename, len(extracted_text))
+            if extracted_text.startswith("Erreur") or extracted_text == "Aucun texte détecté dans le PDF.":
+                logger.warning(f"Failed to extract text from PDF: {extracted_text}")
+                return jsonify({'error': extracted_text, 'extracted_text': extracted_text, 'questions': questions, 'pdf_pages': pdf_pages}), 400
+            documents.append((filename, extracted_text))
         
-        # Process image
+        # Process image (in memory, never written to UPLOAD_FOLDER)
         if image:
-            logger.debug(f"Processing image: {image.filename}")
+            logger.debug("Processing image: %s", image.filename)
             if image.content_type not in ['image/png', 'image/jpeg']:
                 logger.error(f"Invalid image file: {image.filename}")
                 return jsonify({'error': 'Invalid image file (PNG/JPEG required)'}), 400
-            image.seek(0, os.SEEK_END)
-            if image.tell() > current_app.config['MAX_CONTENT_LENGTH']:
-                logger.error(f"Image file too large: {image.filename}")
-                return jsonify({'error': 'Image file too large (max 5 MB)'}), 400
-            image.seek(0)
             filename = secure_filename(image.filename)
             if not re.match(r'^[\w\-. ]+\.(png|jpg|jpeg)$', filename):
                 return jsonify({'error': 'Invalid image filename'}), 400
-            image_path = os.path.join(upload_folder, filename)
-            image.save(image_path)
-            uploaded_files.append(image_path)
-            extracted_text = extract_text(image_path)
-            logger.info(f"Text extracted from image: {extracted_text[:100]}...")
+            with open_upload(image) as data:
+                if len(data) > current_app.config['MAX_CONTENT_LENGTH']:
+                    logger.error(f"Image file too large: {image.filename}")
+                    return jsonify({'error': 'Image file too large (max 5 MB)'}), 400
+                with stage('image_extraction'):
+                    extracted_text = extract_text(data, filename=filename)
+            logger.info("Text extracted from image %s: %d characters", filename, len(extracted_text))
             if extracted_text.startswith("Erreur") or extracted_text == "Aucun texte détecté dans l'image.":
                 logger.warning(f"Failed to extract text from image: {extracted_text}")
                 return jsonify({'error': extracted_text, 'extracted_text': extracted_text, 'questions': []}), 400
+            questions = questions + detect_questions(extracted_text)
+            documents.append((filename, extracted_text))
         
         # Process question
         question = request.form.get('message', '')
         if not isinstance(question, str) or len(question) > 1000:
             return jsonify({'error': 'Invalid or too long message'}), 400
         
-        if extracted_text and not extracted_text.startswith("Erreur") and extracted_text != "Aucun texte détecté dans l'image.":
-            question = f"{question} [Texte extrait: {extracted_text}]" if question else f"Texte extrait: {extracted_text}"
+        # A PDF sent with an image is answered and indexed together with it
+        extracted_text = '\n\n'.join(text for _, text in documents)
+        filename = ', '.join(name for name, _ in documents)
+        has_text = bool(extracted_text)
         
         if not question and not (pdf or image):
             return jsonify({'error': 'No question or file provided'}), 400
         
-        # Generate response
+        # Generate response: the typed question is answered on its own, the document
+        # is split into its questions (or short passages) answered as one batch
+        session_id = get_session_id(session)
         try:
-            response = get_best_response(question or "Uploaded file", method='knn')
-        except ValueError as ve:
-            logger.error(f"Invalid method in get_best_response: {ve}")
-            return jsonify({'error': f"Invalid response method: {str(ve)}"}), 500
+            passages = []
+            if has_text:
+                segments, segment_type = split_document(extracted_text)
+                passages = get_best_responses(segments, method=method)
+                # Keep the document searchable for follow-up questions in this session
+                index_session_documents(session_id, documents)
+            if question:
+                response = get_best_response(question, method=method, session_id=session_id)
+            elif passages:
+                response = {k: v for k, v in passages[0].items() if k != 'passage'}
+            else:
+                response = get_best_response("Uploaded file", method=method)
+        except ValueError as ve:  # Invalid input: the method is checked above
+            logger.warning(f"Invalid input in get_best_response: {ve}")
+            return jsonify({'error': f"Invalid request: {str(ve)}"}), 400
         
         response['ask_for_response'] = response['confidence'] < 0.3
-        if extracted_text and not extracted_text.startswith("Erreur") and extracted_text != "Aucun texte détecté dans l'image.":
+        # Low-confidence fallback: bounded, concurrent web search
+        if question and response['ask_for_response'] and response.get('source') != 'document':
+            with stage('web_search'):
+                web_response = get_web_response(question, response['confidence'])
+            count('fallbacks', kind='web', result='answered' if web_response else 'empty')
+            if web_response:
+                response['answer'] = web_response['answer']
+                response['link'] = web_response['link']
+                response['source'] = web_response['source']
+                response['web_sources'] = web_response['sources']
+        if has_text:
             response['extracted_text'] = extracted_text
+            response['questions'] = questions
+            response['segment_type'] = segment_type
+            response['passages'] = passages
+        if pdf_pages:
+            response['pdf_pages'] = pdf_pages  # Per-page extraction method and timing
+        
+        # Audio is synthesized once per (answer, language, voice) in the background: the
+        # answer is returned at once and /audio waits for a synthesis still in progress
+        if tts_enabled:
+            with stage('tts'):
+                audio_filename, audio_ready = generate_audio_async(response['answer'], lang=output_lang or response['language'])
+            if audio_filename:
+                response['audio_url'] = f"/audio/{audio_filename}"
+                response['audio_pending'] = not audio_ready
+            else:
+                response['audio_error'] = audio_ready  # Error message
         
-        # Clean up uploaded files
-        for file_path in uploaded_files:
-            try:
-                os.remove(file_path)
-            except Exception as e:
-                logger.error(f"Error deleting file {file_path}: {e}")
+        with stage('history'):
+            save_conversation(
+                question=question or filename,
+                answer=response['answer'],
+                link=response.get('link', ''),
+                category=response.get('category', 'Général'),
+                response_id=response['response_id']
+            )
         
-        logger.info(f"User {current_user.username} sent message: {question[:100]}..., response: {response['answer'][:100]}...")
+        logger.info("User %s: %d-character question answered from %s (confidence %.2f)",
+                    current_user.username, len(question), response.get('source', 'kb'), response['confidence'])
+        logger.debug("Question: %s, answer: %s", question, response['answer'])
         return jsonify(response)
     
     except Exception as e:
@@ -133,6 +192,18 @@ def add_response_route():
         logger.error(f"Error in /add_response: {e}", exc_info=True)
         return jsonify({'error': 'An internal error occurred.'}), 500
 
+@api.route('/history', methods=['GET'])
+@login_required
+def history():
+    """Conversation history of the current session (the last `limit` exchanges, default 50)."""
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        conversations = get_conversations(session_id=get_session_id(session), limit=max(1, min(limit, 500)))
+        return jsonify({'conversations': conversations}), 200
+    except Exception as e:
+        logger.error(f"Error in /history: {e}", exc_info=True)
+        return jsonify({'error': 'An internal error occurred.'}), 500
+
 @api.route('/rate', methods=['POST'])
 @login_required
 def rate():
@@ -159,6 +230,91 @@ def export_conversations_route():
         return jsonify({'error': 'An internal error occurred.'}), 500
     
     
+@api.route('/extraction_cache/stats', methods=['GET'])
+@admin_required
+def extraction_cache_stats():
+    """Report hit rate and bytes saved by the upload extraction cache."""
+    return jsonify(get_extraction_cache().stats()), 200
+
+@api.route('/ocr/stats', methods=['GET'])
+@admin_required
+def ocr_stats():
+    """Report OCR worker queue depth, per-image latency and whether the engine is persistent."""
+    return jsonify(get_ocr_service().stats()), 200
+
+@api.route('/audio/<filename>')
+@login_required
+def serve_audio(filename):
+    """Serve stored audio with ETag, conditional and Range request support."""
+    done, error = wait_for_audio(filename)  # Synthesis started by /chat and not finished yet
+    if not done:
+        response = jsonify({'error': 'Audio synthesis in progress'})
+        response.headers['Retry-After'] = str(AUDIO_RETRY_AFTER)
+        return response, 503
+    if error:
+        logger.error(f"Audio synthesis failed for {filename}: {error}")
+        return jsonify({'error': 'Audio synthesis failed', 'details': error}), 502
+    response = get_audio_store().send(filename)
+    if response is None:
+        logger.error(f"Audio file not found: {filename}")
+        return jsonify({'error': 'Audio file not found'}), 404
+    return response
+
+@api.route('/web_search/stats', methods=['GET'])
+@admin_required
+def web_search_stats():
+    """Report web search circuit breaker states and web result cache hit ratio."""
+    return jsonify(get_provider_stats()), 200
+
+@api.route('/audio_store/stats', methods=['GET'])
+@admin_required
+def audio_store_stats():
+    """Report audio store hit rate, synthesis time and size."""
+    return jsonify(get_audio_store().stats()), 200
+
+@api.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus exposition of request, stage, cache, fallback and OCR metrics (allowed addresses or token only)."""
+    if not METRICS_ENABLED:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    if not metrics_access_allowed():
+        return jsonify({'error': 'Forbidden'}), 403
+    return Response(get_metrics().render(), mimetype='text/plain; version=0.0.4')
+
+@api.route('/admin/profiles', methods=['GET'])
+@admin_required
+def list_profiles():
+    """Stored request profiles (newest first) with their stage timings and input sizes."""
+    return jsonify({'profiles': get_profile_store().list()}), 200
+
+@api.route('/admin/profiles/<profile_id>', methods=['GET'])
+@admin_required
+def download_profile(profile_id):
+    """Download a profile: cProfile dump (.prof) or collapsed stacks (.folded)."""
+    path = get_profile_store().data_path(profile_id) if PROFILE_ID_RE.match(profile_id) else None
+    if path is None or not os.path.exists(path):
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(path, as_attachment=True, download_name=os.path.basename(path))
+
+@api.route('/user_db/stats', methods=['GET'])
+@admin_required
+def user_db_stats():
+    """Report users.db connections opened and user cache hit rate."""
+    return jsonify(get_user_db().stats()), 200
+
+@api.route('/session_document', methods=['DELETE'])
+@login_required
+def clear_session_document():
+    """Forget the document uploaded in the current session."""
+    get_session_index().clear(get_session_id(session))
+    return jsonify({'success': True}), 200
+
+@api.route('/session_index/stats', methods=['GET'])
+@admin_required
+def session_index_stats():
+    """Report the number and memory use of per-session document indexes."""
+    return jsonify(get_session_index().stats()), 200
+
 @api.route('/evaluate_models', methods=['GET'])
 def evaluate_models():
     """Run cross-validation for all models and display results."""
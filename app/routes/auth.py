@@ -1,20 +1,25 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from functools import wraps
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, abort
 from werkzeug.security import generate_password_hash, check_password_hash
-from flask_login import login_user, logout_user, login_required
-from app.models.user import User
+from flask_login import login_user, logout_user, login_required, current_user
 from app.utils.logging import initialize_logging
 import sqlite3
-import os
-from app.utils.json_db import read_users_json, append_user_json, get_next_json_id
+from app.utils.json_db import append_user_json
+from app.utils.db import get_user_db, USER_SORTS, MAX_PAGE_SIZE
 
 auth = Blueprint('auth', __name__)
 logger = initialize_logging()
 
-def get_db_connection():
-    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../users.db')
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    return conn
+def admin_required(view):
+    """Restrict a view to logged-in users listed in ADMIN_USERS (403 for the others)."""
+    @wraps(view)
+    @login_required
+    def wrapped(*args, **kwargs):
+        if not current_user.is_admin:
+            logger.warning(f"User {current_user.username} denied access to admin route {request.path}")
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapped
 
 @auth.route('/login', methods=['GET', 'POST'])
 def login():
@@ -27,14 +32,9 @@ def login():
             return redirect(url_for('auth.login'))
         
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT id, username, email, password FROM users WHERE username = ?', (username,))
-            user_data = cursor.fetchone()
-            conn.close()
+            user = get_user_db().find_by_username(username)
             
-            if user_data and check_password_hash(user_data['password'], password):
-                user = User(id=user_data['id'], username=user_data['username'], email=user_data['email'], password=user_data['password'])
+            if user and check_password_hash(user.password, password):
                 login_user(user)
                 logger.info(f"User {username} logged in successfully.")
                 return redirect(url_for('api.home'))
@@ -62,36 +62,28 @@ def register():
             return redirect(url_for('auth.register'))
         
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
+            db = get_user_db()
             
             # Check for existing username in SQLite
-            cursor.execute('SELECT username FROM users WHERE username = ?', (username,))
-            if cursor.fetchone():
-                conn.close()
+            if db.username_exists(username):
                 flash('Username already exists.', 'error')
                 return redirect(url_for('auth.register'))
             
             # Check for existing email in SQLite
-            cursor.execute('SELECT email FROM users WHERE email = ?', (email,))
-            if cursor.fetchone():
-                conn.close()
+            if db.email_exists(email):
                 flash('Email already registered.', 'error')
                 return redirect(url_for('auth.register'))
             
             # Insert new user into SQLite
             hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
-            cursor.execute('INSERT INTO users (username, email, password) VALUES (?, ?, ?)',
-                          (username, email, hashed_password))
-            conn.commit()
-            
-            # Get the inserted user's ID
-            cursor.execute('SELECT id FROM users WHERE username = ?', (username,))
-            user_id = cursor.fetchone()['id']
-            conn.close()
+            try:
+                user_id = db.create_user(username, email, hashed_password)
+            except sqlite3.IntegrityError:
+                # Registered concurrently since the checks above
+                flash('Username or email already registered.', 'error')
+                return redirect(url_for('auth.register'))
             
             # Append to users.json
-            json_users = read_users_json(current_app.config['JSON_DB_PATH'])
             json_user_data = {
                 'id': user_id,  # Use SQLite ID for consistency
                 'username': username,
@@ -124,12 +116,22 @@ def logout():
     return redirect(url_for('auth.login'))
 
 @auth.route('/users')
-@login_required
+@admin_required
 def users():
+    """Paginated user list read from users.db, searchable by username or email prefix."""
     try:
-        users = read_users_json(current_app.config['JSON_DB_PATH'])
-        return render_template('users.html', users=users)
+        search = request.args.get('q', '').strip()
+        sort = request.args.get('sort', 'username')
+        if sort not in USER_SORTS:
+            sort = 'username'
+        descending = request.args.get('order') == 'desc'
+        per_page = max(1, min(request.args.get('per_page', 50, type=int), MAX_PAGE_SIZE))
+        page = max(1, request.args.get('page', 1, type=int))
+        users, total = get_user_db().list_users(search, sort, descending, page, per_page)
+        pages = max(1, -(-total // per_page))
+        return render_template('users.html', users=users, total=total, page=page, pages=pages, per_page=per_page,
+                               search=search, sort=sort, order='desc' if descending else 'asc')
     except Exception as e:
-        logger.error(f"Error fetching users from users.json: {e}")
+        logger.error(f"Error fetching users from users.db: {e}")
         flash('An error occurred while fetching user data.', 'error')
         return redirect(url_for('api.home'))
\ No newline at end of file
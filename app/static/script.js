@@ -344,7 +344,15 @@
                 newResponse.value = '';
                 newLink.value = '';
                 newCategory.value = 'Général';
+                if (data.status === 'merged') {
+                    // Near-duplicate of an existing question: nothing was added
+                    addMessage(`${translations[uiLang.value].responseMerged || "Cette question existe déjà, votre réponse n'a pas été ajoutée"} : ${data.duplicate_of}`, false);
+                    return;
+                }
                 addMessage(translations[uiLang.value].responseAdded || "Merci ! Votre réponse a été ajoutée.", false);
+                if (data.duplicate_of) {
+                    addMessage(`${translations[uiLang.value].similarQuestion || 'Question similaire existante'} : ${data.duplicate_of}`, false);
+                }
                 conversations.push({ question, answer: response, link, category, rating: 'Non évalué' });
                 if (conversations.length > 100) conversations = conversations.slice(-100);
                 localStorage.setItem('conversations', JSON.stringify(conversations));
@@ -0,0 +1,176 @@
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+from threading import Lock
+from flask import send_file
+from .logging import initialize_logging
+from .metrics import count_cache
+from .single_flight import SingleFlight
+
+logger = initialize_logging()
+
+STORE_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../cache/audio'))
+MAX_STORE_BYTES = 200 * 1024 * 1024  # 200 MB
+DEFAULT_VOICE = 'com'  # gTTS top-level domain, which selects the accent
+AUDIO_FILENAME_RE = re.compile(r'^[0-9a-f]{64}\.mp3$')
+
+class AudioStore:
+    """
+    Content-addressed, size-bounded store of synthesized answers.
+
+    Files are named after the SHA-256 of (voice, language, text), so the same answer is
+    synthesized once and served from disk afterwards. The least recently used files are
+    evicted once the store exceeds max_bytes.
+
+    Args:
+        synthesizer: callable(text, lang, voice) -> MP3 bytes.
+    """
+
+    def __init__(self, synthesizer, store_dir=STORE_DIR, max_bytes=MAX_STORE_BYTES):
+        self.synthesizer = synthesizer
+        self.store_dir = store_dir
+        self.max_bytes = max_bytes
+        self._files = OrderedDict()  # key -> file size, least recently used first
+        self._bytes = 0
+        self._lock = Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'errors': 0, 'evicted': 0, 'synth_ms': 0.0}
+        self._flight = SingleFlight('audio_synthesis')  # Concurrent misses for one key share a synthesis
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the index from existing files, least recently used first."""
+        try:
+            os.makedirs(self.store_dir, exist_ok=True)
+            entries = []
+            for name in os.listdir(self.store_dir):
+                if AUDIO_FILENAME_RE.match(name):
+                    stat = os.stat(os.path.join(self.store_dir, name))
+                    entries.append((stat.st_mtime, name[:-4], stat.st_size))
+            for _, key, size in sorted(entries):
+                self._files[key] = size
+                self._bytes += size
+            logger.debug(f"Audio store loaded {len(self._files)} files ({self._bytes} bytes).")
+        except OSError as e:
+            logger.warning(f"Could not load audio store from {self.store_dir}: {e}")
+
+    @staticmethod
+    def make_key(text, lang, voice=DEFAULT_VOICE):
+        """Key of an answer: SHA-256 of the voice, language and whitespace-normalized text."""
+        normalized = ' '.join(text.split())
+        return hashlib.sha256(f"{voice}\0{lang}\0{normalized}".encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.store_dir, f"{key}.mp3")
+
+    def get_or_create(self, text, lang, voice=DEFAULT_VOICE):
+        """
+        Return the key of the stored audio for text, synthesizing it on a miss.
+
+        Raises whatever the synthesizer raises; nothing is stored in that case.
+        """
+        key = self.make_key(text, lang, voice)
+        if self._lookup(key):
+            return key
+        return self._flight.do(key, self._synthesize, key, text, lang, voice)
+
+    def has(self, key):
+        """Whether key is stored (counted as a hit: the caller is about to serve it)."""
+        return self._lookup(key)
+
+    def _lookup(self, key):
+        """Count a hit and refresh recency if key is stored."""
+        path = self.path(key)
+        with self._lock:
+            known = key in self._files
+        if known and os.path.exists(path):
+            try:
+                os.utime(path)  # Refresh recency for eviction after a restart
+            except OSError:
+                pass
+            with self._lock:
+                if key in self._files:
+                    self._files.move_to_end(key)
+                self._stats['hits'] += 1
+            count_cache('audio', True)
+            return True
+        return False
+
+    def _synthesize(self, key, text, lang, voice):
+        # A computation for this key may have completed since the caller's lookup
+        if self._lookup(key):
+            return key
+        path = self.path(key)
+        start = time.perf_counter()
+        try:
+            audio = self.synthesizer(text, lang, voice)
+        except Exception:
+            with self._lock:
+                self._stats['errors'] += 1
+            raise
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(self.store_dir, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(audio)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._forget(key, delete=False)
+            self._files[key] = len(audio)
+            self._bytes += len(audio)
+            self._stats['misses'] += 1
+            self._stats['synth_ms'] += elapsed_ms
+            self._evict(keep=key)
+        count_cache('audio', False)
+        logger.debug("Audio synthesized in %.0f ms (%s, %d bytes): %s", elapsed_ms, lang, len(audio), key)
+        return key
+
+    def send(self, filename):
+        """
+        Flask response for a stored file, with ETag, conditional and Range request support,
+        or None if filename is invalid or not stored.
+        """
+        if not AUDIO_FILENAME_RE.match(filename):
+            return None
+        key = filename[:-4]
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        # Content-addressed: a given URL always holds the same bytes
+        return send_file(path, mimetype='audio/mpeg', conditional=True, etag=key, max_age=31536000)
+
+    def _forget(self, key, delete=True):
+        size = self._files.pop(key, None)
+        if size is not None:
+            self._bytes -= size
+        if delete:
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+    def _evict(self, keep=None):
+        while self._bytes > self.max_bytes and len(self._files) > 1:
+            oldest = next(iter(self._files))
+            if oldest == keep:
+                break
+            self._forget(oldest)
+            self._stats['evicted'] += 1
+            logger.debug(f"Evicted audio {oldest}")
+
+    def stats(self):
+        """Hit/miss counters, hit rate, synthesis time and store size."""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(
+                self._stats,
+                synth_ms=round(self._stats['synth_ms'], 1),
+                hit_rate=self._stats['hits'] / lookups if lookups else 0.0,
+                coalesced=self._flight.stats()['coalesced'],
+                files=len(self._files),
+                bytes=self._bytes,
+                max_bytes=self.max_bytes
+            )
@@ -5,7 +5,11 @@ from threading import Lock
 import bleach
 from .logging import initialize_logging
 from .preprocess import preprocess_text, initialize_vectorizer
-from .models import KNNModel, SVMModel, CosineModel
+from .models import KNNModel, SVMModel, CosineModel, NaiveBayesModel, EnsembleModel
+from .models.ensemble_model import fit_calibrator
+from .session_index import get_session_index
+from .dedup import NearDuplicateIndex
+from .metrics import stage
 from langdetect import detect
 
 logger = initialize_logging()
@@ -15,12 +19,16 @@ _df_lock = Lock()
 
 # Internal state
 _state = {
-    'fr': {'df': None, 'vectorizer': None, 'X': None, 'knn': None, 'svm': None, 'cosine': None},
-    'en': {'df': None, 'vectorizer': None, 'X': None, 'knn': None, 'svm': None, 'cosine': None},
+    'fr': {'df': None, 'vectorizer': None, 'X': None, 'knn': None, 'svm': None, 'cosine': None, 'naive_bayes': None, 'ensemble': None, 'dedup': None},
+    'en': {'df': None, 'vectorizer': None, 'X': None, 'knn': None, 'svm': None, 'cosine': None, 'naive_bayes': None, 'ensemble': None, 'dedup': None},
     'ratings': pd.DataFrame(columns=['response_id', 'rating', 'timestamp']),
+    'data_dir': None,
     'initialized': False
 }
 
+# Dataset directory; CHATBOT_DATA_DIR points a server at another copy (load tests)
+DATA_DIR = os.environ.get('CHATBOT_DATA_DIR') or os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data'))
+
 # Proactive suggestion links
 SUGGESTIONS = {
     'Horaires': 'http://iset.example.com/calendrier',
@@ -28,23 +36,39 @@ SUGGESTIONS = {
     'Général': 'http://iset.example.com/accueil'
 }
 
-def initialize_data():
-    """Initialize datasets, vectorizers, and models for French and English."""
+# Characters of a document used for language detection in batched retrieval
+LANG_DETECT_CHARS = 1000
+# Retrieval models usable by get_best_response / get_best_responses
+RETRIEVAL_METHODS = ('knn', 'cosine', 'naive_bayes', 'ensemble')
+# Minimum similarity for a passage of the session's document to be used as an answer
+DOCUMENT_MIN_SCORE = 0.2
+# What add_response does with a near-duplicate of an existing row: 'flag' (add it and
+# report the duplicate), 'merge' (keep the existing row, reported as status 'merged')
+# or 'allow' (no check)
+DEDUP_POLICY = os.environ.get('DEDUP_POLICY', 'flag')
+
+def initialize_data(data_dir=None, evaluate=True):
+    """
+    Initialize datasets, vectorizers, and models for French and English.
+
+    data_dir defaults to app/data (the benchmarks point it at synthetic corpora);
+    evaluate runs the startup cross-validation.
+    """
     if _state['initialized']:
         logger.debug("Data already initialized.")
         return
     
     try:
         # Ensure data directory exists
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        data_dir = os.path.normpath(os.path.join(base_dir, '../data'))
+        data_dir = data_dir or DATA_DIR
         logger.debug(f"Looking for data directory at: {data_dir}")
         if not os.path.exists(data_dir):
             logger.error(f"Data directory not found at {data_dir}. Please create it and add dataset files.")
             raise FileNotFoundError(f"Data directory not found at {data_dir}")
+        _state['data_dir'] = data_dir
         
         # Initialize French data
-        _state['fr']['df'] = load_data('fr')
+        _state['fr']['df'] = load_data('fr', data_dir)
         if _state['fr']['df'].empty:
             logger.warning("French dataset is empty. Skipping model initialization.")
         else:
@@ -53,9 +77,11 @@ def initialize_data():
             _state['fr']['knn'] = KNNModel(_state['fr']['X'])
             _state['fr']['svm'] = SVMModel(_state['fr']['df'], _state['fr']['X'], lang='fr')
             _state['fr']['cosine'] = CosineModel(_state['fr']['X'])
+            _state['fr']['naive_bayes'] = NaiveBayesModel(_state['fr']['df'], _state['fr']['vectorizer'], _state['fr']['X'], lang='fr')
+            _state['fr']['ensemble'] = _build_ensemble('fr')
         
         # Initialize English data
-        _state['en']['df'] = load_data('en')
+        _state['en']['df'] = load_data('en', data_dir)
         if _state['en']['df'].empty:
             logger.warning("English dataset is empty. Skipping model initialization.")
         else:
@@ -64,12 +90,14 @@ def initialize_data():
             _state['en']['knn'] = KNNModel(_state['en']['X'])
             _state['en']['svm'] = SVMModel(_state['en']['df'], _state['en']['X'], lang='en')
             _state['en']['cosine'] = CosineModel(_state['en']['X'])
+            _state['en']['naive_bayes'] = NaiveBayesModel(_state['en']['df'], _state['en']['vectorizer'], _state['en']['X'], lang='en')
+            _state['en']['ensemble'] = _build_ensemble('en')
         
         _state['initialized'] = True
         logger.info("Datasets, vectorizers, and models initialized successfully for French and English.")
         
         # Evaluate models only if dataset is non-empty and has enough rows
-        for lang in ['fr', 'en']:
+        for lang in (['fr', 'en'] if evaluate else []):
             if not _state[lang]['df'].empty and len(_state[lang]['df']) >= 3:  # Reduced to 3 folds
                 try:
                     evaluate_all_models(lang=lang)
@@ -82,10 +110,17 @@ def initialize_data():
         logger.error(f"Failed to initialize data: {e}", exc_info=True)
         raise RuntimeError(f"Data initialization failed: {e}")
 
-def load_data(lang):
+def reset_data():
+    """Forget the loaded datasets and models, so initialize_data can load another data_dir."""
+    with _df_lock:
+        for lang in ('fr', 'en'):
+            _state[lang] = {key: None for key in _state[lang]}
+        _state['data_dir'] = None
+        _state['initialized'] = False
+
+def load_data(lang, data_dir=None):
     """Load the dataset for the specified language."""
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    data_path = os.path.normpath(os.path.join(base_dir, f'../data/iset_questions_reponses_{lang}.csv'))
+    data_path = os.path.join(data_dir or DATA_DIR, f'iset_questions_reponses_{lang}.csv')
     logger.debug(f"Attempting to load dataset from: {data_path}")  # Fixed typo here
     if not os.path.exists(data_path):
         logger.error(f"Dataset file not found at {data_path}. Please ensure the file exists.")
@@ -99,6 +134,16 @@ def load_data(lang):
         logger.error(f"Error loading {lang} dataset from {data_path}: {e}")
         raise
 
+def get_data_dir():
+    """Return the dataset directory in use (DATA_DIR until data is initialized elsewhere)."""
+    return _state['data_dir'] or DATA_DIR
+
+def _build_ensemble(lang):
+    """Score-fusion ensemble over the language's fitted models, with its confidence calibrator."""
+    state = _state[lang]
+    calibrator = fit_calibrator(state['df'], state['vectorizer'], state['X'], lang=lang)
+    return EnsembleModel(state['X'], state['svm'], state['naive_bayes'], state['df'], lang=lang, calibrator=calibrator)
+
 def get_df_lock():
     """Return a thread lock for dataset updates."""
     return _df_lock
@@ -121,8 +166,40 @@ def get_X(lang):
         raise RuntimeError("Data not initialized. Please check server logs.")
     return _state[lang]['X']
 
-def get_best_response(user_input, method='knn'):
-    """Find the best response using the specified model."""
+def _detect_language(text):
+    """Detect the dataset language ('fr' or 'en') of a text, defaulting to French."""
+    try:
+        with stage('langdetect'):
+            lang = detect(text)
+        if lang not in ['fr', 'en']:
+            lang = 'fr'  # Default to French
+    except Exception as e:
+        logger.warning(f"Language detection failed: {e}. Defaulting to French.")
+        lang = 'fr'
+    return lang
+
+def _build_response(lang, idx, confidence, intent):
+    """Build the response payload for dataset row idx."""
+    df = _state[lang]['df']
+    return {
+        'answer': df.iloc[idx]['Réponse' if lang == 'fr' else 'Response'],
+        'link': df.iloc[idx]['Lien' if lang == 'fr' else 'Link'],
+        'category': df.iloc[idx]['Catégorie' if lang == 'fr' else 'Category'],
+        'response_id': str(uuid.uuid4()),
+        'confidence': float(confidence),
+        'intent': intent,
+        'suggestion': SUGGESTIONS.get(intent, ''),
+        'language': lang
+    }
+
+def get_best_response(user_input, method='knn', session_id=None):
+    """
+    Find the best response using the specified model.
+
+    With a session_id, the passages of the document uploaded in that session are
+    searched too; the best passage is returned under 'document_match' and becomes the
+    answer when it matches better than the knowledge base.
+    """
     if not _state['initialized']:
         logger.error("Cannot process response: Data not initialized.")
         raise RuntimeError("Data not initialized. Please check server logs.")
@@ -130,78 +207,182 @@ def get_best_response(user_input, method='knn'):
     if not user_input or not isinstance(user_input, str):
         logger.error("Invalid input: user_input must be a non-empty string.")
         raise ValueError("Input must be a non-empty string.")
+    if method not in RETRIEVAL_METHODS:
+        raise ValueError(f"Unsupported method: {method}")
     
-    # Detect language
-    try:
-        lang = detect(user_input)
-        if lang not in ['fr', 'en']:
-            lang = 'fr'  # Default to French
-    except Exception as e:
-        logger.warning(f"Language detection failed: {e}. Defaulting to French.")
-        lang = 'fr'
-    
-    df = _state[lang]['df']
+    lang = _detect_language(user_input)
     vectorizer = _state[lang]['vectorizer']
     svm = _state[lang]['svm']
     
-    logger.debug(f"Processing input: {user_input} in language: {lang} with method: {method}")
-    processed_input = preprocess_text(user_input, lang)
-    input_vec = vectorizer.transform([processed_input])
-    
-    # Predict intent with SVM
-    intent, intent_confidence = svm.predict(input_vec)
+    logger.debug("Processing input: %s in language: %s with method: %s", user_input, lang, method)
+    with stage('preprocess'):
+        processed_input = preprocess_text(user_input, lang)
+    with stage('vectorize'):
+        input_vec = vectorizer.transform([processed_input])
     
-    # Get response based on method
-    if method == 'knn':
-        max_idx, confidence = _state[lang]['knn'].predict(input_vec)
-    elif method == 'cosine':
-        max_idx, confidence = _state[lang]['cosine'].predict(input_vec)
+    # Get response based on method; the ensemble's intent is the category of its row
+    if method == 'ensemble':
+        with stage('retrieval'):
+            indices, confidences, intents = _state[lang]['ensemble'].predict_batch(input_vec)
+        max_idx, confidence, intent = indices[0], confidences[0], intents[0]
     else:
-        raise ValueError(f"Unsupported method: {method}")
+        # Predict intent with SVM
+        with stage('intent'):
+            intent, _ = svm.predict(input_vec)
+        with stage('retrieval'):
+            if method == 'knn':
+                max_idx, confidence = _state[lang]['knn'].predict(input_vec)
+            elif method == 'cosine':
+                max_idx, confidence = _state[lang]['cosine'].predict(input_vec)
+            else:
+                indices, confidences = _state[lang]['naive_bayes'].predict_batch(input_vec)
+                max_idx, confidence = indices[0], confidences[0]
     
-    response = {
-        'answer': df.iloc[max_idx]['Réponse' if lang == 'fr' else 'Response'],
-        'link': df.iloc[max_idx]['Lien' if lang == 'fr' else 'Link'],
-        'category': df.iloc[max_idx]['Catégorie' if lang == 'fr' else 'Category'],
-        'response_id': str(uuid.uuid4()),
-        'confidence': float(confidence),
-        'intent': intent,
-        'suggestion': SUGGESTIONS.get(intent, ''),
-        'language': lang
-    }
-    logger.debug(f"Generated response: {response}")
+    response = _build_response(lang, max_idx, confidence, intent)
+    response['source'] = 'kb'
+    
+    if session_id:
+        with stage('document_search'):
+            match = get_session_index().search(session_id, user_input)
+        if match and match['score'] >= DOCUMENT_MIN_SCORE:
+            response['document_match'] = match
+            if match['score'] > response['confidence']:
+                response.update({
+                    'answer': match['passage'],
+                    'link': '',
+                    'category': 'Document',
+                    'confidence': match['score'],
+                    'source': 'document'
+                })
+    logger.debug("Generated response: %s", response)
     return response
 
+def index_session_document(session_id, text, filename=None):
+    """Index an extracted document for follow-up questions in the session. Returns the passage count."""
+    return index_session_documents(session_id, [(filename, text)])
+
+def index_session_documents(session_id, documents):
+    """Index the (filename, text) documents of one upload together, so none replaces another."""
+    lang = _detect_language(' '.join(text for _, text in documents)[:LANG_DETECT_CHARS])
+    return get_session_index().add_documents(session_id, documents, lang)
+
+def get_best_responses(passages, method='knn'):
+    """
+    Answer several passages of one document as a single batched retrieval.
+
+    The language is detected once on the start of the document, the passages are
+    vectorized in one transform and scored against the dataset in one call per model.
+    Returns one response per passage (with the passage under 'passage'), sorted by
+    decreasing confidence.
+    """
+    if not _state['initialized']:
+        logger.error("Cannot process responses: Data not initialized.")
+        raise RuntimeError("Data not initialized. Please check server logs.")
+    
+    passages = [p for p in passages if isinstance(p, str) and p.strip()]
+    if not passages:
+        return []
+    if method not in RETRIEVAL_METHODS:
+        raise ValueError(f"Unsupported method: {method}")
+    
+    lang = _detect_language(' '.join(passages)[:LANG_DETECT_CHARS])
+    with stage('preprocess'):
+        processed = [preprocess_text(p, lang) for p in passages]
+    with stage('vectorize'):
+        input_vecs = _state[lang]['vectorizer'].transform(processed)
+    
+    if method == 'ensemble':
+        with stage('retrieval'):
+            indices, confidences, intents = _state[lang]['ensemble'].predict_batch(input_vecs)
+    else:
+        with stage('intent'):
+            intents, _ = _state[lang]['svm'].predict_batch(input_vecs)
+        with stage('retrieval'):
+            indices, confidences = _state[lang][method].predict_batch(input_vecs)
+    
+    responses = []
+    for passage, idx, confidence, intent in zip(passages, indices, confidences, intents):
+        response = _build_response(lang, idx, confidence, intent)
+        response['passage'] = passage
+        responses.append(response)
+    responses.sort(key=lambda r: r['confidence'], reverse=True)
+    logger.debug("Answered %d passages in language %s with method %s.", len(passages), lang, method)
+    return responses
+
+def _get_dedup_index(lang):
+    """Near-duplicate index of a language's dataset, built on first use (call with _df_lock held)."""
+    if _state[lang]['dedup'] is None:
+        answer_col = 'Réponse' if lang == 'fr' else 'Response'
+        _state[lang]['dedup'] = NearDuplicateIndex.from_dataframe(_state[lang]['df'], 'Question', answer_col)
+    return _state[lang]['dedup']
+
 def add_response(data):
-    """Add a new question/response to the dataset."""
+    """
+    Add a new question/response to the dataset.
+
+    Near-duplicates of an existing row are handled according to data['on_duplicate']
+    (default DEDUP_POLICY): 'flag' adds the row and reports the duplicate, 'merge' keeps
+    the existing row (filling in its link if it had none), 'allow' skips the check.
+    Similar questions with a different answer are always added and reported as conflicts.
+    The result's status is 'added' or 'merged' (nothing added).
+    """
     if not _state['initialized']:
         logger.error("Cannot add response: Data not initialized.")
         return {'error': 'Data not initialized. Please check server logs.'}, 500
     
+    if not isinstance(data, dict) or 'question' not in data or 'response' not in data:
+        return {'error': 'Missing question or response data'}, 400
     lang = data.get('language', 'fr')
-    df = _state[lang]['df']
+    policy = data.get('on_duplicate', DEDUP_POLICY)
+    if policy not in ('merge', 'flag', 'allow'):
+        return {'error': f'Invalid on_duplicate policy: {policy}'}, 400
     
     try:
-        if not data or 'question' not in data or 'response' not in data:
-            return {'error': 'Missing question or response data'}, 400
-
+        answer_col = 'Réponse' if lang == 'fr' else 'Response'
+        link_col = 'Lien' if lang == 'fr' else 'Link'
+        question = bleach.clean(data['question'])
+        answer = bleach.clean(data['response'])
         new_row = pd.DataFrame([{
-            'Question': bleach.clean(data['question']),
-            'Réponse' if lang == 'fr' else 'Response': bleach.clean(data['response']),
-            'Lien' if lang == 'fr' else 'Link': bleach.clean(data.get('link', '')),
+            'Question': question,
+            answer_col: answer,
+            link_col: bleach.clean(data.get('link', '')),
             'Catégorie' if lang == 'fr' else 'Category': bleach.clean(data.get('category', 'Général')),
             'Rating': 0
         }])
+        data_path = os.path.join(_state['data_dir'], f'iset_questions_reponses_{lang}.csv')
         
         with _df_lock:
+            df = _state[lang]['df']
+            result = {'success': True, 'status': 'added'}
+            signatures = None
+            if policy != 'allow':
+                dedup = _get_dedup_index(lang)
+                matches, signatures = dedup.query(question, answer)
+                duplicates = [m for m in matches if m['kind'] == 'duplicate']
+                conflicts = [m for m in matches if m['kind'] == 'conflict']
+                if conflicts:
+                    result['conflicts'] = [df.loc[m['item_id'], 'Question'] for m in conflicts]
+                if duplicates:
+                    existing = duplicates[0]['item_id']
+                    result['duplicate_of'] = df.loc[existing, 'Question']
+                    result['similarity'] = duplicates[0]['question_similarity']
+                    if policy == 'merge':
+                        new_link = new_row.loc[0, link_col]
+                        if new_link and (pd.isna(df.loc[existing, link_col]) or df.loc[existing, link_col] == ''):
+                            df.loc[existing, link_col] = new_link
+                            df.to_csv(data_path, index=False, encoding='utf-8')
+                        logger.info(f"Near-duplicate of row {existing} merged for language {lang}.")
+                        result['status'] = 'merged'
+                        return result, 200
+
             _state[lang]['df'] = pd.concat([df, new_row], ignore_index=True)
             _state[lang]['df']['Processed_Question'] = _state[lang]['df']['Question'].apply(lambda x: preprocess_text(x, lang))
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            data_path = os.path.normpath(os.path.join(base_dir, f'../data/iset_questions_reponses_{lang}.csv'))
             _state[lang]['df'].to_csv(data_path, index=False, encoding='utf-8')
+            if _state[lang]['dedup'] is not None:
+                _state[lang]['dedup'].add(len(_state[lang]['df']) - 1, question, answer, signatures)
             logger.info(f"New response added for language {lang}. Model retraining deferred.")
         
-        return {'success': True}, 200
+        return result, 200
     
     except Exception as e:
         logger.error(f"Error in add_response: {e}", exc_info=True)
@@ -216,6 +397,8 @@ def retrain_models(lang):
             _state[lang]['knn'] = KNNModel(_state[lang]['X'])
             _state[lang]['svm'] = SVMModel(_state[lang]['df'], _state[lang]['X'], lang=lang)
             _state[lang]['cosine'] = CosineModel(_state[lang]['X'])
+            _state[lang]['naive_bayes'] = NaiveBayesModel(_state[lang]['df'], vectorizer, _state[lang]['X'], lang=lang)
+            _state[lang]['ensemble'] = _build_ensemble(lang)
             logger.info(f"Models retrained for language {lang}.")
     except Exception as e:
         logger.error(f"Error in retrain_models for language {lang}: {e}", exc_info=True)
@@ -237,8 +420,7 @@ def rate_response(data):
         
         with _df_lock:
             _state['ratings'] = pd.concat([_state['ratings'], new_rating], ignore_index=True)
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            ratings_path = os.path.normpath(os.path.join(base_dir, '../data/ratings.csv'))
+            ratings_path = os.path.join(_state['data_dir'] or DATA_DIR, 'ratings.csv')
             _state['ratings'].to_csv(ratings_path, index=False, encoding='utf-8')
         
         return {'success': True}, 200
@@ -1,26 +1,183 @@
 import sqlite3
 import os
+import threading
+import time
+from app.models.user import User
 from app.utils.logging import initialize_logging
 
 logger = initialize_logging()
 
+# CHATBOT_DB_PATH points a server at another user database (load tests)
+DB_PATH = os.environ.get('CHATBOT_DB_PATH') or os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../users.db'))
+# Seconds a loaded User is reused by load_user before users.db is read again
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 30))
+
+# Constant SQL texts, so that each connection's statement cache reuses the prepared statements
+_SELECT_BY_ID = 'SELECT id, username, email, password FROM users WHERE id = ?'
+_SELECT_BY_USERNAME = 'SELECT id, username, email, password FROM users WHERE username = ?'
+_USERNAME_EXISTS = 'SELECT 1 FROM users WHERE username = ?'
+_EMAIL_EXISTS = 'SELECT 1 FROM users WHERE email = ?'
+_INSERT_USER = 'INSERT INTO users (username, email, password) VALUES (?, ?, ?)'
+# Orderings of the user list, each backed by an index (NOCASE indexes also serve prefix searches)
+USER_SORTS = {'username': 'username COLLATE NOCASE', 'email': 'email COLLATE NOCASE', 'id': 'id'}
+MAX_PAGE_SIZE = 200
+
+def _like_prefix(text):
+    """LIKE pattern matching values that start with text (wildcards escaped)."""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+class UserDB:
+    """
+    Access to users.db through one reusable connection per thread.
+
+    Connections are opened once per thread in WAL mode (readers do not block the writer)
+    and keep their prepared statements. Users loaded by id are kept for cache_ttl
+    seconds, so login-protected requests do not query the database each time; writes
+    through this class invalidate the cached entry.
+    """
+
+    def __init__(self, path=DB_PATH, cache_ttl=USER_CACHE_TTL):
+        self.path = path
+        self.cache_ttl = cache_ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._users = {}  # user id -> (User, expiry)
+        self._stats = {'connections': 0, 'cache_hits': 0, 'cache_misses': 0}
+
+    def connect(self):
+        """SQLite connection of the current thread."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            with self._lock:
+                self._stats['connections'] += 1
+        return conn
+
+    @staticmethod
+    def _to_user(row):
+        return User(id=row['id'], username=row['username'], email=row['email'], password=row['password'])
+
+    def get_user(self, user_id):
+        """User with this id (cached for cache_ttl seconds), or None."""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        now = time.monotonic()
+        with self._lock:
+            cached = self._users.get(user_id)
+            if cached and cached[1] > now:
+                self._stats['cache_hits'] += 1
+                return cached[0]
+            self._stats['cache_misses'] += 1
+        row = self.connect().execute(_SELECT_BY_ID, (user_id,)).fetchone()
+        if row is None:
+            return None
+        user = self._to_user(row)
+        with self._lock:
+            self._users[user_id] = (user, now + self.cache_ttl)
+        return user
+
+    def find_by_username(self, username):
+        """User with this username, read from the database (login must see the current password), or None."""
+        row = self.connect().execute(_SELECT_BY_USERNAME, (username,)).fetchone()
+        return self._to_user(row) if row else None
+
+    def username_exists(self, username):
+        return self.connect().execute(_USERNAME_EXISTS, (username,)).fetchone() is not None
+
+    def email_exists(self, email):
+        return self.connect().execute(_EMAIL_EXISTS, (email,)).fetchone() is not None
+
+    def create_user(self, username, email, password_hash):
+        """
+        Insert a user and return its id.
+
+        Raises sqlite3.IntegrityError if the username or email is already taken.
+        """
+        conn = self.connect()
+        with conn:
+            user_id = conn.execute(_INSERT_USER, (username, email, password_hash)).lastrowid
+        self.invalidate(user_id)
+        return user_id
+
+    def list_users(self, search='', sort='username', descending=False, page=1, per_page=50):
+        """
+        One page of users (id, username, email) and the number of matching users.
+
+        search matches the start of the username or email, case-insensitively. Sorting
+        and prefix search use the indexes, so a page costs the same at any user count
+        (apart from the OFFSET walk of deep pages).
+        """
+        order = USER_SORTS.get(sort, USER_SORTS['username']) + (' DESC' if descending else '')
+        per_page = max(1, min(per_page, MAX_PAGE_SIZE))
+        where, params = '', ()
+        if search:
+            pattern = _like_prefix(search)
+            where = " WHERE username LIKE ? ESCAPE '\\' OR email LIKE ? ESCAPE '\\'"
+            params = (pattern, pattern)
+        conn = self.connect()
+        total = conn.execute('SELECT COUNT(*) FROM users' + where, params).fetchone()[0]
+        rows = conn.execute(f'SELECT id, username, email FROM users{where} ORDER BY {order} LIMIT ? OFFSET ?',
+                            params + (per_page, (max(1, page) - 1) * per_page)).fetchall()
+        return [dict(row) for row in rows], total
+
+    def iter_users(self, batch_size=1000):
+        """All users (with their password hash) in id order, read in batches."""
+        last_id = 0
+        while True:
+            rows = self.connect().execute('SELECT id, username, email, password FROM users WHERE id > ? ORDER BY id LIMIT ?',
+                                          (last_id, batch_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+            last_id = rows[-1]['id']
+
+    def invalidate(self, user_id=None):
+        """Forget a cached user (all users without an id) after a change."""
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(int(user_id), None)
+
+    def stats(self):
+        """Connections opened, user cache hits/misses and cached users."""
+        with self._lock:
+            return dict(self._stats, cached_users=len(self._users))
+
+_user_db = None
+_user_db_lock = threading.Lock()
+
+def get_user_db():
+    """Shared users.db accessor."""
+    global _user_db
+    if _user_db is None:
+        with _user_db_lock:
+            if _user_db is None:
+                _user_db = UserDB()
+    return _user_db
+
 def init_db():
-    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../users.db')
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL UNIQUE,
-                email TEXT NOT NULL UNIQUE,
-                password TEXT NOT NULL
-            )
-        ''')
-        conn.commit()
-        logger.info(f"Database initialized at {db_path}")
+        conn = get_user_db().connect()
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT NOT NULL UNIQUE,
+                    email TEXT NOT NULL UNIQUE,
+                    password TEXT NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_users_username_nocase ON users (username COLLATE NOCASE)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_users_email_nocase ON users (email COLLATE NOCASE)')
+        logger.info(f"Database initialized at {DB_PATH}")
     except sqlite3.Error as e:
         logger.error(f"Error initializing database: {e}")
         raise
-    finally:
-        conn.close()
\ No newline at end of file
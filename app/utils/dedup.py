@@ -0,0 +1,233 @@
+"""
+Near-duplicate detection for question/answer datasets (MinHash + LSH).
+
+Each question and answer is reduced to a MinHash signature of its character 4-grams;
+LSH banding on the question signature finds candidate pairs without comparing every
+row, and candidates are confirmed on the estimated Jaccard similarity of both the
+question and the answer. A paraphrased question with the same answer is a duplicate;
+a similar question with a different answer is reported as a conflict.
+
+Offline consolidation report:
+    python -m app.utils.dedup [--lang fr|en|all] [--json report.json] [--apply]
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import unicodedata
+import zlib
+from threading import Lock
+import numpy as np
+import pandas as pd
+from .logging import initialize_logging
+
+logger = initialize_logging()
+
+NUM_PERM = 64
+BANDS = 16  # 16 bands of 4 rows: candidate pairs from a Jaccard similarity of about 0.5
+SHINGLE_SIZE = 4
+QUESTION_THRESHOLD = 0.6
+ANSWER_THRESHOLD = 0.7
+_MERSENNE_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(42)  # Fixed seed: signatures are comparable across runs
+_PERM_A = _rng.randint(1, _MERSENNE_PRIME, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, _MERSENNE_PRIME, size=NUM_PERM).astype(np.uint64)
+
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data'))
+
+def normalize(text):
+    """Lowercase, accents and punctuation removed, whitespace collapsed."""
+    text = unicodedata.normalize('NFKD', str(text).lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^\w\s]', ' ', text).split())
+
+def minhash(text):
+    """MinHash signature (NUM_PERM uint64) of the character 4-grams of a text."""
+    text = normalize(text)
+    if len(text) <= SHINGLE_SIZE:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+    hashes %= _MERSENNE_PRIME
+    return ((_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _MERSENNE_PRIME).min(axis=1)
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(sig_a == sig_b))
+
+class NearDuplicateIndex:
+    """
+    LSH index of question/answer pairs, built in batch from a DataFrame and updated
+    incrementally as rows are added.
+    """
+
+    def __init__(self, question_threshold=QUESTION_THRESHOLD, answer_threshold=ANSWER_THRESHOLD, bands=BANDS):
+        self.question_threshold = question_threshold
+        self.answer_threshold = answer_threshold
+        self.bands = bands
+        self.rows_per_band = NUM_PERM // bands
+        self._buckets = {}
+        self._question_sigs = {}
+        self._answer_sigs = {}
+        self._lock = Lock()
+
+    @classmethod
+    def from_dataframe(cls, df, question_col, answer_col, **kwargs):
+        """Batch build: index every row of df under its index label."""
+        index = cls(**kwargs)
+        for item_id, question, answer in zip(df.index, df[question_col], df[answer_col]):
+            index.add(item_id, question, answer)
+        return index
+
+    def _band_keys(self, signature):
+        r = self.rows_per_band
+        return [(band, signature[band * r:(band + 1) * r].tobytes()) for band in range(self.bands)]
+
+    def __len__(self):
+        return len(self._question_sigs)
+
+    def add(self, item_id, question, answer, signatures=None):
+        """Index a row. signatures may be the (question, answer) pair returned by query()."""
+        question_sig, answer_sig = signatures or (minhash(question), minhash(answer))
+        with self._lock:
+            self._question_sigs[item_id] = question_sig
+            self._answer_sigs[item_id] = answer_sig
+            for key in self._band_keys(question_sig):
+                self._buckets.setdefault(key, []).append(item_id)
+
+    def remove(self, item_id):
+        with self._lock:
+            question_sig = self._question_sigs.pop(item_id, None)
+            self._answer_sigs.pop(item_id, None)
+            if question_sig is not None:
+                for key in self._band_keys(question_sig):
+                    bucket = self._buckets.get(key, [])
+                    if item_id in bucket:
+                        bucket.remove(item_id)
+
+    def query(self, question, answer, exclude=None):
+        """
+        Indexed rows similar to (question, answer).
+
+        Returns:
+            tuple: (matches, signatures). matches is a list of dicts item_id,
+            question_similarity, answer_similarity and kind ('duplicate' or 'conflict'),
+            most similar first.
+        """
+        question_sig, answer_sig = minhash(question), minhash(answer)
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(question_sig):
+                candidates.update(self._buckets.get(key, ()))
+            candidates.discard(exclude)
+            matches = []
+            for item_id in candidates:
+                q_sim = similarity(question_sig, self._question_sigs[item_id])
+                if q_sim < self.question_threshold:
+                    continue
+                a_sim = similarity(answer_sig, self._answer_sigs[item_id])
+                matches.append({
+                    'item_id': item_id,
+                    'question_similarity': round(q_sim, 3),
+                    'answer_similarity': round(a_sim, 3),
+                    'kind': 'duplicate' if a_sim >= self.answer_threshold else 'conflict'
+                })
+        matches.sort(key=lambda m: (m['kind'] != 'duplicate', -m['question_similarity']))
+        return matches, (question_sig, answer_sig)
+
+def find_duplicate_groups(df, question_col, answer_col, **kwargs):
+    """
+    Batch mode: group the rows of df that are near-duplicates of each other.
+
+    Returns:
+        tuple: (groups, conflicts). groups is a list of lists of index labels (first label
+        kept on consolidation); conflicts is a list of (label, label, question similarity).
+    """
+    index = NearDuplicateIndex(**kwargs)
+    parent = {}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    conflicts = []
+    for item_id, question, answer in zip(df.index, df[question_col], df[answer_col]):
+        parent[item_id] = item_id
+        matches, signatures = index.query(question, answer)
+        for match in matches:
+            if match['kind'] == 'duplicate':
+                root, other = find(match['item_id']), find(item_id)
+                if root != other:
+                    parent[other] = root
+            else:
+                conflicts.append((match['item_id'], item_id, match['question_similarity']))
+        index.add(item_id, question, answer, signatures)
+
+    groups = {}
+    for item_id in df.index:
+        groups.setdefault(find(item_id), []).append(item_id)
+    return [sorted(g) for g in groups.values() if len(g) > 1], conflicts
+
+def consolidate(df, groups, rating_col='Rating'):
+    """Keep the first row of each group; it gets the group's best rating."""
+    df = df.copy()
+    drop = []
+    for group in groups:
+        keep, others = group[0], group[1:]
+        if rating_col in df.columns:
+            df.loc[keep, rating_col] = pd.to_numeric(df.loc[group, rating_col], errors='coerce').fillna(0).max()
+        drop.extend(others)
+    return df.drop(index=drop).reset_index(drop=True)
+
+DATASETS = {
+    'fr': ('iset_questions_reponses_fr.csv', 'Question', 'Réponse'),
+    'en': ('iset_questions_reponses_en.csv', 'Question', 'Response'),
+    'learned': ('iset_questions_reponses.csv', 'Question', 'Réponse')
+}
+
+def consolidation_report(name, data_dir=DATA_DIR, apply=False):
+    """Duplicate groups and conflicts of a dataset; with apply, rewrite it consolidated (backup kept as .bak)."""
+    filename, question_col, answer_col = DATASETS[name]
+    path = os.path.join(data_dir, filename)
+    df = pd.read_csv(path, encoding='utf-8')
+    groups, conflicts = find_duplicate_groups(df, question_col, answer_col)
+    report = {
+        'dataset': filename,
+        'rows': len(df),
+        'distinct_rows': len(df) - sum(len(g) - 1 for g in groups),
+        'duplicate_groups': [[{'row': int(i), 'question': df.loc[i, question_col]} for i in g] for g in groups],
+        'conflicts': [{'rows': [int(a), int(b)], 'questions': [df.loc[a, question_col], df.loc[b, question_col]],
+                       'question_similarity': s} for a, b, s in conflicts]
+    }
+    if apply and groups:
+        shutil.copyfile(path, f"{path}.bak")
+        consolidate(df, groups).to_csv(path, index=False, encoding='utf-8')
+        logger.info(f"Dataset {filename} consolidé: {report['rows']} -> {report['distinct_rows']} lignes")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate consolidation report for the Q/A datasets")
+    parser.add_argument('--lang', default='all', choices=['all'] + list(DATASETS))
+    parser.add_argument('--json', help="Write the full report to this file")
+    parser.add_argument('--apply', action='store_true', help="Rewrite the datasets without duplicates (.bak kept)")
+    args = parser.parse_args()
+
+    names = list(DATASETS) if args.lang == 'all' else [args.lang]
+    reports = [consolidation_report(name, apply=args.apply) for name in names]
+    for report in reports:
+        print(f"\n{report['dataset']}: {report['rows']} rows, {report['distinct_rows']} distinct, "
+              f"{len(report['duplicate_groups'])} duplicate groups, {len(report['conflicts'])} conflicts")
+        for group in report['duplicate_groups']:
+            print("  - " + " | ".join(f"[{r['row']}] {r['question']}" for r in group))
+        for conflict in report['conflicts']:
+            print(f"  ! conflict {conflict['rows']} ({conflict['question_similarity']}): {conflict['questions']}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
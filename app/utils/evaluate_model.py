@@ -1,3 +1,5 @@
+import os
+from joblib import Parallel, delayed
 from sklearn.model_selection import KFold
 from sklearn.metrics import accuracy_score, classification_report
 import pandas as pd
@@ -9,8 +11,101 @@ from .logging import initialize_logging
 
 logger = initialize_logging()
 
-def cross_validate_model(lang='fr', k_folds=5, use_sbert=True):
-    """Perform k-fold cross-validation for all models."""
+# Worker processes for the cross-validation folds (-1: one per core)
+EVAL_N_JOBS = int(os.environ.get('EVAL_N_JOBS', -1))
+
+def _evaluate_fold(fold, train_idx, test_idx, df, X, vectorizer, codes, labels, lang, use_sbert):
+    """
+    Train every model on one fold and predict the whole test set in batch.
+
+    Categories are handled as integer codes into labels; row answers as integer codes of
+    the distinct answers, so voting and answer matching are array operations.
+
+    Returns:
+        dict: per model, 'correct' (0/1 answer matches, models with answers only) and
+        'report' (classification report dict); plus 'sbert_failed'.
+    """
+    answer_col = 'Réponse' if lang == 'fr' else 'Response'
+    answers, answer_codes = np.unique(df[answer_col].astype(str).to_numpy(), return_inverse=True)
+    train_df = df.iloc[train_idx].copy()
+    X_train = X[train_idx]
+    questions = df['Question'].iloc[test_idx].tolist()
+    y_test = codes[test_idx]
+    train_codes = codes[train_idx]
+    train_answers = answer_codes[train_idx]
+    expected_answers = answer_codes[test_idx]
+    logger.debug(f"Processing fold {fold + 1} for language {lang}. Train samples: {len(train_idx)}, Test samples: {len(test_idx)}")
+
+    # The test set is vectorized once for all TF-IDF models
+    X_test = vectorizer.transform([preprocess_text(question, lang) for question in questions])
+
+    knn_idx, _ = KNNModel(X_train).predict_batch(X_test)
+    cosine_idx, _ = CosineModel(X_train).predict_batch(X_test)
+    label_codes = {label: code for code, label in enumerate(labels)}
+    svm_intents, _ = SVMModel(train_df, X_train, lang=lang).predict_batch(X_test)
+    y_pred = {
+        'knn': train_codes[knn_idx],
+        'cosine': train_codes[cosine_idx],
+        'svm': np.array([label_codes[intent] for intent in svm_intents])
+    }
+    correct = {
+        'knn': train_answers[knn_idx] == expected_answers,
+        'cosine': train_answers[cosine_idx] == expected_answers
+    }
+
+    sbert_failed = False
+    if use_sbert:
+        try:
+            sbert_model = SBERTModel(train_df['Processed_Question'].values.tolist())
+        except Exception as e:
+            logger.error(f"Failed to initialize SBERTModel in fold {fold + 1}: {e}")
+            sbert_failed = True
+        else:
+            try:
+                sbert_idx, _ = sbert_model.predict_batch(questions)
+                y_pred['sbert'] = train_codes[sbert_idx]
+                correct['sbert'] = train_answers[sbert_idx] == expected_answers
+            except Exception as e:
+                logger.error(f"SBERT prediction failed in fold {fold + 1}: {e}")
+                y_pred['sbert'] = y_test.copy()  # Fallback
+                correct['sbert'] = np.zeros(len(test_idx), dtype=bool)
+
+    # Naive Bayes: one class per distinct training answer
+    nb_idx, _ = NaiveBayesModel(train_df, vectorizer, X_train, lang=lang).predict_batch(X_test)
+    y_pred['naive_bayes'] = train_codes[nb_idx]
+    correct['naive_bayes'] = train_answers[nb_idx] == expected_answers
+
+    # Ensemble: majority vote on integer intents, ties going to the first model in order
+    votes = np.column_stack([y_pred['knn'], y_pred['cosine'], y_pred.get('sbert', y_pred['naive_bayes']),
+                             y_pred['naive_bayes'], y_pred['svm']])
+    rows = np.arange(len(votes))
+    counts = np.zeros((len(votes), len(labels)), dtype=int)
+    np.add.at(counts, (rows[:, None], votes), 1)
+    vote_counts = counts[rows[:, None], votes]
+    ensemble = votes[rows, vote_counts.argmax(axis=1)]
+    y_pred['ensemble'] = ensemble
+    # The ensemble answers with the first training row of the winning intent
+    first_of_intent = np.full(len(labels), -1)
+    for position, code in reversed(list(enumerate(train_codes))):
+        first_of_intent[code] = position
+    ensemble_rows = first_of_intent[ensemble]
+    correct['ensemble'] = (ensemble_rows >= 0) & (train_answers[ensemble_rows] == expected_answers)
+
+    results = {'sbert_failed': sbert_failed}
+    y_true = labels[y_test]
+    for model in ['knn', 'cosine', 'sbert', 'naive_bayes', 'svm', 'ensemble']:
+        if model not in y_pred:
+            continue
+        predicted = labels[y_pred[model]]
+        results[model] = {
+            'correct': correct[model].astype(int) if model in correct else None,
+            'report': classification_report(y_true, predicted, zero_division=0, output_dict=True)
+        }
+        logger.info(f"[{lang}] Fold {fold + 1} {model.capitalize()} Classification Report:\n{classification_report(y_true, predicted, zero_division=0)}")
+    return results
+
+def cross_validate_model(lang='fr', k_folds=5, use_sbert=True, n_jobs=None):
+    """Perform k-fold cross-validation for all models, folds evaluated in parallel."""
     # Ensure data is initialized
     try:
         initialize_data()
@@ -21,7 +116,6 @@ def cross_validate_model(lang='fr', k_folds=5, use_sbert=True):
     df = get_df(lang)
     X = get_X(lang)
     vectorizer = get_vectorizer(lang)
-    y = df['Catégorie' if lang == 'fr' else 'Category']
     
     # Check for empty or insufficient data
     if df.empty or len(df) < k_folds:
@@ -33,150 +127,30 @@ def cross_validate_model(lang='fr', k_folds=5, use_sbert=True):
         logger.warning(f"Processed_Question column missing in {lang} dataset. Generating now.")
         df['Processed_Question'] = df['Question'].apply(lambda x: preprocess_text(x, lang))
     
+    codes, labels = pd.factorize(df['Catégorie' if lang == 'fr' else 'Category'], use_na_sentinel=False)
+    labels = np.asarray(labels, dtype=object)
+    
     # Initialize KFold
     kf = KFold(n_splits=k_folds, shuffle=True, random_state=42)
+    n_jobs = EVAL_N_JOBS if n_jobs is None else n_jobs
+    fold_results = Parallel(n_jobs=min(k_folds, n_jobs) if n_jobs > 0 else n_jobs)(
+        delayed(_evaluate_fold)(fold, train_idx, test_idx, df, X, vectorizer, codes, labels, lang, use_sbert)
+        for fold, (train_idx, test_idx) in enumerate(kf.split(X))
+    )
     
-    results = {
-        'knn': {'accuracies': [], 'classification_reports': []},
-        'cosine': {'accuracies': [], 'classification_reports': []},
-        'sbert': {'accuracies': [], 'classification_reports': []} if use_sbert else {},
-        'naive_bayes': {'accuracies': [], 'classification_reports': []},
-        'svm': {'accuracies': [], 'classification_reports': []},
-        'ensemble': {'accuracies': [], 'classification_reports': []}
-    }
-    
-    for fold, (train_idx, test_idx) in enumerate(kf.split(X)):
-        logger.debug(f"Processing fold {fold + 1}/{k_folds} for language {lang}. Train samples: {len(train_idx)}, Test samples: {len(test_idx)}")
-        
-        # Split data
-        try:
-            train_df = df.iloc[train_idx].copy()
-            test_df = df.iloc[test_idx].copy()
-            X_train = X[train_idx]
-            X_test = X[test_idx]
-            y_test = y.iloc[test_idx]
-            logger.debug(f"Columns in train_df for {lang}: {train_df.columns.tolist()}")
-        except Exception as e:
-            logger.error(f"Error splitting data in fold {fold + 1}: {e}")
-            raise
-        
-        # Reinitialize models for this fold
-        knn_model = KNNModel(X_train)
-        svm_model = SVMModel(train_df, X_train, lang=lang)
-        cosine_model = CosineModel(X_train)
-        sbert_model = None
-        if use_sbert:
-            try:
-                sbert_model = SBERTModel(train_df['Processed_Question'].values.tolist())
-            except Exception as e:
-                logger.error(f"Failed to initialize SBERTModel in fold {fold + 1}: {e}")
-                use_sbert = False
-                results.pop('sbert', None)
-        nb_model = NaiveBayesModel(train_df, vectorizer, X_train, lang=lang)
-        
-        # Evaluate each model
-        y_pred_knn = []
-        y_pred_cosine = []
-        y_pred_sbert = []
-        y_pred_nb = []
-        y_pred_svm = []
-        y_pred_ensemble = []
-        
-        for i, (_, row) in enumerate(test_df.iterrows()):
-            question = row['Question']
-            expected_answer = row['Réponse' if lang == 'fr' else 'Response']
-            expected_intent = row['Catégorie' if lang == 'fr' else 'Category']
-            try:
-                input_vec = vectorizer.transform([preprocess_text(question, lang)])
-            except Exception as e:
-                logger.error(f"Failed to vectorize question '{question}' in fold {fold + 1}: {e}")
-                continue
-            
-            # KNN
-            max_idx, _ = knn_model.predict(input_vec)
-            knn_answer = train_df['Réponse' if lang == 'fr' else 'Response'].iloc[max_idx]
-            y_pred_knn.append(train_df['Catégorie' if lang == 'fr' else 'Category'].iloc[max_idx])
-            
-            # Cosine
-            max_idx, _ = cosine_model.predict(input_vec)
-            cosine_answer = train_df['Réponse' if lang == 'fr' else 'Response'].iloc[max_idx]
-            y_pred_cosine.append(train_df['Catégorie' if lang == 'fr' else 'Category'].iloc[max_idx])
-            
-            # SBERT
-            if sbert_model:
-                try:
-                    max_idx, _ = sbert_model.predict(question)
-                    sbert_answer = train_df['Réponse' if lang == 'fr' else 'Response'].iloc[max_idx]
-                    y_pred_sbert.append(train_df['Catégorie' if lang == 'fr' else 'Category'].iloc[max_idx])
-                except Exception as e:
-                    logger.error(f"SBERT prediction failed in fold {fold + 1}: {e}")
-                    y_pred_sbert.append(expected_intent)  # Fallback
-            else:
-                y_pred_sbert.append(expected_intent)  # Fallback if SBERT is disabled
-            
-            # Naive Bayes
-# In evaluate_model.py, Naive Bayes prediction block
-            nb_response = nb_model.get_response(question)
-            nb_answer = nb_response['answer']
-            logger.debug(f"Naive Bayes predicted answer for question '{question}': {nb_answer}")
-            nb_idx = train_df[train_df['Réponse' if lang == 'fr' else 'Response'] == nb_answer].index
-            if len(nb_idx) > 0 and nb_idx[0] in train_df.index:
-                logger.debug(f"Match found for Naive Bayes answer: {nb_answer} at index {nb_idx[0]}")
-                y_pred_nb.append(train_df.loc[nb_idx[0], 'Catégorie' if lang == 'fr' else 'Category'])
-            else:
-                logger.warning(f"No matching answer found for Naive Bayes response: {nb_answer} in fold {fold + 1}")
-                y_pred_nb.append(expected_intent)  # Fallback to expected intent            
-            # SVM
-            intent, _ = svm_model.predict(input_vec)
-            y_pred_svm.append(intent)
-            
-            # Ensemble (majority voting on intents)
-            intents = [y_pred_knn[-1], y_pred_cosine[-1], y_pred_sbert[-1] if use_sbert else y_pred_nb[-1], y_pred_nb[-1], y_pred_svm[-1]]
-            intent_counts = pd.Series(intents).value_counts()
-            max_count = intent_counts.max()
-            top_intents = intent_counts[intent_counts == max_count].index
-            ensemble_intent = top_intents[0]  # Pick first in case of tie
-            y_pred_ensemble.append(ensemble_intent)
-            
-            # Track accuracy for response-based models
-            for model, answer in [
-                ('knn', knn_answer),
-                ('cosine', cosine_answer),
-                ('sbert', sbert_answer if sbert_model else None),
-                ('naive_bayes', nb_answer),
-                ('ensemble', train_df[train_df['Catégorie' if lang == 'fr' else 'Category'] == ensemble_intent]['Réponse' if lang == 'fr' else 'Response'].iloc[0])
-            ]:
-                if answer is None:
-                    continue
-                if answer == expected_answer:
-                    results[model]['accuracies'].append(1)
-                else:
-                    results[model]['accuracies'].append(0)
-        
-        # Compute classification report for intent-based models
-        for model, y_pred in [
-            ('knn', y_pred_knn),
-            ('cosine', y_pred_cosine),
-            ('sbert', y_pred_sbert if use_sbert else None),
-            ('naive_bayes', y_pred_nb),
-            ('svm', y_pred_svm),
-            ('ensemble', y_pred_ensemble)
-        ]:
-            if y_pred is None:
-                continue
-            report = classification_report(y_test, y_pred, zero_division=0, output_dict=True)
-            results[model]['classification_reports'].append(report)
-            logger.info(f"[{lang}] Fold {fold + 1} {model.capitalize()} Classification Report:\n{classification_report(y_test, y_pred, zero_division=0)}")
+    models = ['knn', 'cosine', 'sbert', 'naive_bayes', 'svm', 'ensemble']
+    if not use_sbert or any(fold['sbert_failed'] for fold in fold_results):
+        models.remove('sbert')
     
     # Aggregate results
     aggregated_results = {}
-    for model in results:
-        if not results[model]:
-            continue
-        mean_accuracy = np.mean(results[model]['accuracies']) if results[model]['accuracies'] else 0.0
+    for model in models:
+        folds = [fold[model] for fold in fold_results if model in fold]
+        correct = [fold['correct'] for fold in folds if fold['correct'] is not None]
+        mean_accuracy = np.mean(np.concatenate(correct)) if correct else 0.0
         aggregated_results[model] = {
             'mean_accuracy': mean_accuracy,
-            'mean_classification_report': aggregate_classification_reports(results[model]['classification_reports']),
+            'mean_classification_report': aggregate_classification_reports([fold['report'] for fold in folds]),
             'folds': k_folds
         }
         logger.info(f"[{lang}] {model.capitalize()} Mean Accuracy: {mean_accuracy:.2f}")
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from threading import Lock
+from .logging import initialize_logging
+from .metrics import count_cache
+
+logger = initialize_logging()
+
+# Increment when the extraction output format or logic changes to invalidate old entries
+EXTRACTOR_VERSION = 3
+
+CACHE_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../cache/extraction'))
+MAX_MEMORY_ENTRIES = 128
+MAX_DISK_BYTES = 50 * 1024 * 1024  # 50 MB
+
+class ExtractionCache:
+    """Two-tier (memory LRU + size-bounded disk) cache of text extracted from uploads."""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_memory_entries=MAX_MEMORY_ENTRIES, max_disk_bytes=MAX_DISK_BYTES):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._disk = OrderedDict()  # key -> file size, oldest first
+        self._disk_bytes = 0
+        self._lock = Lock()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'bytes_saved': 0}
+        self._load_disk_index()
+
+    def _load_disk_index(self):
+        """Rebuild the disk index from existing cache files, oldest first."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.json'):
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                    entries.append((stat.st_mtime, name[:-5], stat.st_size))
+            for _, key, size in sorted(entries):
+                self._disk[key] = size
+                self._disk_bytes += size
+            logger.debug(f"Extraction cache loaded {len(self._disk)} disk entries ({self._disk_bytes} bytes).")
+        except OSError as e:
+            logger.warning(f"Could not load extraction cache from {self.cache_dir}: {e}")
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    @staticmethod
+    def make_key(data, settings):
+        """Build a cache key from the SHA-256 of the uploaded bytes and the extractor settings."""
+        digest = hashlib.sha256(data).hexdigest()
+        settings_digest = hashlib.sha256(
+            json.dumps(dict(settings, version=EXTRACTOR_VERSION), sort_keys=True).encode('utf-8')
+        ).hexdigest()[:16]
+        return f"{digest}-{settings_digest}"
+
+    def get(self, key, source_size=0):
+        """Return the cached value for key, or None. source_size counts towards bytes_saved on a hit."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                self._stats['bytes_saved'] += source_size
+                count_cache('extraction', True)
+                return self._memory[key]
+            in_disk_index = key in self._disk
+
+        if in_disk_index:
+            path = self._path(key)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    value = json.load(f)
+                os.utime(path)  # Refresh recency for disk eviction
+            except (OSError, ValueError) as e:
+                logger.warning(f"Dropping unreadable extraction cache entry {key}: {e}")
+                with self._lock:
+                    self._forget_disk(key)
+            else:
+                with self._lock:
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self._remember(key, value)
+                    self._stats['disk_hits'] += 1
+                    self._stats['bytes_saved'] += source_size
+                count_cache('extraction', True)
+                return value
+
+        with self._lock:
+            self._stats['misses'] += 1
+        count_cache('extraction', False)
+        return None
+
+    def put(self, key, value):
+        """Store a JSON-serializable value in both tiers."""
+        payload = json.dumps(value, ensure_ascii=False).encode('utf-8')
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write extraction cache entry {key}: {e}")
+            with self._lock:
+                self._remember(key, value)
+            return
+
+        with self._lock:
+            self._remember(key, value)
+            self._forget_disk(key, delete=False)
+            self._disk[key] = len(payload)
+            self._disk_bytes += len(payload)
+            self._evict_disk()
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _forget_disk(self, key, delete=True):
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_bytes -= size
+        if delete:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _evict_disk(self):
+        while self._disk_bytes > self.max_disk_bytes and len(self._disk) > 1:
+            oldest = next(iter(self._disk))
+            self._forget_disk(oldest)
+            logger.debug(f"Evicted extraction cache entry {oldest}")
+
+    def clear(self):
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            for key in list(self._disk):
+                self._forget_disk(key)
+
+    def stats(self):
+        """Return hit/miss counters, hit rate and bytes of uploads served without re-extraction."""
+        with self._lock:
+            hits = self._stats['memory_hits'] + self._stats['disk_hits']
+            lookups = hits + self._stats['misses']
+            return dict(
+                self._stats,
+                hit_rate=hits / lookups if lookups else 0.0,
+                memory_entries=len(self._memory),
+                disk_entries=len(self._disk),
+                disk_bytes=self._disk_bytes
+            )
+
+_cache = None
+_cache_lock = Lock()
+
+def get_extraction_cache():
+    """Return the process-wide extraction cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ExtractionCache()
+    return _cache
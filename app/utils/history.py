@@ -1,10 +1,173 @@
+import atexit
 import json
 import os
+import threading
+import time
+from collections import OrderedDict, deque
 from flask import session
+from .json_db import append_json_array
+from .logging import initialize_logging
+
+logger = initialize_logging()
+
+# CHATBOT_HISTORY_FILE points a server at another history file (load tests)
+HISTORY_FILE = os.environ.get('CHATBOT_HISTORY_FILE', 'conversations.json')
+# Seconds the writer waits after a new conversation to batch the following ones in one write
+FLUSH_INTERVAL = float(os.environ.get('HISTORY_FLUSH_INTERVAL', 0.5))
+# Last conversations kept in memory per session (and for the whole log); more are read from the file
+SESSION_TAIL = int(os.environ.get('HISTORY_SESSION_TAIL', 100))
+# Sessions kept in memory, least recently used evicted first
+MAX_SESSIONS = int(os.environ.get('HISTORY_MAX_SESSIONS', 1000))
+
+class ConversationLog:
+    """
+    Conversation history persisted write-behind, with a bounded in-memory tail.
+
+    Memory holds the last `tail` conversations of the log and of each of the
+    `max_sessions` most recently used sessions; longer histories and evicted sessions
+    are read from the JSON file when asked for. A background thread appends new
+    conversations to the file in batches, in place (see append_json_array), so requests
+    never wait for the file. Pending conversations are flushed at exit.
+    """
+
+    def __init__(self, path=HISTORY_FILE, flush_interval=FLUSH_INTERVAL, tail=SESSION_TAIL, max_sessions=MAX_SESSIONS):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.tail = tail
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._sessions = None  # session_id -> deque of its last conversations, loaded on first use
+        self._recent = deque(maxlen=tail)
+        self._evicted = set()  # Sessions whose history is only on disk
+        self._pending = []
+        self._wakeup = threading.Event()
+        self._writer = None
+
+    def _read_file(self):
+        if not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Cannot read conversation history {self.path}: {e}")
+            return []
+
+    def _load(self):
+        """Build the tails from the file on first use (caller holds _lock)."""
+        if self._sessions is None:
+            self._sessions = OrderedDict()
+            for conversation in self._read_file():
+                self._remember(conversation)
+        return self._sessions
+
+    def _remember(self, conversation):
+        self._recent.append(conversation)
+        session_id = conversation.get('session_id')
+        if session_id in self._evicted:
+            return  # Read from the file with the rest of its history
+        tail = self._sessions.get(session_id)
+        if tail is None:
+            tail = self._sessions[session_id] = deque(maxlen=self.tail)
+            if len(self._sessions) > self.max_sessions:
+                evicted, _ = self._sessions.popitem(last=False)
+                self._evicted.add(evicted)
+        else:
+            self._sessions.move_to_end(session_id)
+        tail.append(conversation)
+
+    def append(self, conversation):
+        with self._lock:
+            self._load()
+            self._remember(conversation)
+            self._pending.append(conversation)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name='history-writer', daemon=True)
+                self._writer.start()
+        self._wakeup.set()
+
+    def get(self, session_id=None, limit=None):
+        with self._lock:
+            sessions = self._load()
+            if session_id is None:
+                tail = self._recent
+            elif session_id in self._evicted:
+                tail = None
+            else:
+                tail = sessions.get(session_id, ())
+                if tail:
+                    sessions.move_to_end(session_id)
+            # A tail that never overflowed holds the whole history
+            if tail is not None and (len(tail) < self.tail or (limit and limit <= len(tail))):
+                conversations = list(tail)
+                return conversations[-limit:] if limit else conversations
+        conversations = self._read_all()
+        if session_id is not None:
+            conversations = [c for c in conversations if c.get('session_id') == session_id]
+        if limit:
+            conversations = conversations[-limit:]
+        return conversations
+
+    def _read_all(self):
+        """Every conversation: the file, then the ones not written yet."""
+        with self._flush_lock:
+            conversations = self._read_file()
+            with self._lock:
+                conversations.extend(self._pending)
+        return conversations
+
+    def flush(self):
+        """Write the pending conversations; kept pending (and retried) if the write fails."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                try:
+                    append_json_array(self.path, batch, ensure_ascii=False)
+                except (FileNotFoundError, ValueError) as e:
+                    self._rewrite(batch, e)
+            except OSError as e:
+                logger.error(f"Cannot write conversation history {self.path}: {e}")
+                with self._lock:
+                    self._pending[:0] = batch
+                return 0
+            logger.debug("Saved %d conversations to %s", len(batch), self.path)
+            return len(batch)
+
+    def _rewrite(self, batch, reason):
+        """Start a new file with batch (missing file, or one that does not hold an array)."""
+        if os.path.exists(self.path):
+            logger.warning(f"Conversation history {self.path} cannot be appended to ({reason}), kept as {self.path}.corrupt")
+            os.replace(self.path, self.path + '.corrupt')
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(batch, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            time.sleep(self.flush_interval)  # Let the next conversations join the batch
+            self.flush()
+
+_log = None
+_log_lock = threading.Lock()
+
+def get_conversation_log():
+    """Shared conversation history."""
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = ConversationLog()
+                atexit.register(_log.flush)
+    return _log
 
 def save_conversation(question, answer, link, category, response_id):
-    history_file = 'conversations.json'
-    conversations = get_conversations()
     session_id = session.get('session_id', 'default')
     conversation = {
         'session_id': session_id,
@@ -15,20 +178,14 @@ def save_conversation(question, answer, link, category, response_id):
         'response_id': response_id,
         'rating': 'Non évalué'
     }
-    conversations.append(conversation)
-    with open(history_file, 'w', encoding='utf-8') as f:
-        json.dump(conversations, f, ensure_ascii=False, indent=2)
-    
+    get_conversation_log().append(conversation)
+
     session.setdefault('context', []).append({'question': question, 'answer': answer})
     if len(session['context']) > 5:
         session['context'] = session['context'][-5:]
 
-def get_conversations():
-    history_file = 'conversations.json'
-    if os.path.exists(history_file):
-        with open(history_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
+def get_conversations(session_id=None, limit=None):
+    return get_conversation_log().get(session_id, limit)
 
 def get_context():
-    return session.get('context', [])
\ No newline at end of file
+    return session.get('context', [])
@@ -2,40 +2,82 @@ from PIL import Image
 import pytesseract
 import logging
 import os
+import io
+from .extraction_cache import get_extraction_cache
+from .metrics import stage, count
+from .ocr_preprocess import preprocess_for_ocr, PREPROCESS_SETTINGS
+from .ocr_service import get_ocr_service
+from .script_detection import SCRIPT_OSD
+from .single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 # Configuration de Tesseract (ajustez le chemin si nécessaire)
 try:
-    pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'  # Windows
+    windows_path = r'C:\Program Files\Tesseract-OCR\tesseract.exe'  # Windows
+    # Ne pas écraser le chemin détecté ailleurs (PATH) : le service OCR partage cette configuration
+    if os.path.exists(windows_path):
+        pytesseract.pytesseract.tesseract_cmd = windows_path
 except Exception as e:
     logger.error(f"Erreur de configuration de Tesseract: {e}")
 
-def extract_text(file_path):
+OCR_LANG = 'auto'  # Langues choisies par page selon l'écriture détectée (voir script_detection)
+
+# Paramètres pris en compte dans la clé du cache d'extraction
+IMAGE_EXTRACTION_SETTINGS = {'extractor': 'image', 'ocr_lang': OCR_LANG, 'script_osd': SCRIPT_OSD, 'preprocess': PREPROCESS_SETTINGS}
+
+# Les uploads simultanés de la même image partagent un seul OCR
+_extraction_flight = SingleFlight('image_extraction')
+
+def _ocr_and_cache(data, cache, cache_key):
+    """OCR d'une image en mémoire, avec mise en cache du texte."""
+    img = preprocess_for_ocr(Image.open(io.BytesIO(data)))
+    count('ocr_pages', source='image')
+    with stage('ocr'):
+        extracted_text = get_ocr_service().ocr_image(img, lang=OCR_LANG)
+    if not extracted_text:
+        extracted_text = "Aucun texte détecté dans l'image."
+    cache.put(cache_key, {'text': extracted_text})
+    return extracted_text
+
+def extract_text(source, filename=None):
     """
     Extrait le texte d'une image (PNG/JPEG).
     
     Args:
-        file_path (str): Chemin vers le fichier image.
+        source (str | bytes | memoryview): Chemin vers le fichier image, ou son contenu
+            déjà en mémoire (upload) pour éviter tout passage par le disque.
+        filename (str): Nom d'origine du fichier, utilisé dans les journaux pour un contenu en mémoire.
     
     Returns:
         str: Texte extrait ou message d'erreur.
     """
+    file_path = source if isinstance(source, str) else (filename or '<upload>')
     try:
-        if not os.path.exists(file_path):
-            logger.error(f"Le fichier {file_path} n'existe pas.")
-            return "Erreur : fichier introuvable."
+        if isinstance(source, str):
+            if not os.path.exists(file_path):
+                logger.error(f"Le fichier {file_path} n'existe pas.")
+                return "Erreur : fichier introuvable."
+            
+            if not file_path.lower().endswith(('.png', '.jpg', '.jpeg')):
+                logger.error(f"Type de fichier non supporté: {file_path}")
+                return "Erreur : type de fichier non supporté."
+            
+            with open(file_path, 'rb') as f:
+                data = f.read()
+        else:
+            data = source
         
-        if not file_path.lower().endswith(('.png', '.jpg', '.jpeg')):
-            logger.error(f"Type de fichier non supporté: {file_path}")
-            return "Erreur : type de fichier non supporté."
+        # Réponse immédiate si la même image a déjà été extraite
+        cache = get_extraction_cache()
+        cache_key = cache.make_key(data, IMAGE_EXTRACTION_SETTINGS)
+        cached = cache.get(cache_key, source_size=len(data))
+        if cached is not None:
+            logger.debug("Image servie depuis le cache d'extraction: %s", file_path)
+            return cached['text']
         
-        img = Image.open(file_path)
-        extracted_text = pytesseract.image_to_string(img, lang='fra+eng+ara')
-        extracted_text = extracted_text.strip()
-        if not extracted_text:
-            extracted_text = "Aucun texte détecté dans l'image."
-        logger.info(f"Texte extrait de l'image: {extracted_text}")
+        extracted_text = _extraction_flight.do(cache_key, _ocr_and_cache, data, cache, cache_key)
+        logger.info("Texte extrait de l'image %s: %d caractères", file_path, len(extracted_text))
         return extracted_text
     
     except Exception as e:
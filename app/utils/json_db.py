@@ -1,9 +1,15 @@
 import json
 import os
+from threading import Lock
 from app.utils.logging import initialize_logging
+from app.utils.db import get_user_db
 
 logger = initialize_logging()
 
+# Bytes read from the end of a JSON array file to find where the next element goes
+_TAIL_BYTES = 4096
+_json_lock = Lock()
+
 def init_json_db(json_path):
     """Initialize users.json if it doesn't exist."""
     if not os.path.exists(json_path):
@@ -25,20 +31,76 @@ def read_users_json(json_path):
         logger.error(f"Error reading users from {json_path}: {e}")
         return []
 
+def _format_entry(item, ensure_ascii=True):
+    """An element of an array written by json.dump(indent=2)."""
+    return '\n'.join('  ' + line for line in json.dumps(item, indent=2, ensure_ascii=ensure_ascii).splitlines())
+
+def _array_end(f):
+    """
+    Offset just after the last element of the JSON array in f (just after '[' when empty),
+    and whether the array is empty. Raises ValueError if the file does not end with ']'.
+    """
+    size = f.seek(0, os.SEEK_END)
+    start = max(0, size - _TAIL_BYTES)
+    f.seek(start)
+    tail = f.read().rstrip()
+    if not tail.endswith(b']'):
+        raise ValueError("file does not end with ']'")
+    body = tail[:-1].rstrip()
+    if not body and start > 0:
+        raise ValueError("file ends with a blank block")
+    return start + len(body), body.endswith(b'[')
+
+def append_json_array(path, items, ensure_ascii=True):
+    """
+    Append items to the indented JSON array stored in path, in place: only the closing
+    bracket is rewritten. Raises OSError or ValueError if the file does not hold an array.
+    """
+    payload = ',\n'.join(_format_entry(item, ensure_ascii) for item in items).encode('utf-8')
+    with open(path, 'r+b') as f:
+        end, empty = _array_end(f)
+        f.seek(end)
+        f.write((b'\n' if empty else b',\n') + payload + b'\n]')
+        f.truncate()
+
 def append_user_json(json_path, user_data):
-    """Append a new user to users.json."""
-    try:
-        users = read_users_json(json_path)
-        users.append(user_data)
-        with open(json_path, 'w') as f:
-            json.dump(users, f, indent=2)
-        logger.info(f"User {user_data['username']} appended to {json_path}")
-    except Exception as e:
-        logger.error(f"Error appending user to {json_path}: {e}")
-        raise
+    """
+    Append a new user to users.json in place.
+
+    Only the closing bracket is rewritten, so the cost does not grow with the number of
+    users. A mirror that cannot be appended to (missing or malformed) is rebuilt from
+    users.db, which already holds the new user.
+    """
+    with _json_lock:
+        try:
+            append_json_array(json_path, [user_data])
+            logger.info(f"User {user_data['username']} appended to {json_path}")
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cannot append to {json_path} ({e}), rebuilding it from users.db")
+        export_users_json(json_path)
+
+def export_users_json(json_path, users=None):
+    """
+    Rewrite users.json from users.db (or from an iterable of users), streamed in batches
+    to a temporary file that then replaces the mirror. Returns the number of users.
+    """
+    if users is None:
+        users = get_user_db().iter_users()
+    tmp_path = json_path + '.tmp'
+    count = 0
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for user in users:
+            f.write((',\n' if count else '\n') + _format_entry(user))
+            count += 1
+        f.write('\n]' if count else ']')
+    os.replace(tmp_path, json_path)
+    logger.info(f"Exported {count} users to {json_path}")
+    return count
 
 def get_next_json_id(users):
     """Get the next available user ID for JSON."""
     if not users:
         return 1
-    return max(user['id'] for user in users) + 1
\ No newline at end of file
+    return max(user['id'] for user in users) + 1
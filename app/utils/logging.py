@@ -1,12 +1,149 @@
+import atexit
+import json
 import logging
 import os
+import queue
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+# 'json' (one object per line) or 'text'
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+# Rotated log file; LOG_FILE= (empty) logs to stderr only
+LOG_FILE = os.environ.get('LOG_FILE', os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../logs/app.log')))
+LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 5))
+# Share of DEBUG/INFO records kept per logger or module, e.g. "app.utils.pdf_processing=0.1,data_manager=0.5"
+LOG_SAMPLING = os.environ.get('LOG_SAMPLING', '')
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# LogRecord attributes; anything else passed through extra= is added to JSON records
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+_setup_lock = threading.Lock()
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, location and extra fields."""
+
+    def format(self, record):
+        payload = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'thread': record.threadName
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exception'] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a share `rate` of the DEBUG/INFO records of each call site of the sampled loggers.
+
+    Rates are keyed by module name (for modules logging through the shared 'app' logger)
+    or by logger name, which also covers its children (the most specific name wins).
+    Warnings and errors are never dropped. Sampling is counted per call site (file, line)
+    so that one chatty site does not silence the others. Each site accumulates `rate` of
+    credit per record and a record is kept whenever a whole unit is available, so any rate
+    is honoured (0.7 keeps 7 records in 10) and the first record of a site is always kept.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = dict(rates)
+        self._credits = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parse(spec):
+        rates = {}
+        for item in spec.split(','):
+            name, sep, rate = item.partition('=')
+            if sep and name.strip():
+                rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+        return rates
+
+    def _rate(self, record):
+        if record.module in self.rates:
+            return self.rates[record.module]
+        name = record.name
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record)
+        if rate >= 1.0:
+            return True
+        if rate <= 0.0:
+            return False
+        site = (record.pathname, record.lineno)
+        with self._lock:
+            credit = self._credits.get(site, 1.0)
+            keep = credit >= 1.0 - 1e-9  # Tolerate float drift from summing e.g. 0.1 ten times
+            if keep:
+                credit -= 1.0
+            self._credits[site] = credit + rate
+        return keep
+
+class _QueueHandler(QueueHandler):
+    """Queue handler that leaves all formatting, tracebacks included, to the writer thread."""
+
+    def prepare(self, record):
+        # Resolve the message and traceback now: args and exc_info may not survive the thread hop
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(vars(record))
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+def _build_handlers():
+    formatter = JsonFormatter() if LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if LOG_FILE:
+        try:
+            os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+            handlers.append(RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'))
+        except OSError as e:
+            logging.getLogger('app').warning(f"Cannot write log file {LOG_FILE}: {e}")
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
 
 def initialize_logging():
+    """
+    Return the 'app' logger, configured on first call.
+
+    Records go through a queue to a background QueueListener that formats them (JSON by
+    default) and writes them to stderr and the rotated LOG_FILE, so request threads only
+    pay for an enqueue. Loggers named app.* propagate to it.
+    """
+    global _listener
     logger = logging.getLogger('app')
-    logger.setLevel(logging.INFO)
-    if not logger.handlers:
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-    return logger
\ No newline at end of file
+    if _listener is None:
+        with _setup_lock:
+            if _listener is None:
+                log_queue = queue.SimpleQueue()
+                handler = _QueueHandler(log_queue)
+                if LOG_SAMPLING:
+                    handler.addFilter(SamplingFilter(SamplingFilter.parse(LOG_SAMPLING)))
+                logger.setLevel(LOG_LEVEL)
+                logger.addHandler(handler)
+                _listener = QueueListener(log_queue, *_build_handlers(), respect_handler_level=True)
+                _listener.start()
+                atexit.register(_listener.stop)  # Flush the queue at exit
+    return logger
@@ -0,0 +1,204 @@
+import hmac
+import os
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from flask import g, request
+
+# METRICS_ENABLED=0 turns stage timers and counters into no-ops and hides /metrics
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+# /metrics is served to these client addresses, or to any client sending METRICS_TOKEN as a bearer token
+METRICS_ALLOWED_IPS = {ip.strip() for ip in os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()}
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRIC_PREFIX = 'chatbot_'
+# Histogram buckets (seconds), from sub-millisecond model calls up to OCR and web search
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_HELP = {
+    'requests_total': ('counter', 'HTTP requests by endpoint, method and status.'),
+    'request_duration_seconds': ('histogram', 'HTTP request duration by endpoint.'),
+    'stage_duration_seconds': ('histogram', 'Duration of the processing stages of a request.'),
+    'cache_hits_total': ('counter', 'Cache lookups served from the cache.'),
+    'cache_misses_total': ('counter', 'Cache lookups that fell through to the computation.'),
+    'fallbacks_total': ('counter', 'Low-confidence answers sent to a fallback, by kind and outcome.'),
+    'ocr_pages_total': ('counter', 'Pages and images sent to OCR.')
+}
+
+# Stage durations of the current request, name -> seconds (None outside a request)
+_request_stages = ContextVar('request_stages', default=None)
+_NULL_STAGE = nullcontext()
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+class MetricsRegistry:
+    """
+    In-process counters and histograms rendered in the Prometheus text format.
+
+    Series are keyed by metric name and sorted label pairs. Values are per process: with
+    several worker processes, each one exposes its own /metrics.
+    """
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}    # name -> {labels: value}
+        self._histograms = {}  # name -> {labels: [bucket counts..., sum, count]}
+
+    def inc(self, name, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def get(self, name, **labels):
+        """Current value of a counter, or (sum, count) of a histogram, for one label set."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            if name in self._histograms:
+                state = self._histograms[name].get(key)
+                return (state[-2], state[-1]) if state else (0.0, 0)
+            return self._counters.get(name, {}).get(key, 0)
+
+    def render(self):
+        """Exposition text of every series (cumulative buckets for histograms)."""
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: {k: list(v) for k, v in series.items()} for name, series in self._histograms.items()}
+        lines = []
+        for name in sorted(set(counters) | set(histograms)):
+            full_name = METRIC_PREFIX + name
+            kind, help_text = METRIC_HELP.get(name, ('histogram' if name in histograms else 'counter', name))
+            lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} {kind}')
+            for labels, value in sorted(counters.get(name, {}).items()):
+                lines.append(f'{full_name}{_format_labels(labels)} {value}')
+            for labels, state in sorted(histograms.get(name, {}).items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state):
+                    cumulative += count
+                    lines.append(f'{full_name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+                lines.append(f'{full_name}_bucket{_format_labels(labels, [("le", "+Inf")])} {state[-1]}')
+                lines.append(f'{full_name}_sum{_format_labels(labels)} {state[-2]:.6f}')
+                lines.append(f'{full_name}_count{_format_labels(labels)} {state[-1]}')
+        return '\n'.join(lines) + '\n'
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+def get_metrics():
+    """Shared metrics registry of the process."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = MetricsRegistry()
+    return _metrics
+
+class _Stage:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        get_metrics().observe('stage_duration_seconds', elapsed, stage=self.name)
+        stages = _request_stages.get()
+        if stages is not None:
+            stages[self.name] = stages.get(self.name, 0.0) + elapsed
+        return False
+
+def stage(name):
+    """
+    Context manager timing one processing stage.
+
+    The duration goes to the stage histogram and, inside a request, to its Server-Timing
+    header (repeated stages are summed). A shared no-op when metrics are disabled.
+    """
+    if not METRICS_ENABLED:
+        return _NULL_STAGE
+    return _Stage(name)
+
+def request_stages():
+    """Stage durations (seconds) recorded so far in the current request, by stage name."""
+    return dict(_request_stages.get() or {})
+
+def count(name, value=1, **labels):
+    """Increment counter name (without prefix or _total) by value."""
+    if METRICS_ENABLED:
+        get_metrics().inc(f'{name}_total', value, **labels)
+
+def count_cache(cache, hit):
+    """Count a cache lookup as a hit or a miss."""
+    if METRICS_ENABLED:
+        get_metrics().inc('cache_hits_total' if hit else 'cache_misses_total', cache=cache)
+
+def server_timing(stages, total=None):
+    """Server-Timing header value for stage durations in seconds."""
+    entries = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in stages.items()]
+    if total is not None:
+        entries.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(entries)
+
+def metrics_access_allowed():
+    """Whether the current request may read /metrics (allowed address or bearer token)."""
+    if request.remote_addr in METRICS_ALLOWED_IPS:
+        return True
+    if not METRICS_TOKEN:
+        return False
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(token.strip().encode(), METRICS_TOKEN.encode())
+
+def init_metrics(app):
+    """Time every request and add its stage timings as a Server-Timing header."""
+    if not METRICS_ENABLED:
+        return
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_token = _request_stages.set({})
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or 'unmatched'  # Endpoint names keep label cardinality bounded
+        metrics = get_metrics()
+        metrics.inc('requests_total', endpoint=endpoint, method=request.method, status=str(response.status_code))
+        metrics.observe('request_duration_seconds', elapsed, endpoint=endpoint)
+        response.headers['Server-Timing'] = server_timing(_request_stages.get() or {}, total=elapsed)
+        return response
+
+    @app.teardown_request
+    def _reset_request_stages(exc):
+        token = g.pop('metrics_token', None)
+        if token is not None:
+            _request_stages.reset(token)
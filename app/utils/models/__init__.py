@@ -3,4 +3,5 @@ from .svm_model import SVMModel
 from .cosine_model import CosineModel
 from .sbert_model import SBERTModel
 from .naive_bayes import NaiveBayesModel
-__all__ = ['CosineModel', 'KNNModel', 'NaiveBayesModel', 'SBERTModel', 'SVMModel']
\ No newline at end of file
+from .ensemble_model import EnsembleModel
+__all__ = ['CosineModel', 'EnsembleModel', 'KNNModel', 'NaiveBayesModel', 'SBERTModel', 'SVMModel']
\ No newline at end of file
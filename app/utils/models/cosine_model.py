@@ -14,4 +14,9 @@ class CosineModel:
         similarities = cosine_similarity(input_vec, self.X)
         max_idx = similarities.argmax()
         confidence = float(similarities.max())
-        return max_idx, confidence
\ No newline at end of file
+        return max_idx, confidence
+
+    def predict_batch(self, input_vecs):
+        """Predict the closest question index and confidence for each row of input_vecs."""
+        similarities = cosine_similarity(input_vecs, self.X)
+        return similarities.argmax(axis=1), similarities.max(axis=1)
\ No newline at end of file
@@ -0,0 +1,112 @@
+import os
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.model_selection import KFold
+from .naive_bayes import NaiveBayesModel
+from .svm_model import SVMModel
+from ..logging import initialize_logging
+
+logger = initialize_logging()
+
+# Fusion weights of the row scores, normalized to sum to 1.
+# Override with ENSEMBLE_WEIGHTS="similarity:0.5,naive_bayes:0.3,intent:0.2"
+DEFAULT_WEIGHTS = {'similarity': 0.5, 'naive_bayes': 0.3, 'intent': 0.2}
+# Folds of the held-out predictions the confidence calibrator is fitted on
+CALIBRATION_FOLDS = 5
+# Correct and incorrect held-out answers each needed to fit the calibrator
+MIN_CALIBRATION_SAMPLES = 5
+
+def parse_weights(spec):
+    """Weights dict from a "name:weight,..." string; missing names keep their default."""
+    weights = dict(DEFAULT_WEIGHTS)
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        name, _, value = item.partition(':')
+        if name not in DEFAULT_WEIGHTS:
+            raise ValueError(f"Unknown ensemble weight: {name}")
+        weights[name] = float(value)
+    return weights
+
+def fit_calibrator(df, vectorizer, X, lang='fr', weights=None, k_folds=CALIBRATION_FOLDS):
+    """
+    Fit Platt scaling of the fused score on cross-validated predictions.
+
+    Each question is answered by an ensemble trained on the other folds, and the
+    prediction is correct when the returned row has the same answer. Most held-out
+    questions have no other phrasing in the dataset, so their share says more about the
+    dataset than about live traffic: both outcomes are weighted to an equal prior.
+
+    Returns:
+        LogisticRegression: maps fused scores to P(correct answer), or None when either
+        outcome has fewer than MIN_CALIBRATION_SAMPLES held-out questions.
+    """
+    answer_col = 'Réponse' if lang == 'fr' else 'Response'
+    _, answer_codes = np.unique(df[answer_col].astype(str).to_numpy(), return_inverse=True)
+    scores, correct = [], []
+    for train_idx, test_idx in KFold(n_splits=min(k_folds, len(df)), shuffle=True, random_state=42).split(X):
+        train_df = df.iloc[train_idx].reset_index(drop=True)
+        X_train = X[train_idx]
+        try:
+            ensemble = EnsembleModel(X_train, SVMModel(train_df, X_train, lang=lang),
+                                     NaiveBayesModel(train_df, vectorizer, X_train, lang=lang),
+                                     train_df, lang=lang, weights=weights)
+        except ValueError as e:  # e.g. a single category in the training folds
+            logger.debug(f"Calibration fold skipped ({lang}): {e}")
+            continue
+        indices, confidences, _ = ensemble.predict_batch(X[test_idx])
+        scores.extend(confidences)
+        correct.extend(answer_codes[train_idx][indices] == answer_codes[test_idx])
+    scores, correct = np.array(scores).reshape(-1, 1), np.array(correct, dtype=bool)
+    positives = int(correct.sum())
+    if min(positives, len(correct) - positives) < MIN_CALIBRATION_SAMPLES:
+        logger.warning(f"Ensemble confidence left uncalibrated ({lang}): {positives} correct and "
+                       f"{len(correct) - positives} incorrect held-out answers")
+        return None
+    calibrator = LogisticRegression(class_weight='balanced').fit(scores, correct)
+    logger.info(f"Ensemble confidence calibrated ({lang}) on {len(correct)} held-out answers ({positives} correct).")
+    return calibrator
+
+class EnsembleModel:
+    def __init__(self, X, svm, naive_bayes, df, lang='fr', weights=None, calibrator=None):
+        """
+        Initialize the score-fusion ensemble over the language's fitted models.
+
+        Every dataset row gets three scores from the same query vector: its cosine
+        similarity (the kNN and cosine models' score), the Naive Bayes probability of its
+        answer and the SVM probability of its category. The best row is the one with the
+        highest weighted sum. Its confidence is that sum mapped through the calibrator
+        (see fit_calibrator), so the 0.3 fallback threshold applies to the probability of
+        a correct answer; without a calibrator it is the raw weighted sum.
+        """
+        self.X = X
+        self.svm = svm
+        self.naive_bayes = naive_bayes
+        self.calibrator = calibrator
+        weights = weights or parse_weights(os.environ.get('ENSEMBLE_WEIGHTS'))
+        total = sum(weights.values())
+        if total <= 0:
+            raise ValueError("Ensemble weights must sum to a positive value")
+        self.weights = np.array([weights['similarity'], weights['naive_bayes'], weights['intent']]) / total
+        # Column of each row's category in the SVM probabilities
+        self.row_categories = df['Catégorie' if lang == 'fr' else 'Category'].to_numpy()
+        encoded = svm.label_encoder.transform(self.row_categories)
+        self.row_intents = np.searchsorted(svm.model.classes_, encoded)
+        logger.debug(f"Ensemble model initialized (weights: {dict(zip(DEFAULT_WEIGHTS, self.weights.round(3)))}).")
+
+    def scores(self, input_vecs):
+        """Fused score of every dataset row for each query, and the SVM probabilities."""
+        intent_probs = self.svm.model.predict_proba(input_vecs)
+        scores = self.weights[0] * cosine_similarity(input_vecs, self.X)
+        scores += self.weights[1] * self.naive_bayes.model.predict_proba(input_vecs)[:, self.naive_bayes.row_classes]
+        scores += self.weights[2] * intent_probs[:, self.row_intents]
+        return scores, intent_probs
+
+    def predict_batch(self, input_vecs):
+        """Best row, its (calibrated) confidence and its category for each row of input_vecs."""
+        scores, _ = self.scores(input_vecs)
+        indices = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(indices)), indices]
+        if self.calibrator is not None:
+            confidences = self.calibrator.predict_proba(confidences.reshape(-1, 1))[:, 1]
+        # The intent is the returned row's category, so answer and intent always agree
+        return indices, confidences, self.row_categories[indices]
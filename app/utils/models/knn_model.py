@@ -15,4 +15,9 @@ class KNNModel:
         distances, indices = self.model.kneighbors(input_vec, n_neighbors=1)
         max_idx = indices[0][0]
         confidence = 1 - distances[0][0]  # Convert distance to similarity score
-        return max_idx, confidence
\ No newline at end of file
+        return max_idx, confidence
+
+    def predict_batch(self, input_vecs):
+        """Predict the closest question index and confidence for each row of input_vecs."""
+        distances, indices = self.model.kneighbors(input_vecs, n_neighbors=1)
+        return indices[:, 0], 1 - distances[:, 0]
\ No newline at end of file
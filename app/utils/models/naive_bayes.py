@@ -1,113 +1,100 @@
+import numpy as np
 import pandas as pd
-import uuid
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
-import nltk
-import logging
+from ..logging import initialize_logging
 
-logger = logging.getLogger(__name__)
+logger = initialize_logging()
+
+# Most probable answers among which the best-rated one is preferred
+TOP_CANDIDATES = 3
+# Light smoothing: TF-IDF weights are small, a larger alpha flattens every answer's probability
+NB_ALPHA = 0.01
 
 class NaiveBayesModel:
     def __init__(self, df, vectorizer=None, tfidf_matrix=None, lang='fr'):
-        self.df = df.copy()
+        """
+        Initialize the Naive Bayes retrieval model.
+
+        Rows are grouped by distinct answer: each answer is one class, trained on the
+        TF-IDF vectors of all the questions it answers (the language's shared vectorizer
+        and matrix when given). Each class is represented by its best-rated row.
+        """
+        self.df = df
         self.lang = lang
-        
-        # Define language-specific column names
         response_col = 'Réponse' if lang == 'fr' else 'Response'
-        category_col = 'Catégorie' if lang == 'fr' else 'Category'
-        link_col = 'Lien' if lang == 'fr' else 'Link'
-        
+
         # Validate required columns
-        required_columns = ['Question', response_col, 'Processed_Question']
-        missing_columns = [col for col in required_columns if col not in self.df.columns]
+        missing_columns = [col for col in ['Question', response_col] if col not in df.columns]
         if missing_columns:
             logger.error(f"Colonnes manquantes dans le dataset ({lang}): {missing_columns}")
             raise ValueError(f"Dataset manque les colonnes: {missing_columns}")
-        
-        # Add response_id if not present
-        if 'response_id' not in self.df.columns:
-            logger.info("Ajout de la colonne response_id au dataset")
-            self.df['response_id'] = [str(uuid.uuid4()) for _ in range(len(self.df))]
-        
-        # Ensure Rating column exists
-        if 'Rating' not in self.df.columns:
-            logger.info("Ajout de la colonne Rating au dataset")
-            self.df['Rating'] = 0
-        
-        self.vectorizer = vectorizer or TfidfVectorizer()
-        # Use provided tfidf_matrix if available, otherwise compute it
-        self.tfidf_matrix = tfidf_matrix if tfidf_matrix is not None else self.vectorizer.fit_transform(self.df['Processed_Question'])
-        self.model = MultinomialNB()
-        self.model.fit(self.tfidf_matrix, self.df.index)
-        self.response_col = response_col
-        self.category_col = category_col
-        self.link_col = link_col
 
-    def get_response(self, question):
-        try:
-            if not question or not isinstance(question, str) or question.strip() == "":
-                logger.warning("Question vide ou invalide reçue")
-                return {
-                    'answer': 'Veuillez fournir une question valide.',
-                    'link': '',
-                    'category': 'Général',
-                    'confidence': 0.0,
-                    'response_id': '',
-                    'ask_for_response': True
-                }
-            
-            processed_question = self.preprocess_text(question)
-            question_tfidf = self.vectorizer.transform([processed_question])
-            probabilities = self.model.predict_proba(question_tfidf)[0]
-            
-            # Get top 3 predictions to consider ratings
-            top_indices = probabilities.argsort()[-3:][::-1]
-            max_rating = -float('inf')
-            best_index = top_indices[0]
-            
-            # Select highest-rated response among top predictions
-            for idx in top_indices:
-                current_rating = self.df.iloc[idx]['Rating']
-                if current_rating > max_rating:
-                    max_rating = current_rating
-                    best_index = idx
-                elif current_rating == max_rating and probabilities[idx] > probabilities[best_index]:
-                    best_index = idx
-        
-            
-            predicted_index = best_index
-            confidence = probabilities[predicted_index]
-            row = self.df.iloc[predicted_index]
-            logger.debug(f"Selected answer: {row[self.response_col]} for question: {question}, available answers: {self.df[self.response_col].tolist()}")
-            return {
-                'answer': row[self.response_col],
-                'link': row[self.link_col],
-                'category': row[self.category_col],
-                'confidence': confidence,
-                'response_id': row['response_id'],
-                'ask_for_response': confidence < 0.3 or row['Rating'] < -2
-            }
+        if vectorizer is None or tfidf_matrix is None:
+            from ..preprocess import initialize_vectorizer  # app.utils imports this module first
+            vectorizer, tfidf_matrix = initialize_vectorizer(df.copy(), lang)
+        self.vectorizer = vectorizer
+
+        # One class per distinct answer
+        self.row_classes, answers = pd.factorize(df[response_col].astype(str))
+        ratings = pd.to_numeric(df['Rating'], errors='coerce').fillna(0).to_numpy(dtype=float) \
+            if 'Rating' in df.columns else np.zeros(len(df))
+        # Representative row of each class: its best-rated row (first one on ties)
+        order = np.lexsort((np.arange(len(df)), -ratings, self.row_classes))
+        first = np.r_[True, self.row_classes[order][1:] != self.row_classes[order][:-1]]
+        self.class_rows = order[first]
+        self.class_ratings = ratings[self.class_rows]
 
+        # Uniform prior: an answer shared by many questions should not win by default
+        self.model = MultinomialNB(alpha=NB_ALPHA, fit_prior=False)
+        self.model.fit(tfidf_matrix, self.row_classes)
+        logger.debug(f"Naive Bayes model initialized: {len(df)} questions, {len(answers)} answers (language: {lang}).")
 
-        except Exception as e:
-            logger.error(f"Erreur dans get_response: {e}", exc_info=True)
+    def predict(self, input_vecs, k=1):
+        """
+        Top-k answers for each row of input_vecs.
+
+        The TOP_CANDIDATES most probable answers (at least k) are reordered by rating,
+        then probability, so a well-rated answer wins over a slightly more probable one.
+
+        Returns:
+            tuple: (rows, confidences), arrays of shape (n, k): dataset row of each
+            answer and its probability.
+        """
+        probabilities = self.model.predict_proba(input_vecs)
+        n_candidates = min(max(k, TOP_CANDIDATES), probabilities.shape[1])
+        candidates = np.argpartition(-probabilities, n_candidates - 1, axis=1)[:, :n_candidates]
+        candidate_probs = np.take_along_axis(probabilities, candidates, axis=1)
+        order = np.lexsort((-candidate_probs, -self.class_ratings[candidates]), axis=1)[:, :k]
+        classes = np.take_along_axis(candidates, order, axis=1)
+        return self.class_rows[classes], np.take_along_axis(candidate_probs, order, axis=1)
+
+    def predict_batch(self, input_vecs):
+        """Predict the best answer row and confidence for each row of input_vecs."""
+        rows, confidences = self.predict(input_vecs)
+        return rows[:, 0], confidences[:, 0]
+
+    def get_response(self, question):
+        """Response dict for a raw question."""
+        if not question or not isinstance(question, str) or question.strip() == "":
+            logger.warning("Question vide ou invalide reçue")
             return {
-                'answer': 'Désolé, je n’ai pas compris.',
+                'answer': 'Veuillez fournir une question valide.',
                 'link': '',
                 'category': 'Général',
                 'confidence': 0.0,
                 'response_id': '',
                 'ask_for_response': True
             }
-
-    def preprocess_text(self, text):
-        import string
-        from nltk.corpus import stopwords
-        from nltk.stem.snowball import FrenchStemmer, EnglishStemmer
-        text = text.lower()
-        text = ''.join(c for c in text if c not in '0123456789' + string.punctuation)
-        tokens = nltk.word_tokenize(text, language='french' if self.lang == 'fr' else 'english')
-        stemmer = FrenchStemmer() if self.lang == 'fr' else EnglishStemmer()
-        stop_words = stopwords.words('french' if self.lang == 'fr' else 'english')
-        tokens = [stemmer.stem(word) for word in tokens if word not in stop_words]
-        return ' '.join(tokens)
\ No newline at end of file
+        from ..preprocess import preprocess_text
+        input_vec = self.vectorizer.transform([preprocess_text(question, self.lang)])
+        rows, confidences = self.predict_batch(input_vec)
+        row = self.df.iloc[rows[0]]
+        rating = self.class_ratings[self.row_classes[rows[0]]]
+        return {
+            'answer': row['Réponse' if self.lang == 'fr' else 'Response'],
+            'link': row['Lien' if self.lang == 'fr' else 'Link'],
+            'category': row['Catégorie' if self.lang == 'fr' else 'Category'],
+            'confidence': float(confidences[0]),
+            'response_id': row.get('response_id', ''),
+            'ask_for_response': bool(confidences[0] < 0.3 or rating < -2)
+        }
@@ -17,4 +17,10 @@ class SBERTModel:
         similarities = cosine_similarity(input_embedding.cpu(), self.embeddings.cpu())
         max_idx = similarities.argmax()
         confidence = float(similarities[0, max_idx])
-        return max_idx, confidence
\ No newline at end of file
+        return max_idx, confidence
+
+    def predict_batch(self, input_sentences):
+        """Predict the closest question index and confidence for each input sentence."""
+        input_embeddings = self.model.encode(list(input_sentences), convert_to_tensor=True)
+        similarities = cosine_similarity(input_embeddings.cpu(), self.embeddings.cpu())
+        return similarities.argmax(axis=1), similarities.max(axis=1)
@@ -24,4 +24,10 @@ class SVMModel:
         intent_idx = self.model.predict(input_vec)[0]
         intent = self.label_encoder.inverse_transform([intent_idx])[0]
         confidence = self.model.predict_proba(input_vec)[0].max()
-        return intent, confidence
\ No newline at end of file
+        return intent, confidence
+
+    def predict_batch(self, input_vecs):
+        """Predict the intent and confidence for each row of input_vecs."""
+        intents = self.label_encoder.inverse_transform(self.model.predict(input_vecs))
+        confidences = self.model.predict_proba(input_vecs).max(axis=1)
+        return intents, confidences
\ No newline at end of file
@@ -0,0 +1,188 @@
+import logging
+import time
+import numpy as np
+from PIL import Image
+from .logging import initialize_logging
+
+logger = initialize_logging()
+
+# Hauteur de ligne de texte visée (px) : au-delà, l'image est réduite avant l'OCR
+TARGET_TEXT_HEIGHT = 40
+# Largeur de la miniature utilisée pour les analyses (hauteur de texte, inclinaison)
+ANALYSIS_WIDTH = 1000
+# Pourcentage de pixels ignorés à chaque extrémité de l'histogramme lors de l'étirement du contraste
+CONTRAST_CLIP_PERCENT = 0.5
+# Angles testés pour le redressement (degrés)
+DESKEW_MAX_ANGLE = 5.0
+DESKEW_STEP = 0.5
+# En deçà (degrés), l'inclinaison est négligeable pour Tesseract : l'image n'est pas tournée
+DESKEW_MIN_ANGLE = 0.5
+
+# Paramètres par défaut, repris dans les clés du cache d'extraction
+PREPROCESS_SETTINGS = {
+    'target_text_height': TARGET_TEXT_HEIGHT,
+    'contrast_clip_percent': CONTRAST_CLIP_PERCENT,
+    'binarize': False,
+    'deskew': False
+}
+
+def _otsu_threshold(histogram):
+    """
+    Seuil d'Otsu calculé sur un histogramme de 256 niveaux de gris : premier niveau de la
+    classe claire, les pixels strictement inférieurs forment l'encre.
+    """
+    hist = np.asarray(histogram[:256], dtype=np.float64)
+    total = hist.sum()
+    if total == 0:
+        return 128
+    levels = np.arange(256)
+    weight_bg = np.cumsum(hist)
+    weight_fg = total - weight_bg
+    cum_mean = np.cumsum(hist * levels)
+    mean_bg = cum_mean / np.maximum(weight_bg, 1)
+    mean_fg = (cum_mean[-1] - cum_mean) / np.maximum(weight_fg, 1)
+    between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(between.argmax()) + 1  # argmax est le dernier niveau de la classe sombre
+
+def _analysis_thumbnail(image):
+    """Miniature en niveaux de gris pour les analyses, avec son facteur d'échelle."""
+    factor = max(1, image.width // ANALYSIS_WIDTH)
+    thumb = image.reduce(factor) if factor > 1 else image
+    return thumb, factor
+
+def _ink_mask(image):
+    """Masque booléen des pixels sombres (encre) d'une image en niveaux de gris."""
+    lo, hi = image.getextrema()
+    # Le seuil d'Otsu peut séparer deux fonds clairs (bandeau gris sur page blanche) :
+    # il est plafonné au milieu de la plage de niveaux
+    threshold = min(_otsu_threshold(image.histogram()), (lo + hi) // 2)
+    return np.asarray(image) < threshold
+
+def _ink_profile(image):
+    """Nombre de pixels d'encre par rangée, sans les filets et bordures pleine largeur."""
+    row_ink = _ink_mask(image).sum(axis=1)
+    row_ink[row_ink > 0.8 * image.width] = 0
+    return row_ink
+
+def _text_lines(row_ink, width, min_height=2):
+    """Bornes (début, fin) des suites de rangées contenant de l'encre."""
+    ink_rows = row_ink > max(1, width // 200)
+    padded = np.concatenate(([False], ink_rows, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    return [(start, end) for start, end in zip(edges[0::2], edges[1::2]) if end - start >= min_height]
+
+def estimate_text_height(image):
+    """
+    Estime la hauteur médiane des lignes de texte (px, à l'échelle de l'image) à partir
+    du profil horizontal d'encre d'une miniature. Retourne None si aucune ligne n'est trouvée.
+    """
+    thumb, factor = _analysis_thumbnail(image)
+    lo, hi = thumb.getextrema()
+    if hi - lo < 32:  # Image quasi uniforme : pas de texte exploitable
+        return None
+    lines = _text_lines(_ink_profile(thumb), thumb.width)
+    if not lines:
+        return None
+    return float(np.median([end - start for start, end in lines])) * factor
+
+def estimate_skew(image):
+    """
+    Estime l'inclinaison du texte (degrés) par maximisation de la variance du profil horizontal.
+    Les angles sont testés du plus petit au plus grand en valeur absolue : à score égal
+    (ligne courte, peu de texte), l'angle le plus faible l'emporte.
+    """
+    thumb, _ = _analysis_thumbnail(image)
+    threshold = _otsu_threshold(thumb.histogram())
+    # Encre en blanc sur fond noir pour que la rotation remplisse avec du fond
+    inverted = thumb.point([255 if i < threshold else 0 for i in range(256)])
+    best_angle, best_score = 0.0, -1.0
+    angles = sorted(np.arange(-DESKEW_MAX_ANGLE, DESKEW_MAX_ANGLE + DESKEW_STEP / 2, DESKEW_STEP), key=abs)
+    for angle in angles:
+        rotated = inverted.rotate(float(angle), resample=Image.NEAREST, fillcolor=0)
+        profile = np.asarray(rotated, dtype=np.uint8).sum(axis=1, dtype=np.int64)
+        score = float(profile.var())
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+def _contrast_lut(histogram):
+    """Table de correspondance étirant le contraste entre les percentiles bas et haut."""
+    hist = np.asarray(histogram[:256], dtype=np.int64)
+    cumulative = np.cumsum(hist)
+    clip = cumulative[-1] * CONTRAST_CLIP_PERCENT / 100
+    lo = int(np.searchsorted(cumulative, clip, side='right'))
+    hi = int(np.searchsorted(cumulative, cumulative[-1] - clip, side='left'))
+    if hi <= lo:  # Image uniforme : aucun étirement possible
+        return None
+    levels = np.arange(256, dtype=np.int32)
+    return np.clip((levels - lo) * 255 // (hi - lo), 0, 255).astype(np.uint8).tolist()
+
+def preprocess_for_ocr(image, target_text_height=TARGET_TEXT_HEIGHT, binarize=False, deskew=False, with_report=False):
+    """
+    Prépare une image pour l'OCR : niveaux de gris, réduction à la hauteur de texte visée,
+    étirement du contraste par table de correspondance et, en option, redressement et binarisation.
+    Toutes les étapes travaillent en uint8 (PIL / tables de correspondance), sans tableau flottant
+    de la taille de l'image.
+
+    Args:
+        image (PIL.Image): Image source.
+        target_text_height (int): Hauteur de ligne visée ; None désactive la réduction.
+        binarize (bool): Applique un seuillage d'Otsu.
+        deskew (bool): Redresse le texte incliné.
+        with_report (bool): Retourne aussi la durée et la taille allouée de chaque étape.
+
+    Returns:
+        PIL.Image, ou (PIL.Image, list) si with_report est vrai.
+    """
+    report = []
+
+    def record(stage, start, img, **extra):
+        report.append(dict({
+            'stage': stage,
+            'time_ms': round((time.perf_counter() - start) * 1000, 3),
+            'size': img.size,
+            'bytes': img.width * img.height * len(img.getbands())
+        }, **extra))
+
+    start = time.perf_counter()
+    if image.mode != 'L':
+        image = image.convert('L')
+    record('grayscale', start, image)
+
+    if target_text_height:
+        start = time.perf_counter()
+        text_height = estimate_text_height(image)
+        scale = target_text_height / text_height if text_height else 1.0
+        if scale < 0.9:
+            factor = int(1 / scale)
+            if factor > 1:
+                image = image.reduce(factor)  # Réduction entière rapide (moyenne par blocs)
+            new_size = (max(1, round(image.width * scale * factor)), max(1, round(image.height * scale * factor)))
+            if new_size != image.size:
+                image = image.resize(new_size, Image.BILINEAR)
+        record('downscale', start, image, text_height=text_height, scale=round(min(scale, 1.0), 3))
+
+    start = time.perf_counter()
+    lut = _contrast_lut(image.histogram())
+    if lut is not None:
+        image = image.point(lut)
+    record('contrast', start, image, applied=lut is not None)
+
+    if deskew:
+        start = time.perf_counter()
+        angle = estimate_skew(image)
+        if abs(angle) > DESKEW_MIN_ANGLE:
+            image = image.rotate(angle, resample=Image.BILINEAR, expand=True, fillcolor=255)
+        record('deskew', start, image, angle=angle)
+
+    if binarize:
+        start = time.perf_counter()
+        threshold = _otsu_threshold(image.histogram())
+        image = image.point([0 if i < threshold else 255 for i in range(256)])
+        record('binarize', start, image, threshold=threshold)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Prétraitement OCR: %s", [(s['stage'], s['time_ms']) for s in report])
+    if with_report:
+        return image, report
+    return image
@@ -0,0 +1,172 @@
+import io
+import os
+import queue
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+import pytesseract
+from .logging import initialize_logging
+from .script_detection import select_languages, SCRIPT_LANGS
+
+logger = initialize_logging()
+
+try:
+    # Liaison directe à l'API C de Tesseract : les modèles restent chargés entre deux images
+    import tesserocr
+except ImportError:
+    tesserocr = None
+    logger.warning("tesserocr non installé : l'OCR passe par la commande tesseract, qui relance un processus "
+                   "et recharge les modèles à chaque image (pip install tesserocr pour des workers persistants).")
+
+OCR_LANG = 'fra+eng+ara'
+AUTO_LANG = 'auto'  # Langues choisies par image selon l'écriture détectée
+DEFAULT_PSM = 3  # Valeur par défaut de Tesseract (segmentation automatique)
+LATENCY_WINDOW = 500  # Nombre de mesures conservées pour les percentiles
+# Threads OpenMP par processus tesseract du repli en ligne de commande. Lu sans modifier
+# l'environnement du processus : la valeur n'est transmise qu'aux processus tesseract.
+# (Les traineddata chargés par tesserocr n'utilisent pas OpenMP dans les wheels publiées.)
+OMP_THREAD_LIMIT = max(1, int(os.environ.get('OMP_THREAD_LIMIT') or 1))
+
+def _run_tesseract(image, lang, psm):
+    """Reconnaît une image avec la commande tesseract (repli sans tesserocr), via stdin/stdout."""
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    command = [pytesseract.pytesseract.tesseract_cmd, 'stdin', 'stdout', '-l', lang, '--psm', str(psm)]
+    try:
+        result = subprocess.run(command, input=buffer.getvalue(), capture_output=True,
+                                env=dict(os.environ, OMP_THREAD_LIMIT=str(OMP_THREAD_LIMIT)))
+    except FileNotFoundError:
+        raise pytesseract.TesseractNotFoundError()
+    if result.returncode:
+        raise pytesseract.TesseractError(result.returncode, result.stderr.decode('utf-8', errors='replace').strip())
+    return result.stdout.decode('utf-8')
+
+class OCRService:
+    """
+    Pool de workers Tesseract persistants alimenté par une file d'attente.
+
+    Avec tesserocr, chaque worker garde une instance de l'API Tesseract par combinaison
+    (langues, psm), avec les traineddata déjà chargés. Sans tesserocr, les workers
+    lancent la commande tesseract, mais la concurrence reste bornée pour ne pas saturer les cœurs.
+    """
+
+    def __init__(self, lang=OCR_LANG, workers=None):
+        # Tesseract parallélise chaque image avec OpenMP ; sans limite, plusieurs workers
+        # simultanés se disputent les cœurs. Un thread OpenMP par worker par défaut.
+        self.workers = workers or max(1, (os.cpu_count() or 1) // OMP_THREAD_LIMIT)
+        self.lang = lang
+        self.engine = 'tesserocr' if tesserocr is not None else 'tesseract-cli'
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._stats = {'processed': 0, 'errors': 0, 'in_flight': 0}
+        self._threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"ocr-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Service OCR démarré: {self.workers} workers, moteur {self.engine}, OMP_THREAD_LIMIT={OMP_THREAD_LIMIT}")
+
+    def _worker(self):
+        apis = {}
+        if tesserocr is not None:
+            # Préchargement des langues par défaut (écriture latine, la plus fréquente, en mode auto)
+            preload = SCRIPT_LANGS['Latin'] if self.lang == AUTO_LANG else self.lang
+            try:
+                apis[(preload, DEFAULT_PSM)] = tesserocr.PyTessBaseAPI(lang=preload, psm=DEFAULT_PSM)
+            except Exception as e:
+                logger.error(f"Impossible de précharger Tesseract ({preload}): {e}")
+        while True:
+            image, lang, psm, future, enqueued_at = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                self._queue.task_done()
+                continue
+            started_at = time.perf_counter()
+            with self._lock:
+                self._stats['in_flight'] += 1
+            try:
+                script = None
+                if lang == AUTO_LANG:
+                    image, lang, detection = select_languages(image)
+                    script = detection['script']
+                if tesserocr is not None:
+                    api = apis.get((lang, psm))
+                    if api is None:
+                        api = apis[(lang, psm)] = tesserocr.PyTessBaseAPI(lang=lang, psm=psm)
+                    api.SetImage(image)
+                    text = api.GetUTF8Text()
+                else:
+                    text = _run_tesseract(image, lang, psm)
+                finished_at = time.perf_counter()
+                result = {
+                    'text': text.strip(),
+                    'lang': lang,
+                    'script': script,
+                    'queue_ms': round((started_at - enqueued_at) * 1000, 2),
+                    'ocr_ms': round((finished_at - started_at) * 1000, 2)
+                }
+                with self._lock:
+                    self._stats['processed'] += 1
+                    self._latencies.append(result['queue_ms'] + result['ocr_ms'])
+                future.set_result(result)
+            except Exception as e:
+                with self._lock:
+                    self._stats['errors'] += 1
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._stats['in_flight'] -= 1
+                self._queue.task_done()
+
+    def submit(self, image, lang=None, psm=DEFAULT_PSM):
+        """
+        Met une image en file ; le Future renvoie {'text', 'lang', 'script', 'queue_ms', 'ocr_ms'}.
+        Avec lang='auto', l'écriture est détectée sur une version réduite de l'image et seules
+        les langues correspondantes sont chargées.
+        """
+        future = Future()
+        self._queue.put((image, lang or self.lang, psm, future, time.perf_counter()))
+        return future
+
+    def submit_batch(self, images, lang=None, psm=DEFAULT_PSM):
+        """Met un lot d'images en file et retourne leurs Futures, dans l'ordre."""
+        return [self.submit(image, lang, psm) for image in images]
+
+    def ocr_batch(self, images, lang=None, psm=DEFAULT_PSM):
+        """Reconnaît un lot d'images en parallèle et retourne les textes, dans l'ordre."""
+        return [future.result()['text'] for future in self.submit_batch(images, lang, psm)]
+
+    def ocr_image(self, image, lang=None, psm=DEFAULT_PSM):
+        """Reconnaît une image et retourne son texte."""
+        return self.submit(image, lang, psm).result()['text']
+
+    def stats(self):
+        """
+        Profondeur de file, images traitées, latence par image (file + OCR) et moteur utilisé :
+        persistent_engine est faux quand les workers retombent sur la commande tesseract (sans tesserocr).
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = dict(self._stats, engine=self.engine, persistent_engine=self.engine == 'tesserocr',
+                         workers=self.workers, queue_depth=self._queue.qsize())
+        if latencies:
+            stats['latency_ms'] = {
+                'p50': latencies[len(latencies) // 2],
+                'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                'max': latencies[-1]
+            }
+        return stats
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_ocr_service():
+    """Return the process-wide OCR service, starting its workers on first use."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = OCRService()
+    return _service
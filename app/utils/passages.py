@@ -0,0 +1,57 @@
+import re
+
+# Taille visée d'un passage (caractères) : assez court pour qu'un vecteur TF-IDF reste ciblé
+PASSAGE_MAX_CHARS = 400
+# Nombre maximal de segments interrogés par document
+MAX_SEGMENTS = 50
+MIN_QUESTION_CHARS = 10
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?؟])\s+')
+
+def split_sentences(text):
+    """Découpe un texte en phrases sur la ponctuation finale."""
+    return [s.strip() for s in _SENTENCE_SPLIT.split(text or '') if s.strip()]
+
+def detect_questions(text):
+    """Phrases interrogatives (terminées par '?' ou '؟') présentes dans le texte, sans doublons."""
+    questions = []
+    seen = set()
+    for sentence in split_sentences(text):
+        if sentence[-1] in '?؟' and len(sentence) >= MIN_QUESTION_CHARS:
+            key = sentence.lower()
+            if key not in seen:
+                seen.add(key)
+                questions.append(sentence)
+    return questions
+
+def split_passages(text, max_chars=PASSAGE_MAX_CHARS):
+    """Regroupe les phrases consécutives en passages d'au plus max_chars caractères."""
+    passages = []
+    current = ''
+    for sentence in split_sentences(text):
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            passages.append(current)
+            current = ''
+        current = f"{current} {sentence}" if current else sentence
+        # Phrase isolée trop longue (texte OCR sans ponctuation) : coupe sur les espaces
+        while len(current) > max_chars:
+            cut = current.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            passages.append(current[:cut].strip())
+            current = current[cut:].strip()
+    if current:
+        passages.append(current)
+    return passages
+
+def split_document(text, max_segments=MAX_SEGMENTS):
+    """
+    Segments à interroger pour un document extrait : ses questions s'il en contient,
+    sinon des passages de quelques phrases.
+
+    Returns:
+        tuple: (liste de segments, 'questions' ou 'passages').
+    """
+    questions = detect_questions(text)
+    if questions:
+        return questions[:max_segments], 'questions'
+    return split_passages(text)[:max_segments], 'passages'
@@ -4,9 +4,16 @@ import os
 import pytesseract
 import shutil
 from PIL import Image
-import numpy as np
 import fitz  # PyMuPDF
 import io
+import time
+from .extraction_cache import get_extraction_cache
+from .metrics import stage, count
+from .ocr_preprocess import preprocess_for_ocr, PREPROCESS_SETTINGS
+from .ocr_service import get_ocr_service
+from .passages import detect_questions
+from .script_detection import SCRIPT_OSD
+from .single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
@@ -29,8 +36,8 @@ def configure_tesseract():
 try:
     configure_tesseract()
 except Exception as e:
+    # Les PDF avec couche texte restent traités sans Tesseract ; seul l'OCR échouera
     logger.error(f"Erreur de configuration de Tesseract: {e}")
-    raise
 
 # Configurer la police Amiri pour le support arabe
 amiri_font_path = r"F:\DSIR12\SYM2\SI2\projet\chatbot2\fonts\Amiri-Regular.ttf"
@@ -42,102 +49,223 @@ else:
 
 def preprocess_image(image):
     """
-    Prétraiter l'image pour améliorer la qualité de l'OCR.
+    Prétraiter l'image pour améliorer la qualité de l'OCR (pipeline partagé avec les images).
     """
     try:
-        image = image.convert('L')  # Convertir en niveaux de gris
-        image = np.array(image)
-        image = (image - np.min(image)) * (255 / (np.max(image) - np.min(image)))
-        image = Image.fromarray(image.astype(np.uint8))
-        return image
+        return preprocess_for_ocr(image)
     except Exception as e:
         logger.error(f"Erreur lors du prétraitement de l'image: {e}")
         return image
 
-def process_pdf(pdf_path):
+# Seuils de l'extraction hybride page par page
+MIN_NATIVE_CHARS = 20  # Caractères alphanumériques minimum pour une couche texte exploitable
+LAYOUT_SIDE_BY_SIDE_RATIO = 0.3  # Part de blocs ayant un voisin sur la même ligne (tableaux, colonnes)
+OCR_DPI = 300
+OCR_LANG = 'auto'  # Langues choisies par page selon l'écriture détectée (voir script_detection)
+
+# Paramètres pris en compte dans la clé du cache d'extraction
+PDF_EXTRACTION_SETTINGS = {
+    'extractor': 'pdf',
+    'ocr_lang': OCR_LANG,
+    'script_osd': SCRIPT_OSD,
+    'ocr_dpi': OCR_DPI,
+    'min_native_chars': MIN_NATIVE_CHARS,
+    'layout_side_by_side_ratio': LAYOUT_SIDE_BY_SIDE_RATIO,
+    'preprocess': PREPROCESS_SETTINGS
+}
+
+def _has_usable_text(text):
+    """Vérifie qu'une couche texte contient suffisamment de caractères exploitables."""
+    return sum(1 for c in text if c.isalnum()) >= MIN_NATIVE_CHARS
+
+def _is_layout_heavy(page):
+    """
+    Détecte les pages à mise en page complexe (tableaux, colonnes) pour lesquelles
+    pdfplumber reconstitue mieux l'ordre de lecture que PyMuPDF : une part importante
+    des blocs texte y a un voisin placé à côté, sur la même ligne.
+    """
+    blocks = [b for b in page.get_text("blocks") if b[6] == 0]  # Blocs texte uniquement
+    if len(blocks) < 4:
+        return False
+    side_by_side = 0
+    for i, (x0, y0, x1, y1, *_) in enumerate(blocks):
+        for j, (ox0, oy0, ox1, oy1, *_) in enumerate(blocks):
+            if i != j and min(y1, oy1) - max(y0, oy0) > 0.5 * (y1 - y0) and (ox0 >= x1 or ox1 <= x0):
+                side_by_side += 1
+                break
+    return side_by_side / len(blocks) >= LAYOUT_SIDE_BY_SIDE_RATIO
+
+def _render_page(page):
+    """Rend une page en niveaux de gris et la prépare pour l'OCR."""
+    pix = page.get_pixmap(matrix=fitz.Matrix(OCR_DPI / 72, OCR_DPI / 72), colorspace=fitz.csGRAY)
+    img = Image.frombytes('L', (pix.width, pix.height), pix.samples)
+    return preprocess_image(img)
+
+def extract_pdf_pages(data):
     """
-    Extrait le texte d'un fichier PDF en utilisant pdfplumber pour le texte natif et PyMuPDF + pytesseract pour l'OCR.
+    Extrait le texte page par page avec la méthode la moins coûteuse possible :
+    texte natif PyMuPDF d'abord, pdfplumber pour les pages à mise en page complexe,
+    et OCR uniquement pour les pages sans couche texte exploitable. Les pages à OCRiser
+    sont envoyées en lot au service OCR et reconnues en parallèle.
     
     Args:
-        pdf_path (str): Chemin vers le fichier PDF.
+        data (bytes | memoryview): Contenu du fichier PDF, lu en mémoire.
     
     Returns:
-        tuple: (Texte extrait ou message d'erreur, Liste de questions extraites).
+        list: Un dictionnaire par page (page, method, chars, time_ms, text).
     """
-    logger.debug(f"Début du traitement du PDF: {pdf_path}")
+    pages = []
+    pending_ocr = []
+    plumber_pdf = None
+    pdf_doc = fitz.open(stream=data, filetype='pdf')
     try:
-        if not os.path.exists(pdf_path):
-            logger.error(f"Fichier PDF introuvable: {pdf_path}")
-            return f"Fichier PDF introuvable: {pdf_path}", []
+        logger.debug("Nombre de pages dans le PDF: %d", pdf_doc.page_count)
+        for page_num, page in enumerate(pdf_doc):
+            start = time.perf_counter()
+            text = page.get_text().strip()
+            page_result = {'page': page_num + 1, 'method': 'pymupdf'}
+            
+            if _has_usable_text(text):
+                if _is_layout_heavy(page):
+                    try:
+                        if plumber_pdf is None:
+                            plumber_pdf = pdfplumber.open(io.BytesIO(data))
+                        plumber_text = (plumber_pdf.pages[page_num].extract_text() or '').strip()
+                        if _has_usable_text(plumber_text):
+                            text, page_result['method'] = plumber_text, 'pdfplumber'
+                    except Exception as e:
+                        logger.warning(f"Échec de pdfplumber sur la page {page_num+1}, texte PyMuPDF conservé: {e}")
+            else:
+                page_result['method'] = 'ocr'
+                text = ''
+                try:
+                    future = get_ocr_service().submit(_render_page(page), lang=OCR_LANG, psm=6)
+                    pending_ocr.append((page_result, future))
+                    count('ocr_pages', source='pdf')
+                except Exception as e:
+                    logger.error(f"Erreur lors du rendu de la page {page_num+1} pour l'OCR: {e}")
+                    page_result['error'] = str(e)
+            
+            page_result['chars'] = len(text)
+            page_result['time_ms'] = round((time.perf_counter() - start) * 1000, 2)
+            page_result['text'] = text
+            pages.append(page_result)
+    finally:
+        pdf_doc.close()
+        if plumber_pdf is not None:
+            plumber_pdf.close()
+    
+    for page_result, future in pending_ocr:
+        try:
+            with stage('ocr'):
+                ocr = future.result()
+            page_result['text'] = ocr['text']
+            page_result['chars'] = len(ocr['text'])
+            page_result['time_ms'] = round(page_result['time_ms'] + ocr['ocr_ms'], 2)
+            page_result['queue_ms'] = ocr['queue_ms']
+            page_result['lang'] = ocr['lang']
+        except Exception as e:
+            logger.error(f"Erreur lors de l'OCR de la page {page_result['page']}: {e}")
+            page_result['error'] = str(e)
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        for page_result in pages:
+            logger.debug("Page %d: méthode=%s, %d caractères en %s ms",
+                         page_result['page'], page_result['method'], page_result['chars'], page_result['time_ms'])
+    return pages
+
+# Les uploads simultanés du même fichier partagent une seule extraction
+_extraction_flight = SingleFlight('pdf_extraction')
 
-        if not pdf_path.lower().endswith('.pdf'):
-            logger.error(f"Type de fichier non supporté: {pdf_path}")
-            return "Erreur : type de fichier non supporté.", []
+def _join_pages(pages):
+    """Texte complet (espaces normalisés) et questions détectées d'une liste de pages."""
+    full_text = ' '.join(page['text'] for page in pages if page['text'])
+    full_text = ' '.join(full_text.split())
+    return full_text, detect_questions(full_text)
+
+def _extract_and_cache(data, cache, cache_key):
+    """Extrait les pages et met le résultat en cache s'il est complet."""
+    pages = extract_pdf_pages(data)
+    # Ne pas mettre en cache un résultat partiel (échec d'OCR sur une page)
+    if not any('error' in page for page in pages):
+        full_text, questions = _join_pages(pages)
+        cache.put(cache_key, {
+            'text': full_text or "Aucun texte détecté dans le PDF.",
+            'questions': questions,
+            'pages': [{k: v for k, v in page.items() if k != 'text'} for page in pages]
+        })
+    return pages
+
+def process_pdf(source, with_report=False, filename=None):
+    """
+    Extrait le texte d'un fichier PDF page par page (texte natif PyMuPDF, pdfplumber
+    pour les mises en page complexes, OCR pour les pages numérisées).
+    
+    Args:
+        source (str | bytes | memoryview): Chemin vers le fichier PDF, ou son contenu
+            déjà en mémoire (upload) pour éviter tout passage par le disque.
+        with_report (bool): Ajoute au résultat le rapport par page (méthode et durée).
+        filename (str): Nom d'origine du fichier, utilisé dans les journaux pour un contenu en mémoire.
+    
+    Returns:
+        tuple: (Texte extrait ou message d'erreur, Liste de questions extraites),
+        suivi du rapport par page si with_report est vrai.
+    """
+    def result(text, questions, pages=None):
+        if not with_report:
+            return text, questions
+        report = [{k: v for k, v in page.items() if k != 'text'} for page in (pages or [])]
+        return text, questions, report
+    
+    if isinstance(source, str):
+        pdf_path = source
+    else:
+        pdf_path = filename or '<upload>'
+    logger.debug("Début du traitement du PDF: %s", pdf_path)
+    try:
+        if isinstance(source, str):
+            if not os.path.exists(pdf_path):
+                logger.error(f"Fichier PDF introuvable: {pdf_path}")
+                return result(f"Fichier PDF introuvable: {pdf_path}", [])
+
+            if not pdf_path.lower().endswith('.pdf'):
+                logger.error(f"Type de fichier non supporté: {pdf_path}")
+                return result("Erreur : type de fichier non supporté.", [])
+
+            with open(pdf_path, 'rb') as f:
+                data = f.read()
+        else:
+            data = source
+            if bytes(data[:5]) != b'%PDF-':
+                logger.error(f"Contenu PDF invalide: {pdf_path}")
+                return result("Erreur : type de fichier non supporté.", [])
+
+        # Réponse immédiate si le même fichier a déjà été extrait
+        cache = get_extraction_cache()
+        cache_key = cache.make_key(data, PDF_EXTRACTION_SETTINGS)
+        cached = cache.get(cache_key, source_size=len(data))
+        if cached is not None:
+            logger.debug("PDF servi depuis le cache d'extraction: %s", pdf_path)
+            return result(cached['text'], cached['questions'], cached['pages'])
 
-        # Essayer l'extraction textuelle avec pdfplumber
-        extracted_text = []
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                logger.debug(f"Nombre de pages dans le PDF: {len(pdf.pages)}")
-                for i, page in enumerate(pdf.pages):
-                    text = page.extract_text()
-                    if text:
-                        extracted_text.append(text.strip())
-                        logger.debug(f"Texte extrait de la page {i+1}: {text[:100]}...")
-                    else:
-                        logger.debug(f"Aucun texte extrait de la page {i+1}")
+            pages = _extraction_flight.do(cache_key, _extract_and_cache, data, cache, cache_key)
         except Exception as e:
-            logger.warning(f"Échec de l'extraction textuelle avec pdfplumber: {e}")
+            logger.error(f"Erreur lors de l'extraction du PDF {pdf_path}: {e}", exc_info=True)
+            return result(f"Erreur lors de l'extraction: {str(e)}", [])
 
-        full_text = ' '.join(extracted_text)
-        full_text = ' '.join(full_text.split())  # Normalise les espaces
+        full_text, questions = _join_pages(pages)
         
-        if full_text:
-            logger.info(f"Texte extrait du PDF avec pdfplumber: {full_text[:100]}...")
-            return full_text, []
-
-        # Si aucun texte, tenter l'OCR avec PyMuPDF
-        logger.info(f"Aucun texte détecté avec pdfplumber, tentative d'OCR pour {pdf_path}")
-        try:
-            # Ouvrir le PDF avec PyMuPDF
-            pdf_doc = fitz.open(pdf_path)
-            logger.debug(f"Nombre de pages dans le PDF (PyMuPDF): {pdf_doc.page_count}")
-            ocr_text = []
-            
-            for page_num in range(pdf_doc.page_count):
-                page = pdf_doc[page_num]
-                # Convertir la page en image (300 DPI)
-                pix = page.get_pixmap(matrix=fitz.Matrix(300/72, 300/72))
-                img_data = pix.tobytes("png")
-                img = Image.open(io.BytesIO(img_data))
-                
-                # Prétraiter l'image
-                img = preprocess_image(img)
-                
-                # Effectuer l'OCR
-                text = pytesseract.image_to_string(img, lang='fra+eng+ara', config='--psm 6').strip()
-                if text:
-                    ocr_text.append(text)
-                    logger.debug(f"Texte OCR extrait de la page {page_num+1}: {text[:100]}...")
-                else:
-                    logger.debug(f"Aucun texte OCR extrait de la page {page_num+1}")
-            
-            pdf_doc.close()
-            
-            full_text = ' '.join(ocr_text)
-            full_text = ' '.join(full_text.split())
-            
-            if not full_text:
-                logger.warning(f"Aucun texte détecté dans le PDF après OCR: {pdf_path}")
-                return "Aucun texte détecté dans le PDF.", []
-            
-            logger.info(f"Texte OCR extrait du PDF: {full_text[:100]}...")
-            return full_text, []
+        if not full_text:
+            logger.warning(f"Aucun texte détecté dans le PDF: {pdf_path}")
+            return result("Aucun texte détecté dans le PDF.", [], pages)
         
-        except Exception as e:
-            logger.error(f"Erreur lors de l'OCR du PDF {pdf_path}: {e}", exc_info=True)
-            return f"Erreur lors de l'OCR: {str(e)}", []
+        methods = {}
+        for page in pages:
+            methods[page['method']] = methods.get(page['method'], 0) + 1
+        logger.info("Texte extrait du PDF %s: %d pages, %d caractères, méthodes: %s", pdf_path, len(pages), len(full_text), methods)
+        return result(full_text, questions, pages)
     
     except Exception as e:
         logger.error(f"Erreur générale lors de l'extraction du texte du PDF {pdf_path}: {e}", exc_info=True)
-        return f"Erreur générale: {str(e)}", []
\ No newline at end of file
+        return result(f"Erreur générale: {str(e)}", [])
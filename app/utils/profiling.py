@@ -0,0 +1,312 @@
+import cProfile
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from datetime import datetime
+from flask import g, request
+from flask_login import current_user
+from .logging import initialize_logging
+from .metrics import request_stages
+
+logger = initialize_logging()
+
+# Opt-in: PROFILING_ENABLED=1 installs the request hooks
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0') == '1'
+# Share of requests profiled with cProfile
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.01))
+# Requests slower than this are kept with their stack samples (0 disables the sampler)
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', 2000))
+# Admins can profile one request by sending this header
+PROFILE_HEADER = 'X-Profile'
+PROFILE_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../cache/profiles'))
+MAX_PROFILES = int(os.environ.get('PROFILE_MAX_ENTRIES', 50))
+SAMPLE_INTERVAL = 0.01  # Seconds between two stack samples
+MAX_STACK_DEPTH = 64
+TOP_FUNCTIONS = 20
+PROFILE_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+DATA_EXTENSIONS = {'cprofile': '.prof', 'sampling': '.folded'}
+
+# cProfile cannot run in two threads at once from Python 3.12; other requests fall back to sampling
+_cprofile_lock = threading.Lock()
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}"
+
+class StackSampler:
+    """
+    Statistical profiler of registered threads.
+
+    A daemon thread reads the current frame of every registered thread each `interval`
+    seconds and counts the stacks seen (root first). It sleeps while no thread is
+    registered, so the cost is one stack walk per in-flight request and interval.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, max_depth=MAX_STACK_DEPTH):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        self._threads = {}  # thread id -> Counter of stacks
+        self._wakeup = threading.Event()
+        self._worker = None
+
+    def start(self, thread_id):
+        with self._lock:
+            self._threads[thread_id] = Counter()
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._worker.start()
+        self._wakeup.set()
+
+    def stop(self, thread_id):
+        """Unregister a thread and return its stack counts."""
+        with self._lock:
+            return self._threads.pop(thread_id, Counter())
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while True:
+            with self._lock:
+                idle = not self._threads
+                if idle:
+                    self._wakeup.clear()
+            if idle:
+                self._wakeup.wait()
+                continue
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, stacks in self._threads.items():
+                    frame = frames.get(thread_id)
+                    if frame is None or thread_id == own_id:
+                        continue
+                    stack = []
+                    while frame is not None and len(stack) < self.max_depth:
+                        stack.append(_frame_name(frame))
+                        frame = frame.f_back
+                    stacks[tuple(reversed(stack))] += 1
+            del frames
+            time.sleep(self.interval)
+
+class ProfileStore:
+    """
+    Bounded on-disk ring of request profiles.
+
+    Each profile is a metadata file (<id>.json) next to its data: a cProfile dump (.prof,
+    readable with pstats or snakeviz) or collapsed stacks (.folded, for flame graphs).
+    The oldest profiles are deleted beyond max_entries.
+    """
+
+    def __init__(self, profile_dir=PROFILE_DIR, max_entries=MAX_PROFILES):
+        self.profile_dir = profile_dir
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # id -> metadata, oldest first
+        self._load_index()
+
+    def _load_index(self):
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            entries = []
+            for name in os.listdir(self.profile_dir):
+                if name.endswith('.json') and PROFILE_ID_RE.match(name[:-5]):
+                    with open(os.path.join(self.profile_dir, name), 'r', encoding='utf-8') as f:
+                        entries.append(json.load(f))
+            for meta in sorted(entries, key=lambda m: m['created']):
+                self._entries[meta['id']] = meta
+            self._evict()
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load profiles from {self.profile_dir}: {e}")
+
+    def data_path(self, profile_id):
+        """Path of a profile's data file, or None for an unknown id."""
+        with self._lock:
+            meta = self._entries.get(profile_id)
+        if meta is None:
+            return None
+        return os.path.join(self.profile_dir, profile_id + DATA_EXTENSIONS[meta['kind']])
+
+    def save(self, meta, write_data):
+        """Store a profile: write_data(path) writes its data file. Returns the profile id."""
+        profile_id = uuid.uuid4().hex
+        meta = dict(meta, id=profile_id)
+        base = os.path.join(self.profile_dir, profile_id)
+        write_data(base + DATA_EXTENSIONS[meta['kind']])
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        with self._lock:
+            self._entries[profile_id] = meta
+            self._evict()
+        return profile_id
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            profile_id, meta = self._entries.popitem(last=False)
+            for ext in ('.json', DATA_EXTENSIONS.get(meta.get('kind'), '')):
+                try:
+                    os.remove(os.path.join(self.profile_dir, profile_id + ext))
+                except OSError:
+                    pass
+
+    def list(self):
+        """Metadata of the stored profiles, newest first."""
+        with self._lock:
+            return list(reversed(self._entries.values()))
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._entries.get(profile_id)
+
+_store = None
+_sampler = None
+_singleton_lock = threading.Lock()
+
+def get_profile_store():
+    """Shared profile store."""
+    global _store
+    if _store is None:
+        with _singleton_lock:
+            if _store is None:
+                _store = ProfileStore()
+    return _store
+
+def get_stack_sampler():
+    """Shared stack sampler."""
+    global _sampler
+    if _sampler is None:
+        with _singleton_lock:
+            if _sampler is None:
+                _sampler = StackSampler()
+    return _sampler
+
+def summarize_cprofile(profiler, limit=TOP_FUNCTIONS):
+    """Functions with the highest cumulative time."""
+    stats = pstats.Stats(profiler).stats
+    top = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [{
+        'function': f"{os.path.basename(filename)}:{line}({name})",
+        'calls': calls,
+        'own_ms': round(own * 1000, 3),
+        'cumulative_ms': round(cumulative * 1000, 3)
+    } for (filename, line, name), (_, calls, own, cumulative, _) in top]
+
+def summarize_stacks(stacks, limit=TOP_FUNCTIONS):
+    """Functions present in the most samples (inclusive), with their share of samples."""
+    total = sum(stacks.values())
+    inclusive = Counter()
+    for stack, samples in stacks.items():
+        for name in {frame.rsplit(':', 1)[0] for frame in stack}:  # Any line of the function
+            inclusive[name] += samples
+    return [{'function': name, 'samples': samples, 'share': round(samples / total, 3)}
+            for name, samples in inclusive.most_common(limit)]
+
+def _write_folded(stacks):
+    def write(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, samples in stacks.most_common():
+                f.write(f"{';'.join(stack)} {samples}\n")
+    return write
+
+def _input_sizes():
+    """Sizes of the request inputs: body, typed message and uploaded files."""
+    sizes = {'content_length': request.content_length or 0, 'message_chars': len(request.form.get('message', ''))}
+    files = {}
+    for field, storage in request.files.items():
+        try:
+            position = storage.stream.tell()
+            storage.stream.seek(0, os.SEEK_END)
+            files[field] = {'filename': storage.filename, 'bytes': storage.stream.tell()}
+            storage.stream.seek(position)
+        except (OSError, ValueError):
+            files[field] = {'filename': storage.filename, 'bytes': None}
+    if files:
+        sizes['files'] = files
+    return sizes
+
+def _is_admin_request():
+    return bool(request.headers.get(PROFILE_HEADER)) and current_user.is_authenticated and getattr(current_user, 'is_admin', False)
+
+def init_profiling(app):
+    """
+    Profile requests picked by PROFILE_SAMPLE_RATE or an admin's X-Profile header with
+    cProfile, and sample the stacks of the others to keep those slower than PROFILE_SLOW_MS.
+    """
+    if not PROFILING_ENABLED:
+        return
+    logger.info(f"Request profiling enabled (sample rate {PROFILE_SAMPLE_RATE}, slow threshold {PROFILE_SLOW_MS} ms).")
+
+    @app.before_request
+    def _start_profile():
+        if request.endpoint == 'static':
+            return
+        if _is_admin_request():
+            trigger = 'header'
+        elif PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+            trigger = 'sample'
+        else:
+            trigger = None
+        if trigger and _cprofile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            g.profile = {'trigger': trigger, 'kind': 'cprofile', 'profiler': profiler, 'start': time.perf_counter()}
+            profiler.enable()
+        elif trigger or PROFILE_SLOW_MS:
+            get_stack_sampler().start(threading.get_ident())
+            g.profile = {'trigger': trigger, 'kind': 'sampling', 'start': time.perf_counter()}
+
+    @app.after_request
+    def _save_profile(response):
+        state = _stop_profile()
+        if state is None:
+            return response
+        elapsed_ms = (time.perf_counter() - state['start']) * 1000
+        trigger = state['trigger'] or ('slow' if elapsed_ms >= PROFILE_SLOW_MS else None)
+        if trigger is None or (state['kind'] == 'sampling' and not state['stacks']):
+            return response
+        try:
+            meta = {
+                'created': datetime.now().isoformat(timespec='milliseconds'),
+                'trigger': trigger,
+                'kind': state['kind'],
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'duration_ms': round(elapsed_ms, 2),
+                'stages_ms': {name: round(seconds * 1000, 2) for name, seconds in request_stages().items()},
+                'input': _input_sizes()
+            }
+            if state['kind'] == 'cprofile':
+                meta['top'] = summarize_cprofile(state['profiler'])
+                write = state['profiler'].dump_stats
+            else:
+                meta['samples'] = sum(state['stacks'].values())
+                meta['top'] = summarize_stacks(state['stacks'])
+                write = _write_folded(state['stacks'])
+            profile_id = get_profile_store().save(meta, write)
+            response.headers['X-Profile-Id'] = profile_id
+            logger.info(f"Saved {state['kind']} profile {profile_id} ({trigger}) of {request.path}: {elapsed_ms:.0f} ms")
+        except Exception as e:
+            logger.error(f"Could not save profile of {request.path}: {e}", exc_info=True)
+        return response
+
+    @app.teardown_request
+    def _cleanup_profile(exc):
+        _stop_profile()  # Requests that ended in an unhandled exception skip after_request
+
+def _stop_profile():
+    """Stop the profiler of the current request; returns its state (with its stacks), or None."""
+    state = g.pop('profile', None)
+    if state is None:
+        return None
+    if state['kind'] == 'cprofile':
+        state['profiler'].disable()
+        _cprofile_lock.release()
+    else:
+        state['stacks'] = get_stack_sampler().stop(threading.get_ident())
+    return state
@@ -0,0 +1,99 @@
+import os
+import numpy as np
+import pytesseract
+from .logging import initialize_logging
+from .ocr_preprocess import _analysis_thumbnail, _ink_profile, _text_lines
+
+logger = initialize_logging()
+
+# Jeu de langues Tesseract minimal par écriture détectée
+SCRIPT_LANGS = {
+    'Latin': 'fra+eng',
+    'Arabic': 'ara'
+}
+FALLBACK_LANGS = 'fra+eng+ara'  # Écriture inconnue : combinaison complète
+MIN_OSD_CONFIDENCE = 1.0  # Confiance minimale de Tesseract OSD pour l'écriture
+# Heuristique : la ligne de base continue de l'arabe concentre l'encre sur quelques rangées,
+# d'où un rapport pic / médiane du profil de ligne nettement plus élevé qu'en écriture latine
+ARABIC_BASELINE_RATIO = 3.5
+LATIN_BASELINE_RATIO = 2.8
+OSD_MAX_WIDTH = 1200
+# Recours à Tesseract OSD (une invocation de tesseract de plus par page, ~110 ms sur une page à 300 dpi) :
+# 'fallback' seulement si l'heuristique est ambiguë, 'always' avant l'heuristique (détecte aussi
+# les pages pivotées de 90/180/270°), 'never' jamais
+SCRIPT_OSD = os.environ.get('SCRIPT_OSD', 'fallback')
+
+def _detect_with_osd(image):
+    """Écriture et orientation via Tesseract OSD (nécessite osd.traineddata)."""
+    factor = max(1, image.width // OSD_MAX_WIDTH)
+    small = image.reduce(factor) if factor > 1 else image
+    osd = pytesseract.image_to_osd(small, output_type=pytesseract.Output.DICT)
+    if osd.get('script_conf', 0) < MIN_OSD_CONFIDENCE:
+        return None
+    return {
+        'script': osd.get('script'),
+        'rotate': int(osd.get('rotate', 0)),
+        'confidence': float(osd.get('script_conf', 0)),
+        'method': 'osd'
+    }
+
+def _detect_with_baseline(image):
+    """
+    Heuristique sans Tesseract : dans chaque ligne de texte, rapport entre la rangée la plus
+    encrée et la rangée médiane. Élevé pour l'arabe (ligne de base continue), plus faible
+    pour l'écriture latine. Retourne None si le rapport est ambigu.
+    """
+    thumb, _ = _analysis_thumbnail(image)
+    row_ink = _ink_profile(thumb)
+    ratios = []
+    for start, end in _text_lines(row_ink, thumb.width, min_height=4):
+        line = row_ink[start:end]
+        ratios.append(line.max() / max(np.median(line), 1))
+    if not ratios:
+        return None
+    ratio = float(np.median(ratios))
+    if ratio >= ARABIC_BASELINE_RATIO:
+        script = 'Arabic'
+    elif ratio <= LATIN_BASELINE_RATIO:
+        script = 'Latin'
+    else:
+        return None
+    return {'script': script, 'rotate': 0, 'confidence': ratio, 'method': 'baseline'}
+
+def detect_script(image):
+    """
+    Détecte l'écriture dominante d'une image. L'heuristique de ligne de base (quelques ms)
+    est essayée d'abord ; Tesseract OSD, sur une version réduite, ne tranche que les cas
+    ambigus (voir SCRIPT_OSD). L'orientation n'est connue que lorsque OSD est utilisé.
+
+    Returns:
+        dict: script ('Latin', 'Arabic', ... ou None), rotate (degrés), confidence, method.
+    """
+    if image.mode != 'L':
+        image = image.convert('L')
+    detectors = [_detect_with_baseline]
+    if SCRIPT_OSD == 'always':
+        detectors.insert(0, _detect_with_osd)
+    elif SCRIPT_OSD == 'fallback':
+        detectors.append(_detect_with_osd)
+    for detector in detectors:
+        try:
+            result = detector(image)
+            if result:
+                return result
+        except Exception as e:
+            logger.debug(f"Détection d'écriture {detector.__name__} indisponible: {e}")
+    return {'script': None, 'rotate': 0, 'confidence': 0.0, 'method': 'none'}
+
+def select_languages(image):
+    """
+    Choisit le jeu de langues Tesseract minimal pour une image et la redresse si nécessaire.
+
+    Returns:
+        tuple: (image éventuellement pivotée, langues Tesseract, résultat de detect_script).
+    """
+    detection = detect_script(image)
+    if detection['rotate']:
+        image = image.rotate(-detection['rotate'], expand=True, fillcolor=255 if image.mode == 'L' else None)
+    lang = SCRIPT_LANGS.get(detection['script'], FALLBACK_LANGS)
+    return image, lang, detection
@@ -0,0 +1,148 @@
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from .logging import initialize_logging
+from .passages import split_passages
+from .preprocess import preprocess_text
+
+logger = initialize_logging()
+
+# Documents expire after this many seconds without a question
+SESSION_INDEX_TTL = 30 * 60
+# Total memory budget for all session indexes (approximate, bytes)
+SESSION_INDEX_MAX_BYTES = 32 * 1024 * 1024
+# Passages kept per document
+MAX_DOCUMENT_PASSAGES = 2000
+
+def get_session_id(session):
+    """Return the session's id, creating one on first use."""
+    if 'session_id' not in session:
+        session['session_id'] = uuid.uuid4().hex
+    return session['session_id']
+
+class SessionDocumentIndex:
+    """
+    Ephemeral TF-IDF indexes over the passages of documents uploaded in a session.
+
+    One document is kept per session (a new upload replaces the previous one); files
+    uploaded together are indexed as one document and each passage keeps its filename.
+    Entries expire after `ttl` seconds without access and the least recently used
+    sessions are evicted once the total size exceeds `max_bytes`.
+    """
+
+    def __init__(self, ttl=SESSION_INDEX_TTL, max_bytes=SESSION_INDEX_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self._bytes = 0
+        self._stats = {'documents': 0, 'searches': 0, 'expired': 0, 'evicted': 0}
+
+    def _drop(self, session_id, reason):
+        entry = self._entries.pop(session_id)
+        self._bytes -= entry['bytes']
+        self._stats[reason] += 1
+
+    def _purge_expired(self, now):
+        for session_id in [sid for sid, e in self._entries.items() if now - e['last_access'] > self.ttl]:
+            self._drop(session_id, 'expired')
+
+    def add(self, session_id, text, lang, filename=None):
+        """Index the passages of `text` for the session. Returns the number of passages indexed."""
+        return self.add_documents(session_id, [(filename, text)], lang)
+
+    def add_documents(self, session_id, documents, lang):
+        """Index the passages of several (filename, text) documents as the session's document."""
+        passages, filenames = [], []
+        for filename, text in documents:
+            document_passages = split_passages(text)
+            passages.extend(document_passages)
+            filenames.extend([filename] * len(document_passages))
+        passages, filenames = passages[:MAX_DOCUMENT_PASSAGES], filenames[:MAX_DOCUMENT_PASSAGES]
+        processed = [preprocess_text(p, lang) for p in passages]
+        if not any(processed):
+            return 0
+        vectorizer = TfidfVectorizer()
+        try:
+            X = vectorizer.fit_transform(processed)
+        except ValueError:  # Empty vocabulary
+            return 0
+        size = sum(len(p) for p in passages) + X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+        size += sum(len(term) for term in vectorizer.vocabulary_) * 2
+        now = time.monotonic()
+        with self._lock:
+            if session_id in self._entries:
+                self._bytes -= self._entries.pop(session_id)['bytes']
+            self._entries[session_id] = {
+                'passages': passages,
+                'vectorizer': vectorizer,
+                'X': X,
+                'lang': lang,
+                'filenames': filenames,
+                'bytes': size,
+                'last_access': now
+            }
+            self._bytes += size
+            self._stats['documents'] += 1
+            self._purge_expired(now)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                self._drop(next(iter(self._entries)), 'evicted')
+        logger.debug("Session document indexed: %d passages, %d bytes (%s).", len(passages), size,
+                     ', '.join(sorted({f for f in filenames if f})) or 'document')
+        return len(passages)
+
+    def search(self, session_id, text):
+        """
+        Best passage of the session's document for `text`.
+
+        Returns:
+            dict: passage, score, filename, language; or None if the session has no document.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if now - entry['last_access'] > self.ttl:
+                self._drop(session_id, 'expired')
+                return None
+            entry['last_access'] = now
+            self._entries.move_to_end(session_id)
+            self._stats['searches'] += 1
+        query = entry['vectorizer'].transform([preprocess_text(text, entry['lang'])])
+        scores = cosine_similarity(query, entry['X'])[0]
+        idx = int(scores.argmax())
+        return {
+            'passage': entry['passages'][idx],
+            'score': float(scores[idx]),
+            'filename': entry['filenames'][idx],
+            'language': entry['lang']
+        }
+
+    def clear(self, session_id):
+        """Forget the session's document."""
+        with self._lock:
+            if session_id in self._entries:
+                entry = self._entries.pop(session_id)
+                self._bytes -= entry['bytes']
+
+    def stats(self):
+        """Number of indexed sessions, memory used and activity counters."""
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            return dict(self._stats, sessions=len(self._entries), bytes=self._bytes, max_bytes=self.max_bytes)
+
+_index = None
+_index_lock = Lock()
+
+def get_session_index():
+    """Return the process-wide session document index."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SessionDocumentIndex()
+    return _index
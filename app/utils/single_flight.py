@@ -0,0 +1,52 @@
+import threading
+from concurrent.futures import Future
+from .logging import initialize_logging
+
+logger = initialize_logging()
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same work.
+
+    The first caller for a key runs the computation; callers arriving while it is in
+    flight wait for it and receive the same result (or exception). Nothing is kept once
+    the computation finishes: caching is left to the callers.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._stats = {'executed': 0, 'coalesced': 0}
+
+    def do(self, key, func, *args, **kwargs):
+        """Run func(*args, **kwargs) once for all concurrent callers with the same key."""
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+                self._stats['executed'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            logger.debug("%s: waiting on in-flight computation %r", self.name, key)
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stats(self):
+        """Computations executed, callers served by another caller's computation, keys in flight."""
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._in_flight))
@@ -0,0 +1,295 @@
+"""
+Robot d'indexation hors ligne des pages institutionnelles de l'ISET.
+
+Récupère un ensemble configuré de pages (et les liens internes du même site), les
+re-parcourt de façon incrémentale avec des GET conditionnels (ETag / Last-Modified),
+extrait le texte utile et l'indexe par passages dans une table SQLite FTS5. La recherche
+de repli de /chat interroge cet index local au lieu de Google.
+
+Usage:
+    python -m app.utils.site_crawler [--seed URL ...] [--max-pages 200]
+"""
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from urllib.parse import urljoin, urldefrag, urlparse
+import requests
+from bs4 import BeautifulSoup
+from .logging import initialize_logging
+from .passages import split_passages
+from . import french_stopwords, stemmer
+
+logger = initialize_logging()
+
+INDEX_PATH = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../cache/site_index.db'))
+SEEDS_PATH = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/crawl_seeds.txt'))
+# Pages de départ si app/data/crawl_seeds.txt n'existe pas
+DEFAULT_SEEDS = ['https://www.iset.rnu.tn/']
+MAX_PAGES = 200
+MAX_DEPTH = 2
+FETCH_TIMEOUT = (3.0, 10.0)
+# Part minimale des mots de la question présents dans un passage pour le retenir
+MIN_TERM_COVERAGE = 0.5
+# Les mots sont comparés sur ce préfixe de leur racine (le stemmer laisse certaines
+# formes verbales intactes : "commencent" / "commence")
+TERM_PREFIX = 6
+USER_AGENT = 'ISET-Chatbot-Crawler/1.0'
+
+def load_seeds(path=SEEDS_PATH):
+    """URLs de départ, une par ligne (lignes vides et commentaires # ignorés)."""
+    if not os.path.exists(path):
+        return list(DEFAULT_SEEDS)
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+def _fold(text):
+    """Minuscules sans accents, pour comparer les mots de la question et des passages."""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+_STOPWORDS = {_fold(word) for word in french_stopwords}
+
+def _term(word):
+    return _fold(stemmer.stem(word))[:TERM_PREFIX]
+
+def _stems(text):
+    """Préfixes de racine des mots d'un texte, sans accents."""
+    return {_term(word) for word in re.findall(r'\w+', _fold(text))}
+
+def _query_terms(query):
+    """Préfixes de racine des mots significatifs de la question, dans l'ordre."""
+    terms = []
+    for word in re.findall(r'\w+', _fold(query)):
+        if len(word) > 2 and word not in _STOPWORDS:
+            term = _term(word)
+            if term not in terms:
+                terms.append(term)
+    return terms
+
+def extract_page(html, base_url):
+    """Titre, texte visible et liens absolus d'une page HTML."""
+    soup = BeautifulSoup(html, 'html.parser')
+    links = []
+    for a in soup.find_all('a', href=True):
+        link = urldefrag(urljoin(base_url, a['href']))[0]
+        if link.startswith(('http://', 'https://')):
+            links.append(link)
+    for tag in soup(['script', 'style', 'noscript', 'nav', 'header', 'footer', 'form']):
+        tag.decompose()
+    title = soup.title.get_text(strip=True) if soup.title else ''
+    text = ' '.join(soup.get_text(separator=' ').split())
+    return title, text, links
+
+class SiteIndex:
+    """Index SQLite FTS5 des passages des pages parcourues, avec métadonnées de re-crawl."""
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    title TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_hash TEXT,
+                    depth INTEGER,
+                    fetched_at REAL
+                )
+            ''')
+            conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5(
+                    text, url UNINDEXED, title UNINDEXED, tokenize='unicode61 remove_diacritics 2'
+                )
+            ''')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def page(self, url):
+        """Métadonnées enregistrées d'une page (dict) ou None."""
+        row = self._connect().execute(
+            'SELECT etag, last_modified, content_hash FROM pages WHERE url = ?', (url,)
+        ).fetchone()
+        return dict(zip(('etag', 'last_modified', 'content_hash'), row)) if row else None
+
+    def known_pages(self):
+        """(url, profondeur) de toutes les pages indexées, pour le re-crawl incrémental."""
+        return self._connect().execute('SELECT url, depth FROM pages ORDER BY depth').fetchall()
+
+    def refresh(self, url, etag=None, last_modified=None):
+        """Page revalidée sans changement : met à jour la date et les validateurs HTTP."""
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE pages SET fetched_at = ?, etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE url = ?',
+                (time.time(), etag, last_modified, url)
+            )
+
+    def store(self, url, title, text, etag, last_modified, content_hash, depth=0):
+        """Remplace les passages d'une page ; retourne le nombre de passages indexés."""
+        passages = split_passages(text)
+        with self._connect() as conn:
+            conn.execute('DELETE FROM passages WHERE url = ?', (url,))
+            conn.executemany('INSERT INTO passages (text, url, title) VALUES (?, ?, ?)',
+                             [(p, url, title) for p in passages])
+            conn.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         (url, title, etag, last_modified, content_hash, depth, time.time()))
+        return len(passages)
+
+    def remove(self, url):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM passages WHERE url = ?', (url,))
+            conn.execute('DELETE FROM pages WHERE url = ?', (url,))
+
+    def is_empty(self):
+        return self._connect().execute('SELECT 1 FROM pages LIMIT 1').fetchone() is None
+
+    def search(self, query, limit=3):
+        """
+        Passages les plus pertinents pour la question (classement BM25), limités à ceux qui
+        contiennent au moins MIN_TERM_COVERAGE des mots significatifs de la question.
+
+        Returns:
+            list: dicts title, link, snippet, source, score.
+        """
+        terms = _query_terms(query)
+        if not terms:
+            return []
+        match = ' OR '.join(f'"{term}"*' for term in terms)  # Requête par préfixe
+        try:
+            rows = self._connect().execute(
+                'SELECT text, url, title, bm25(passages) FROM passages WHERE passages MATCH ? ORDER BY bm25(passages) LIMIT ?',
+                (match, limit * 5)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Recherche impossible dans l'index du site: {e}")
+            return []
+        results = []
+        for text, url, title, score in rows:
+            stems = _stems(text)
+            if sum(term in stems for term in terms) / len(terms) < MIN_TERM_COVERAGE:
+                continue
+            results.append({'title': title, 'link': url, 'snippet': text, 'source': 'Site ISET', 'score': -score})
+            if len(results) >= limit:
+                break
+        return results
+
+    def stats(self):
+        conn = self._connect()
+        return {
+            'pages': conn.execute('SELECT COUNT(*) FROM pages').fetchone()[0],
+            'passages': conn.execute('SELECT COUNT(*) FROM passages').fetchone()[0],
+            'last_crawl': conn.execute('SELECT MAX(fetched_at) FROM pages').fetchone()[0]
+        }
+
+def crawl(seeds=None, index=None, max_pages=MAX_PAGES, max_depth=MAX_DEPTH, session=None):
+    """
+    Parcourt les pages de départ et les liens internes (même hôte), jusqu'à max_pages.
+
+    Les pages déjà connues sont demandées avec If-None-Match / If-Modified-Since : une
+    réponse 304 ou un contenu inchangé ne déclenche aucune ré-indexation. Les pages
+    disparues (404/410) sont retirées de l'index.
+
+    Returns:
+        dict: compteurs fetched, not_modified, unchanged, indexed, removed, errors, passages.
+    """
+    seeds = seeds or load_seeds()
+    index = index or get_site_index()
+    session = session or requests.Session()
+    session.headers.setdefault('User-Agent', USER_AGENT)
+    hosts = {urlparse(seed).netloc for seed in seeds}
+    queue = [(seed, 0) for seed in seeds]
+    seen = set(seeds)
+    # Les pages déjà connues sont toutes revalidées, même si la page qui y mène n'a pas changé
+    for url, depth in index.known_pages():
+        if url not in seen and urlparse(url).netloc in hosts:
+            seen.add(url)
+            queue.append((url, depth or 0))
+    summary = {'fetched': 0, 'not_modified': 0, 'unchanged': 0, 'indexed': 0, 'removed': 0, 'errors': 0, 'passages': 0}
+    start = time.perf_counter()
+
+    while queue and summary['fetched'] < max_pages:
+        url, depth = queue.pop(0)
+        known = index.page(url)
+        headers = {}
+        if known and known['etag']:
+            headers['If-None-Match'] = known['etag']
+        if known and known['last_modified']:
+            headers['If-Modified-Since'] = known['last_modified']
+        try:
+            response = session.get(url, headers=headers, timeout=FETCH_TIMEOUT)
+        except requests.RequestException as e:
+            summary['errors'] += 1
+            logger.warning(f"Crawl: échec de {url}: {e}")
+            continue
+        summary['fetched'] += 1
+
+        if response.status_code == 304:
+            summary['not_modified'] += 1
+            index.refresh(url)
+            continue  # Liens inchangés : les pages liées sont déjà connues
+        if response.status_code in (404, 410):
+            if known:
+                index.remove(url)
+                summary['removed'] += 1
+            continue
+        if response.status_code != 200 or 'html' not in response.headers.get('Content-Type', 'text/html'):
+            summary['errors'] += response.status_code != 200
+            continue
+
+        title, text, links = extract_page(response.text, url)
+        content_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        if known and known['content_hash'] == content_hash:
+            summary['unchanged'] += 1
+            index.refresh(url, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        else:
+            summary['passages'] += index.store(url, title, text, response.headers.get('ETag'),
+                                               response.headers.get('Last-Modified'), content_hash, depth)
+            summary['indexed'] += 1
+
+        if depth < max_depth:
+            for link in links:
+                if urlparse(link).netloc in hosts and link not in seen:
+                    seen.add(link)
+                    queue.append((link, depth + 1))
+
+    summary['duration_s'] = round(time.perf_counter() - start, 2)
+    logger.info(f"Crawl terminé: {summary}")
+    return summary
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_site_index():
+    """Index local du site, partagé par le processus."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SiteIndex()
+    return _index
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexation des pages du site de l'ISET")
+    parser.add_argument('--seed', action='append', help="URL de départ (répétable) ; par défaut app/data/crawl_seeds.txt")
+    parser.add_argument('--max-pages', type=int, default=MAX_PAGES)
+    parser.add_argument('--max-depth', type=int, default=MAX_DEPTH)
+    args = parser.parse_args()
+    summary = crawl(args.seed, max_pages=args.max_pages, max_depth=args.max_depth)
+    print(summary)
+    print(get_site_index().stats())
+
+if __name__ == '__main__':
+    main()
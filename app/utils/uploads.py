@@ -0,0 +1,22 @@
+import io
+from contextlib import contextmanager
+
+@contextmanager
+def open_upload(file_storage):
+    """
+    Yield the content of an uploaded file as a buffer, without writing it to disk.
+
+    Werkzeug keeps small uploads in a BytesIO; its buffer is exposed as a zero-copy
+    memoryview. Any other stream (e.g. a temporary file for large uploads) is read
+    once into bytes.
+    """
+    stream = file_storage.stream
+    if isinstance(stream, io.BytesIO):
+        view = stream.getbuffer()
+        try:
+            yield view
+        finally:
+            view.release()  # The BytesIO cannot be closed while a view is exported
+    else:
+        stream.seek(0)
+        yield stream.read()
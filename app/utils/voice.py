@@ -1,35 +1,147 @@
 from gtts import gTTS
-import os
-import uuid
+import io
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from threading import Lock
+from .audio_store import AudioStore, DEFAULT_VOICE
 
 logger = logging.getLogger(__name__)
 
-def generate_audio(text, lang='fr', upload_folder='Uploads'):
-    """Generate audio from text using gTTS."""
+# Map Flask language codes to gTTS language codes
+LANG_MAP = {
+    'fr': 'fr',
+    'en': 'en',
+    'ar': 'ar'
+}
+
+def gtts_synthesize(text, lang, voice=DEFAULT_VOICE):
+    """Synthesize text with gTTS and return the MP3 bytes."""
+    buffer = io.BytesIO()
+    gTTS(text=text, lang=LANG_MAP[lang], tld=voice, slow=False).write_to_fp(buffer)
+    return buffer.getvalue()
+
+# Background synthesis for /chat: the answer is returned before its audio is ready
+TTS_WORKERS = int(os.environ.get('TTS_WORKERS', 4))
+# Seconds an /audio request waits for a synthesis still in progress
+AUDIO_WAIT_TIMEOUT = float(os.environ.get('AUDIO_WAIT_TIMEOUT', 20))
+# Seconds a client is asked to wait (Retry-After) when the synthesis outlasts AUDIO_WAIT_TIMEOUT
+AUDIO_RETRY_AFTER = 2
+
+_store = None
+_store_lock = Lock()
+_tts_executor = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix='tts')
+_pending = {}  # audio filename -> Future of its synthesis
+_pending_lock = Lock()
+
+def get_audio_store():
+    """Return the process-wide audio store, backed by gTTS."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = AudioStore(gtts_synthesize)
+    return _store
+
+def generate_audio(text, lang='fr', voice=DEFAULT_VOICE, store=None):
+    """
+    Return the stored audio for text, synthesizing it only the first time.
+
+    Returns:
+        tuple: (chemin du fichier, nom du fichier) ou (None, message d'erreur).
+    """
     try:
         if not text or not isinstance(text, str):
             return None, "Texte invalide pour la génération audio."
-        
-        # Map Flask language codes to gTTS language codes
-        lang_map = {
-            'fr': 'fr',
-            'en': 'en',
-            'ar': 'ar'
-        }
-        if lang not in lang_map:
+        if lang not in LANG_MAP:
             logger.warning(f"Langue non supportée pour TTS: {lang}")
             return None, f"Langue non supportée: {lang}"
 
-        # Generate audio
-        tts = gTTS(text=text, lang=lang_map[lang], slow=False)
-        filename = f"audio_{uuid.uuid4()}.mp3"
-        audio_path = os.path.join(upload_folder, filename)
-        
-        # Save audio file
-        tts.save(audio_path)
-        logger.info(f"Audio généré: {audio_path}")
-        return audio_path, filename
+        store = store or get_audio_store()
+        key = store.get_or_create(text, lang, voice)
+        return store.path(key), f"{key}.mp3"
     except Exception as e:
         logger.error(f"Erreur lors de la génération de l'audio: {e}", exc_info=True)
-        return None, str(e)
\ No newline at end of file
+        return None, str(e)
+
+def generate_audio_async(text, lang='fr', voice=DEFAULT_VOICE, store=None):
+    """
+    Return the audio filename of text at once, synthesizing it in the background on a miss.
+
+    The file can be requested right away: wait_for_audio waits for the synthesis.
+
+    Returns:
+        tuple: (nom du fichier, True si déjà disponible) ou (None, message d'erreur).
+    """
+    if not text or not isinstance(text, str):
+        return None, "Texte invalide pour la génération audio."
+    if lang not in LANG_MAP:
+        logger.warning(f"Langue non supportée pour TTS: {lang}")
+        return None, f"Langue non supportée: {lang}"
+
+    store = store or get_audio_store()
+    key = store.make_key(text, lang, voice)
+    filename = f"{key}.mp3"
+    if store.has(key):
+        return filename, True
+    with _pending_lock:
+        if filename in _pending:
+            return filename, False
+        future = _tts_executor.submit(store.get_or_create, text, lang, voice)
+        _pending[filename] = future
+    # Outside the lock: the callback runs at once if the synthesis is already done
+    future.add_done_callback(lambda f: _synthesis_done(filename, f))
+    return filename, False
+
+def _synthesis_done(filename, future):
+    with _pending_lock:
+        _pending.pop(filename, None)
+    if future.exception() is not None:
+        logger.error(f"Erreur lors de la génération de l'audio {filename}: {future.exception()}")
+
+def wait_for_audio(filename, timeout=None):
+    """
+    Wait for the background synthesis of filename, if one is in progress, at most
+    timeout seconds (AUDIO_WAIT_TIMEOUT by default).
+
+    Returns:
+        tuple: (False, None) si la synthèse est toujours en cours après timeout,
+        (True, message d'erreur) si elle a échoué, (True, None) sinon.
+    """
+    with _pending_lock:
+        future = _pending.get(filename)
+    if future is None:
+        return True, None
+    try:
+        future.result(timeout=AUDIO_WAIT_TIMEOUT if timeout is None else timeout)
+        return True, None
+    except FutureTimeoutError:
+        return False, None
+    except Exception as e:
+        return True, str(e)
+
+def presynthesize_kb(langs=('fr', 'en'), voice=DEFAULT_VOICE, store=None):
+    """
+    Synthesize every distinct answer of the knowledge base ahead of time.
+
+    Returns:
+        dict: number of answers synthesized or already stored, and failures, per language.
+    """
+    from .data_manager import get_df
+    store = store or get_audio_store()
+    summary = {}
+    for lang in langs:
+        df = get_df(lang)
+        column = 'Réponse' if lang == 'fr' else 'Response'
+        done, failed = 0, 0
+        if df is not None and not df.empty:
+            for answer in df[column].dropna().unique():
+                try:
+                    store.get_or_create(str(answer), lang, voice)
+                    done += 1
+                except Exception as e:
+                    failed += 1
+                    logger.warning(f"Pré-synthèse impossible ({lang}): {e}")
+        summary[lang] = {'stored': done, 'failed': failed}
+        logger.info(f"Pré-synthèse audio {lang}: {done} réponses, {failed} échecs")
+    return summary
@@ -0,0 +1,146 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import logging
+from .metrics import count_cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../cache/web_results.db'))
+# Durée de vie des résultats trouvés / des absences de résultat (secondes)
+POSITIVE_TTL = float(os.environ.get('WEB_CACHE_TTL', 24 * 3600))
+NEGATIVE_TTL = float(os.environ.get('WEB_CACHE_NEGATIVE_TTL', 10 * 60))
+MAX_ENTRIES = int(os.environ.get('WEB_CACHE_MAX_ENTRIES', 5000))
+
+def normalize_query(query):
+    """Forme canonique d'une requête : minuscules, sans accents, ponctuation ni espaces superflus."""
+    text = unicodedata.normalize('NFKD', query.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return ' '.join(text.split())
+
+class WebResultCache:
+    """
+    Cache SQLite des résultats de recherche web, partagé entre les processus workers.
+
+    Clé : (fournisseur, requête normalisée). Les résultats non vides sont conservés
+    `positive_ttl` secondes, les absences de résultat `negative_ttl` secondes. Au-delà de
+    `max_entries`, les entrées les moins récemment utilisées sont supprimées.
+    """
+
+    def __init__(self, path=CACHE_PATH, positive_ttl=POSITIVE_TTL, negative_ttl=NEGATIVE_TTL, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'upstream_calls_avoided': 0}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS web_results (
+                    provider TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    results TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (provider, query)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_web_results_last_access ON web_results (last_access)')
+
+    def _connect(self):
+        """Connexion SQLite propre au thread (WAL : lectures concurrentes entre processus)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def get(self, provider, query):
+        """
+        Résultats en cache pour (provider, query) : liste (vide pour une absence de résultat
+        encore valide) ou None si l'entrée est absente ou expirée.
+        """
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                'SELECT results, expires_at FROM web_results WHERE provider = ? AND query = ?',
+                (provider, normalize_query(query))
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self._count('misses')
+                count_cache('web', False)
+                return None
+            with conn:
+                conn.execute('UPDATE web_results SET last_access = ? WHERE provider = ? AND query = ?',
+                             (now, provider, normalize_query(query)))
+        except sqlite3.Error as e:
+            logger.warning(f"Cache web indisponible: {e}")
+            return None
+        results = json.loads(row[0])
+        self._count('hits' if results else 'negative_hits')
+        self._count('upstream_calls_avoided')
+        count_cache('web', True)
+        return results
+
+    def put(self, provider, query, results):
+        """Enregistre les résultats (liste vide = absence de résultat, TTL court)."""
+        now = time.time()
+        ttl = self.positive_ttl if results else self.negative_ttl
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO web_results (provider, query, results, expires_at, last_access) VALUES (?, ?, ?, ?, ?)',
+                    (provider, normalize_query(query), json.dumps(results, ensure_ascii=False), now + ttl, now)
+                )
+                conn.execute('DELETE FROM web_results WHERE expires_at <= ?', (now,))
+                excess = conn.execute('SELECT COUNT(*) FROM web_results').fetchone()[0] - self.max_entries
+                if excess > 0:
+                    conn.execute(
+                        'DELETE FROM web_results WHERE rowid IN (SELECT rowid FROM web_results ORDER BY last_access LIMIT ?)',
+                        (excess,)
+                    )
+        except sqlite3.Error as e:
+            logger.warning(f"Écriture impossible dans le cache web: {e}")
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM web_results')
+
+    def stats(self):
+        """Succès, absences en cache, échecs, taux de succès et appels évités (processus courant)."""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['negative_hits'] + stats['misses']
+        stats['hit_ratio'] = (stats['hits'] + stats['negative_hits']) / lookups if lookups else 0.0
+        try:
+            stats['entries'] = self._connect().execute('SELECT COUNT(*) FROM web_results').fetchone()[0]
+        except sqlite3.Error:
+            stats['entries'] = None
+        return stats
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_web_cache():
+    """Cache web du processus (les données sont partagées via le fichier SQLite)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = WebResultCache()
+    return _cache
@@ -1,4 +1,6 @@
+import atexit
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 import logging
 from urllib.parse import quote_plus
@@ -8,201 +10,441 @@ import os
 from datetime import datetime
 import uuid
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from .web_cache import get_web_cache, normalize_query
+from .single_flight import SingleFlight
+from .site_crawler import get_site_index
+from .dedup import NearDuplicateIndex
+from .data_manager import get_data_dir
 
 logger = logging.getLogger(__name__)
 
-def search_google(query, num_results=3):
+SEARCH_URL = "https://www.google.com/search"
+# WEB_SEARCH_ENABLED=0 désactive la recherche web de repli (tests de charge, hors ligne)
+WEB_SEARCH_ENABLED = os.environ.get('WEB_SEARCH_ENABLED', '1') == '1'
+# Délai global de la recherche web de repli (secondes), tous fournisseurs confondus
+WEB_SEARCH_DEADLINE = 4.0
+# Délais de connexion / lecture par requête (secondes), réduits au temps restant
+PROVIDER_TIMEOUT = (2.0, 3.5)
+# Disjoncteur : échecs consécutifs avant ouverture, puis durée d'ouverture (secondes)
+BREAKER_FAILURES = 3
+BREAKER_COOLDOWN = 60.0
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'fr,fr-FR;q=0.8,en-US;q=0.5,en;q=0.3',
+    'Accept-Encoding': 'gzip, deflate',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Cache-Control': 'max-age=0'
+}
+
+def _create_session():
+    """Session HTTP partagée : connexions keep-alive réutilisées entre les requêtes."""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+_session = _create_session()
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='web-search')
+# Les questions identiques posées simultanément partagent une seule recherche
+_web_flight = SingleFlight('web_search')
+
+class CircuitBreaker:
     """
-    Effectue une recherche Google et retourne les résultats
+    Disjoncteur par fournisseur : après `failures` échecs consécutifs, le fournisseur est
+    ignoré pendant `cooldown` secondes, puis une seule requête d'essai est autorisée.
     """
-    try:
-        # Encoder la requête pour l'URL
-        encoded_query = quote_plus(query)
-        url = f"https://www.google.com/search?q={encoded_query}"
-        
-        # Simuler un navigateur pour éviter d'être bloqué
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'fr,fr-FR;q=0.8,en-US;q=0.5,en;q=0.3',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Cache-Control': 'max-age=0'
-        }
-        
-        # Ajouter un délai pour éviter d'être bloqué
-        time.sleep(1)
-        
-        response = requests.get(url, headers=headers, timeout=10)
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._consecutive = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                return 'half-open'
+            return 'open'
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial:
+                return False
+            self._trial = True  # Une seule requête d'essai à la fois
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self._trial or self._consecutive >= self.failures:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+class SearchProvider:
+    """Fournisseur de recherche : construction de la requête et filtrage des résultats."""
+
+    def __init__(self, name, source, answer_prefix, confidence, query_template="{query}", link_filter=None, url=SEARCH_URL,
+                 response_source=None):
+        self.name = name
+        self.source = source  # Source des résultats et de l'auto-apprentissage
+        self.response_source = response_source or source  # Source affichée avec la réponse
+        self.answer_prefix = answer_prefix
+        self.confidence = confidence
+        self.query_template = query_template
+        self.link_filter = link_filter
+        self.url = url
+        self.breaker = CircuitBreaker()
+
+    def search(self, query, num_results=3, timeout=PROVIDER_TIMEOUT):
+        """Interroge le fournisseur ; lève une exception en cas d'échec HTTP ou réseau."""
+        url = f"{self.url}?q={quote_plus(self.query_template.format(query=query))}"
+        response = _session.get(url, timeout=timeout)
         response.raise_for_status()
+        return _parse_results(response.text, self.source, num_results, self.link_filter)
+
+def _parse_results(html, source, num_results, link_filter=None):
+    """Extrait titre, lien et extrait des résultats d'une page de recherche."""
+    soup = BeautifulSoup(html, 'html.parser')
+    results = []
+    for g in soup.find_all('div', class_='g'):
+        title_element = g.find('h3')
+        link_element = g.find('a')
+        snippet_element = g.find('div', class_='VwiC3b')
         
-        soup = BeautifulSoup(response.text, 'html.parser')
-        results = []
-        
-        # Extraire les résultats de recherche
-        for g in soup.find_all('div', class_='g'):
-            title_element = g.find('h3')
-            link_element = g.find('a')
-            snippet_element = g.find('div', class_='VwiC3b')
-            
-            if title_element and link_element and snippet_element:
-                title = title_element.text
-                link = link_element['href']
-                snippet = snippet_element.text
-                
-                # Vérifier si le lien est valide
-                if link.startswith('http'):
-                    results.append({
-                        'title': title,
-                        'link': link,
-                        'snippet': snippet,
-                        'source': 'Google'
-                    })
-                    
-                    if len(results) >= num_results:
-                        break
-        
-        return results
+        if title_element and link_element and snippet_element:
+            link = link_element.get('href', '')
+            if not link.startswith('http') or (link_filter and link_filter not in link):
+                continue
+            results.append({
+                'title': title_element.text,
+                'link': link,
+                'snippet': snippet_element.text,
+                'source': source
+            })
+            if len(results) >= num_results:
+                break
+    return results
+
+# Par ordre de préférence : le site de l'ISET avant la recherche générale
+ISET_PROVIDER = SearchProvider('iset', 'Site ISET', "Selon le site de l'ISET : ", 0.2,
+                               query_template="site:iset.rnu.tn {query}", link_filter='iset.rnu.tn')
+GOOGLE_PROVIDER = SearchProvider('google', 'Google', "D'après mes recherches : ", 0.1, response_source='Recherche Google')
+PROVIDERS = [ISET_PROVIDER, GOOGLE_PROVIDER]
+
+def _search_with_breaker(provider, query, num_results=3, timeout=PROVIDER_TIMEOUT, cache=None):
+    """
+    Recherche en tenant à jour le disjoncteur du fournisseur. Retourne None en cas d'échec ;
+    sinon les résultats (éventuellement vides), enregistrés dans le cache s'il est fourni.
+    """
+    try:
+        results = provider.search(query, num_results, timeout)
     except Exception as e:
-        logger.error(f"Erreur lors de la recherche Google: {e}")
-        return []
+        provider.breaker.record_failure()
+        logger.error(f"Erreur lors de la recherche {provider.name}: {e}")
+        return None
+    provider.breaker.record_success()
+    if cache:
+        cache.put(provider.name, query, results)  # Une erreur réseau n'est jamais mise en cache
+    return results
+
+def search_google(query, num_results=3):
+    """
+    Effectue une recherche Google et retourne les résultats
+    """
+    return _search_with_breaker(GOOGLE_PROVIDER, query, num_results) or []
 
 def search_iset_website(query, num_results=3):
     """
     Recherche spécifiquement sur le site de l'ISET
     """
+    return _search_with_breaker(ISET_PROVIDER, query, num_results) or []
+
+# Fichier de l'auto-apprentissage, dans le répertoire de données de data_manager
+LEARNED_FILE = 'iset_questions_reponses.csv'
+# Secondes d'attente du thread d'écriture après un ajout, pour regrouper les suivants
+LEARN_FLUSH_INTERVAL = 0.5
+
+def _file_signature(path):
     try:
-        # Encoder la requête pour l'URL
-        encoded_query = quote_plus(f"site:iset.rnu.tn {query}")
-        url = f"https://www.google.com/search?q={encoded_query}"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'fr,fr-FR;q=0.8,en-US;q=0.5,en;q=0.3',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Cache-Control': 'max-age=0'
-        }
-        
-        # Ajouter un délai pour éviter d'être bloqué
-        time.sleep(1)
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        results = []
-        
-        for g in soup.find_all('div', class_='g'):
-            title_element = g.find('h3')
-            link_element = g.find('a')
-            snippet_element = g.find('div', class_='VwiC3b')
-            
-            if title_element and link_element and snippet_element:
-                title = title_element.text
-                link = link_element['href']
-                snippet = snippet_element.text
-                
-                if 'iset.rnu.tn' in link:
-                    results.append({
-                        'title': title,
-                        'link': link,
-                        'snippet': snippet,
-                        'source': 'Site ISET'
-                    })
-                    
-                    if len(results) >= num_results:
-                        break
-        
-        return results
-    except Exception as e:
-        logger.error(f"Erreur lors de la recherche sur le site ISET: {e}")
-        return []
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+class LearnedAnswerWriter:
+    """
+    Écriture différée (write-behind) des réponses apprises, hors du chemin des requêtes.
+
+    auto_learn met la paire en file et rend la main ; un thread regroupe les paires en
+    attente, écarte les quasi-doublons (index construit depuis le CSV, qui n'est relu que
+    s'il a été modifié par ailleurs) et ajoute les nouvelles lignes en fin de fichier.
+    Les paires en attente sont écrites à la sortie.
+    """
+
+    def __init__(self, flush_interval=LEARN_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = []
+        self._wakeup = threading.Event()
+        self._writer = None
+        self._path = None
+        self._signature = None  # État du fichier après la dernière lecture ou écriture
+        self._columns = None
+        self._rows = 0
+        self._dedup = None
+
+    def add(self, row):
+        with self._lock:
+            self._pending.append(row)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name='auto-learn-writer', daemon=True)
+                self._writer.start()
+        self._wakeup.set()
+
+    def flush(self):
+        """Écrit les paires en attente ; retourne le nombre de lignes ajoutées."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            path = os.path.join(get_data_dir(), LEARNED_FILE)
+            try:
+                return self._write(path, batch)
+            except OSError as e:
+                logger.error(f"Erreur lors de l'auto-apprentissage ({path}), nouvel essai au prochain lot: {e}")
+                with self._lock:
+                    self._pending[:0] = batch
+                self._dedup = None
+                return 0
+            except Exception as e:
+                logger.error(f"Erreur lors de l'auto-apprentissage ({path}): {e}")
+                self._dedup = None  # Index relu au prochain lot
+                return 0
+
+    def _load(self, path):
+        if self._dedup is not None and self._path == path and self._signature == _file_signature(path):
+            return
+        df = pd.read_csv(path)
+        self._path = path
+        self._columns = list(df.columns)
+        self._rows = len(df)
+        self._dedup = NearDuplicateIndex.from_dataframe(df, 'Question', 'Réponse')
+        self._signature = _file_signature(path)
+
+    def _write(self, path, batch):
+        self._load(path)
+        rows = []
+        for row in batch:
+            matches, signatures = self._dedup.query(row['Question'], row['Réponse'])
+            duplicate = next((m for m in matches if m['kind'] == 'duplicate'), None)
+            if duplicate is not None:
+                logger.info(f"Auto-apprentissage ignoré, doublon de la ligne {duplicate['item_id']}: {row['Question']}")
+                continue
+            self._dedup.add(self._rows + len(rows), row['Question'], row['Réponse'], signatures)
+            rows.append(row)
+        if not rows:
+            return 0
+        new_rows = pd.DataFrame(rows)
+        if set(new_rows.columns) <= set(self._columns):
+            with open(path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                missing_newline = f.tell() > 0 and f.seek(-1, os.SEEK_END) >= 0 and f.read(1) != b'\n'
+            with open(path, 'a', encoding='utf-8', newline='') as f:
+                if missing_newline:
+                    f.write('\n')
+                new_rows.reindex(columns=self._columns).to_csv(f, header=False, index=False)
+        else:
+            # Colonnes absentes de l'en-tête (premier ajout) : réécriture complète, une seule fois
+            df = pd.concat([pd.read_csv(path), new_rows], ignore_index=True)
+            df.to_csv(path, index=False, encoding='utf-8')
+            self._columns = list(df.columns)
+        self._rows += len(rows)
+        self._signature = _file_signature(path)
+        logger.debug("%d réponses apprises ajoutées à %s", len(rows), path)
+        return len(rows)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            time.sleep(self.flush_interval)  # Laisser les ajouts suivants rejoindre le lot
+            self.flush()
+
+_learn_writer = None
+_learn_writer_lock = threading.Lock()
+
+def get_learned_answer_writer():
+    """Écrivain partagé des réponses apprises."""
+    global _learn_writer
+    if _learn_writer is None:
+        with _learn_writer_lock:
+            if _learn_writer is None:
+                _learn_writer = LearnedAnswerWriter()
+                atexit.register(_learn_writer.flush)
+    return _learn_writer
 
 def auto_learn(question, answer, source, link):
     """
-    Ajoute automatiquement la nouvelle question/réponse à la base de données
+    Ajoute la nouvelle question/réponse aux réponses apprises, sauf si une paire quasi
+    identique y figure déjà. L'écriture est faite en arrière-plan (LearnedAnswerWriter).
     """
-    try:
-        # Charger le fichier CSV existant
-        df_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'iset_questions_reponses.csv')
-        df = pd.read_csv(df_path)
-        
-        # Créer une nouvelle entrée
-        new_row = {
-            'Question': question,
-            'Réponse': answer,
-            'Lien': link,
-            'Catégorie': 'Auto-apprentissage',
-            'Rating': 0,
-            'Source': source,
-            'Date_Ajout': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'response_id': str(uuid.uuid4())
-        }
-        
-        # Ajouter la nouvelle entrée
-        df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-        
-        # Sauvegarder le fichier
-        df.to_csv(df_path, index=False, encoding='utf-8')
-        
-        return True
-    except Exception as e:
-        logger.error(f"Erreur lors de l'auto-apprentissage: {e}")
-        return False
+    get_learned_answer_writer().add({
+        'Question': question,
+        'Réponse': answer,
+        'Lien': link,
+        'Catégorie': 'Auto-apprentissage',
+        'Rating': 0,
+        'Source': source,
+        'Date_Ajout': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'response_id': str(uuid.uuid4())
+    })
 
-def get_web_response(question, confidence):
+def _build_web_response(provider, results):
+    best_result = results[0]
+    return {
+        'answer': f"{provider.answer_prefix}{best_result['snippet']}",
+        'link': best_result['link'],
+        'source': provider.response_source,
+        'confidence': provider.confidence,
+        'sources': results[:3]
+    }
+
+def get_web_response(question, confidence, providers=None, deadline=WEB_SEARCH_DEADLINE, learn=True, cache=None, site_index=None):
     """
     Obtient une réponse basée sur la recherche web si la confiance est faible
+    (jamais avec WEB_SEARCH_ENABLED=0).
+    
+    L'index local du site de l'ISET (voir site_crawler) est interrogé en premier ; une fois
+    construit, il remplace la recherche Google restreinte au site. Le cache web est
+    consulté ensuite : un résultat en cache évite l'appel réseau et un fournisseur sans
+    résultat récent n'est pas réinterrogé. Les autres fournisseurs sont interrogés en
+    parallèle sous un délai global. Les fournisseurs gardent leur ordre de préférence (le
+    site de l'ISET avant Google) : un résultat n'est retenu que lorsque tous les fournisseurs
+    prioritaires ont répondu sans résultat, ou à l'échéance du délai. Les fournisseurs dont
+    le disjoncteur est ouvert sont ignorés.
+    
+    Args:
+        question (str): Question de l'utilisateur.
+        confidence (float): Confiance de la réponse de la base de connaissances.
+        providers (list): Fournisseurs à interroger (PROVIDERS par défaut).
+        deadline (float): Durée maximale de la recherche (secondes).
+        learn (bool): Ajoute la réponse trouvée au dataset (auto-apprentissage).
+        cache (WebResultCache): Cache à utiliser (cache partagé par défaut, False pour aucun).
+        site_index (SiteIndex): Index local du site (index partagé par défaut, False pour aucun).
+    
+    Returns:
+        dict ou None: answer, link, source, confidence, sources.
     """
-    if confidence >= 0.3:  # Si la confiance est suffisante, ne pas faire de recherche web
+    if confidence >= 0.3 or not WEB_SEARCH_ENABLED:  # Si la confiance est suffisante, ne pas faire de recherche web
         return None
     
-    # Rechercher sur le site ISET d'abord
-    iset_results = search_iset_website(question)
-    if iset_results:
-        best_result = iset_results[0]
-        response = {
-            'answer': f"Selon le site de l'ISET : {best_result['snippet']}",
-            'link': best_result['link'],
-            'source': 'Site ISET',
-            'confidence': 0.2,  # Confiance moyenne car c'est une source fiable
-            'sources': [{
-                'title': best_result['title'],
-                'link': best_result['link'],
-                'snippet': best_result['snippet'],
-                'source': 'Site ISET'
-            }]
-        }
-        
-        # Auto-apprentissage
-        auto_learn(question, best_result['snippet'], 'Site ISET', best_result['link'])
-        return response
+    if cache is None:
+        cache = get_web_cache()
+    if site_index is None:
+        site_index = get_site_index()
+    providers = PROVIDERS if providers is None else providers
+    key = (normalize_query(question), tuple(provider.name for provider in providers))
+    return _web_flight.do(key, _search_web, question, providers, deadline, learn, cache, site_index)
+
+def _search_web(question, providers, deadline, learn, cache, site_index):
+    """Recherche effective de get_web_response (index local, cache, puis fournisseurs en parallèle)."""
+    if site_index and not site_index.is_empty():
+        results = site_index.search(question)
+        if results:
+            logger.info("Réponse trouvée dans l'index local du site: %s", results[0]['link'])
+            if learn:
+                auto_learn(question, results[0]['snippet'], ISET_PROVIDER.source, results[0]['link'])
+            return _build_web_response(ISET_PROVIDER, results)
+        # L'index local couvre le site : inutile de le chercher via Google
+        providers = [provider for provider in providers if provider is not ISET_PROVIDER]
     
-    # Si pas de résultats sur ISET, chercher sur Google
-    google_results = search_google(question)
-    if google_results:
-        best_result = google_results[0]
-        response = {
-            'answer': f"D'après mes recherches : {best_result['snippet']}",
-            'link': best_result['link'],
-            'source': 'Recherche Google',
-            'confidence': 0.1,  # Confiance plus faible car source externe
-            'sources': [{
-                'title': result['title'],
-                'link': result['link'],
-                'snippet': result['snippet'],
-                'source': result['source']
-            } for result in google_results[:3]]
-        }
-        
-        # Auto-apprentissage
-        auto_learn(question, best_result['snippet'], 'Google', best_result['link'])
-        return response
+    # Résultats obtenus par fournisseur ; le rang d'un fournisseur est sa place dans providers
+    rank = {provider: i for i, provider in enumerate(providers)}
+    found = {}
+    cached_providers = set()
+    to_query = []
+    for provider in providers:
+        cached = cache.get(provider.name, question) if cache else None
+        if cached:
+            # Les fournisseurs suivants sont moins prioritaires : inutile de les interroger
+            found[provider] = cached
+            cached_providers.add(provider)
+            break
+        if cached is None:  # Une absence de résultat récente évite un nouvel appel
+            to_query.append(provider)
     
-    return None 
\ No newline at end of file
+    def respond(provider, elapsed):
+        results = found[provider]
+        if provider in cached_providers:
+            logger.info("Réponse web de %s servie depuis le cache", provider.name)
+        else:
+            logger.info("Réponse web de %s en %.0f ms", provider.name, elapsed * 1000)
+            if learn:
+                auto_learn(question, results[0]['snippet'], provider.source, results[0]['link'])
+        return _build_web_response(provider, results)
+    
+    start = time.monotonic()
+    end = start + deadline
+    pending = {}
+    for provider in to_query:
+        if not provider.breaker.allow():
+            logger.info("Fournisseur %s ignoré (disjoncteur ouvert)", provider.name)
+            continue
+        timeout = (min(PROVIDER_TIMEOUT[0], deadline), min(PROVIDER_TIMEOUT[1], deadline))
+        pending[_executor.submit(_search_with_breaker, provider, question, 3, timeout, cache)] = provider
+    
+    while pending:
+        best = min(found, key=rank.get, default=None)
+        if best is not None and all(rank[best] < rank[provider] for provider in pending.values()):
+            break  # Aucun fournisseur en attente ne peut faire mieux
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            break
+        done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            provider = pending.pop(future)
+            results = future.result()
+            if results:
+                found[provider] = results
+    
+    if pending:
+        # Les requêtes restantes se terminent en arrière-plan (bornées par leur timeout)
+        # et alimentent quand même le cache
+        level = logging.INFO if found else logging.WARNING
+        logger.log(level, f"Recherche web arrêtée après {time.monotonic() - start:.1f} s sans attendre: "
+                          f"{[p.name for p in pending.values()]}")
+    if found:
+        return respond(min(found, key=rank.get), time.monotonic() - start)
+    return None
+
+def get_provider_stats():
+    """État des disjoncteurs des fournisseurs de recherche et statistiques du cache web."""
+    return {
+        'providers': {provider.name: provider.breaker.state for provider in PROVIDERS},
+        'cache': get_web_cache().stats(),
+        'site_index': get_site_index().stats(),
+        'coalescing': _web_flight.stats()
+    }
@@ -0,0 +1,167 @@
+"""
+Benchmark de montée en charge de la base de connaissances.
+
+Pour chaque taille de corpus synthétique (benchmarks.synthetic_kb), mesure
+initialize_data, preprocess_text, get_best_response, add_response, l'extraction des PDF
+numérisés (process_pdf, à froid et depuis le cache) et export_conversations :
+percentiles de latence, débit et pic d'allocation (tracemalloc). Les résultats sont
+enregistrés en JSON ; --compare affiche l'écart des médianes avec un run précédent.
+
+add_response réécrit le CSV du corpus : les corpus sont copiés dans un dossier
+temporaire avant chaque taille. L'OCR des PDF demande Tesseract.
+
+Usage:
+    python -m benchmarks.kb_scaling [--sizes 1000 10000 100000] [--queries 200] [--json out.json] [--compare old.json]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+from app.utils import data_manager
+from app.utils.data_manager import initialize_data, reset_data, get_best_response, add_response
+from app.utils.preprocess import preprocess_text
+from app.utils.pdf_processing import process_pdf, extract_pdf_pages
+from app.utils.pdf_generator import export_conversations
+from benchmarks.synthetic_kb import write_kb, write_scanned_pdf, OUT_DIR, DEFAULT_SIZES
+
+PDF_PAGES = [1, 5]
+EXPORT_SIZES = [10, 100]
+
+def measure(func, calls, trace=True):
+    """
+    Exécute func(*args) pour chaque args de calls.
+
+    Returns:
+        dict: calls, p50/p95/p99/max (ms), débit (appels/s) et pic d'allocation (octets)
+        mesuré sur le premier appel.
+    """
+    timings, peak, errors = [], None, 0
+    for i, args in enumerate(calls):
+        if trace and i == 0:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            func(*args)
+        except Exception as e:
+            errors += 1
+            print(f"    {func.__name__}: {e}", file=sys.stderr)
+        timings.append(time.perf_counter() - start)
+        if trace and i == 0:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    ms = np.asarray(timings) * 1000
+    return {
+        'calls': len(timings),
+        'errors': errors,
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(ms, 95)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        'max_ms': round(float(ms.max()), 3),
+        'throughput_per_s': round(len(timings) / sum(timings), 2) if sum(timings) else None,
+        'peak_alloc_bytes': peak
+    }
+
+def bench_size(size, queries, methods, workdir):
+    """Mesures d'un corpus de `size` lignes (copié dans workdir)."""
+    data_dir = os.path.join(workdir, f'kb_{size}')
+    shutil.copytree(write_kb(size), data_dir)
+    reset_data()
+    results = {'initialize_data': measure(lambda: initialize_data(data_dir, evaluate=False), [()])}
+
+    df = data_manager.get_df('fr')
+    sample = df.sample(n=min(queries, len(df)), random_state=42)
+    questions = [(q,) for q in sample['Question']]
+    results['preprocess_text'] = measure(preprocess_text, questions)
+    for method in methods:
+        results[f'get_best_response[{method}]'] = measure(lambda q: get_best_response(q, method=method), questions)
+
+    additions = [({'question': f"{q} (variante {i})", 'response': a, 'category': c, 'language': 'fr'},)
+                 for i, (q, a, c) in enumerate(zip(sample['Question'], sample['Réponse'], sample['Catégorie']))]
+    results['add_response'] = measure(add_response, additions[:max(1, queries // 10)])
+
+    conversations = [{'question': q, 'answer': a} for q, a in zip(sample['Question'], sample['Réponse'])]
+    for count in EXPORT_SIZES:
+        data = {'conversations': (conversations * (count // len(conversations) + 1))[:count]}
+        results[f'export_conversations[{count}]'] = measure(export_conversations, [(data,)] * 5)
+    return results
+
+def bench_pdfs(repeat):
+    """Extraction des PDF numérisés : à froid (OCR de chaque page) et depuis le cache d'extraction."""
+    results = {}
+    for pages in PDF_PAGES:
+        with open(write_scanned_pdf(pages), 'rb') as f:
+            data = f.read()
+        results[f'extract_pdf_pages[{pages}p]'] = measure(extract_pdf_pages, [(data,)] * repeat)
+        process_pdf(data, filename=f'scan_{pages}p.pdf')  # Mise en cache
+        results[f'process_pdf_cached[{pages}p]'] = measure(process_pdf, [(data,)] * repeat)
+    return results
+
+def compare(current, previous):
+    """Rapport des médianes actuelles / précédentes par taille et fonction."""
+    print("\nComparaison des médianes (p50) avec le run précédent:")
+    for size, functions in current['sizes'].items():
+        old = previous.get('sizes', {}).get(size, {})
+        for name, m in functions.items():
+            if name in old and old[name]['p50_ms']:
+                ratio = m['p50_ms'] / old[name]['p50_ms']
+                print(f"  {size:>7} {name:34s} {old[name]['p50_ms']:10.3f} -> {m['p50_ms']:10.3f} ms  (x{ratio:.2f})")
+
+def run(sizes=DEFAULT_SIZES, queries=200, methods=('knn',), pdf_repeat=3, pdfs=True):
+    report = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'queries': queries,
+        'sizes': {}
+    }
+    workdir = tempfile.mkdtemp(prefix='kb_bench_')
+    try:
+        for size in sizes:
+            print(f"Corpus de {size} lignes...", file=sys.stderr)
+            report['sizes'][str(size)] = bench_size(size, queries, methods, workdir)
+    finally:
+        reset_data()
+        shutil.rmtree(workdir, ignore_errors=True)
+    if pdfs:
+        report['pdf'] = bench_pdfs(pdf_repeat)
+    return report
+
+def print_table(title, functions):
+    print(f"\n{title}")
+    for name, m in functions.items():
+        peak = f"{m['peak_alloc_bytes'] / 1024 / 1024:8.1f} Mo" if m['peak_alloc_bytes'] is not None else '       -   '
+        print(f"  {name:34s} p50 {m['p50_ms']:10.3f}  p95 {m['p95_ms']:10.3f}  p99 {m['p99_ms']:10.3f} ms"
+              f"  {m['throughput_per_s'] or 0:10.1f}/s  pic {peak}" + (f"  erreurs {m['errors']}" if m['errors'] else ''))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de montée en charge de la base de connaissances")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--methods', nargs='+', default=['knn'], choices=data_manager.RETRIEVAL_METHODS)
+    parser.add_argument('--pdf-repeat', type=int, default=3)
+    parser.add_argument('--no-pdf', action='store_true', help="Ne mesure pas l'extraction des PDF (Tesseract absent)")
+    parser.add_argument('--json', help="Fichier de sortie JSON")
+    parser.add_argument('--compare', help="JSON d'un run précédent à comparer")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.queries, args.methods, args.pdf_repeat, not args.no_pdf)
+    for size, functions in report['sizes'].items():
+        print_table(f"{size} lignes", functions)
+    if 'pdf' in report:
+        print_table("PDF numérisés", report['pdf'])
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
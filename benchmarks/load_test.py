@@ -0,0 +1,155 @@
+"""
+Test de charge headless avec contrôle des SLA.
+
+Démarre l'application en local dans un répertoire temporaire (copie de app/data, base
+users.db, users.json et historique propres, recherche web désactivée), pour que le test
+ne modifie aucun état réel ni n'interroge Google, lance le profil locustfile.py sans interface,
+puis compare p50/p95/p99 et taux d'erreur de chaque route aux seuils de sla.json.
+Code de sortie 1 si un seuil est dépassé. Locust requis (pip install -r requirements-dev.txt).
+
+Usage:
+    python -m benchmarks.load_test [--users 20] [--spawn-rate 5] [--duration 60s]
+                                   [--host URL] [--sla benchmarks/sla.json] [--json out.json]
+"""
+import argparse
+import csv
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import requests
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+SLA_PATH = os.path.join(ROOT, 'benchmarks', 'sla.json')
+LOCUSTFILE = os.path.join(ROOT, 'locustfile.py')
+# Démarrage de l'application : chargement des données et évaluation des modèles
+STARTUP_TIMEOUT = 180
+METRICS = {'p50_ms': '50%', 'p95_ms': '95%', 'p99_ms': '99%'}
+
+def start_app(port, workdir):
+    """Lance l'application sur 127.0.0.1:port avec tout son état dans workdir et attend qu'elle réponde."""
+    data_dir = os.path.join(workdir, 'data')
+    shutil.copytree(os.path.join(ROOT, 'app', 'data'), data_dir)
+    env = dict(os.environ, CHATBOT_DATA_DIR=data_dir,
+               CHATBOT_DB_PATH=os.path.join(workdir, 'users.db'),
+               CHATBOT_USERS_JSON=os.path.join(workdir, 'users.json'),
+               CHATBOT_HISTORY_FILE=os.path.join(workdir, 'conversations.json'),
+               WEB_SEARCH_ENABLED='0')
+    server = subprocess.Popen(
+        [sys.executable, '-c',
+         f"from app import create_app; create_app().run(host='127.0.0.1', port={port}, threaded=True)"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"L'application s'est arrêtée au démarrage (code {server.returncode})")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/login", timeout=2).status_code == 200:
+                return server
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    server.terminate()
+    raise RuntimeError(f"L'application ne répond pas après {STARTUP_TIMEOUT} s")
+
+def run_locust(host, users, spawn_rate, duration, csv_prefix):
+    command = [sys.executable, '-m', 'locust', '-f', LOCUSTFILE, '--headless', '--only-summary',
+               '-u', str(users), '-r', str(spawn_rate), '-t', duration, '--host', host, '--csv', csv_prefix]
+    return subprocess.run(command, cwd=ROOT).returncode
+
+def read_stats(csv_prefix):
+    """Statistiques par route du CSV Locust : requêtes, taux d'erreur et percentiles (ms)."""
+    stats = {}
+    with open(f"{csv_prefix}_stats.csv", newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            requests_count = int(row['Request Count'])
+            stats[row['Name']] = {
+                'requests': requests_count,
+                'failures': int(row['Failure Count']),
+                'error_rate': int(row['Failure Count']) / requests_count if requests_count else 0.0,
+                'rps': float(row['Requests/s']),
+                **{metric: float(row[column]) if row[column] not in ('', 'N/A') else None
+                   for metric, column in METRICS.items()}
+            }
+    return stats
+
+def check_sla(stats, sla):
+    """
+    Compare chaque route à ses seuils (défaut + surcharges par route, 'aggregate' pour le total).
+
+    Returns:
+        list: violations (route, métrique, valeur, seuil).
+    """
+    violations = []
+    for name, values in stats.items():
+        limits = dict(sla.get('default', {}))
+        limits.update(sla.get('aggregate', {}) if name == 'Aggregated' else sla.get('endpoints', {}).get(name, {}))
+        for metric, limit in limits.items():
+            value = values.get(metric)
+            if value is not None and value > limit:
+                violations.append({'endpoint': name, 'metric': metric, 'value': value, 'limit': limit})
+    return violations
+
+def print_report(stats, violations):
+    failed = {(v['endpoint'], v['metric']) for v in violations}
+
+    def cell(name, metric, fmt):
+        value = stats[name][metric]
+        text = '-' if value is None else fmt.format(value)
+        return text + ('!' if (name, metric) in failed else ' ')
+
+    print(f"\n{'Route':28s} {'Requêtes':>9s} {'Erreurs':>9s} {'p50 ms':>10s} {'p95 ms':>10s} {'p99 ms':>10s} {'req/s':>8s}")
+    for name in sorted(stats, key=lambda n: (n == 'Aggregated', n)):
+        s = stats[name]
+        print(f"{name:28s} {s['requests']:9d} {cell(name, 'error_rate', '{:.2%}'):>9s} {cell(name, 'p50_ms', '{:.0f}'):>10s}"
+              f" {cell(name, 'p95_ms', '{:.0f}'):>10s} {cell(name, 'p99_ms', '{:.0f}'):>10s} {s['rps']:8.2f}")
+    if violations:
+        print(f"\nSLA NON RESPECTÉS ({len(violations)}):")
+        for v in violations:
+            print(f"  {v['endpoint']}: {v['metric']} = {v['value']:g} > {v['limit']}")
+    else:
+        print("\nTous les SLA sont respectés.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge headless avec contrôle des SLA")
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--spawn-rate', type=float, default=5)
+    parser.add_argument('--duration', default='60s')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--host', help="Application déjà démarrée à tester (sinon démarrée localement)")
+    parser.add_argument('--sla', default=SLA_PATH)
+    parser.add_argument('--json', help="Fichier de sortie JSON")
+    args = parser.parse_args()
+
+    with open(args.sla, 'r', encoding='utf-8') as f:
+        sla = json.load(f)
+    workdir = tempfile.mkdtemp(prefix='load_test_')
+    server = None
+    try:
+        host = args.host
+        if not host:
+            server = start_app(args.port, workdir)
+            host = f"http://127.0.0.1:{args.port}"
+        csv_prefix = os.path.join(workdir, 'locust')
+        run_locust(host, args.users, args.spawn_rate, args.duration, csv_prefix)
+        stats = read_stats(csv_prefix)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    violations = check_sla(stats, sla)
+    print_report(stats, violations)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'users': args.users, 'duration': args.duration, 'sla': sla,
+                       'stats': stats, 'violations': violations}, f, ensure_ascii=False, indent=2)
+    sys.exit(1 if violations else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark du choix des langues Tesseract.
+
+Compare la combinaison fixe 'fra+eng+ara' au choix automatique par écriture détectée
+(app.utils.script_detection) sur les images d'exemple du dépôt : précision (ratio de
+similarité avec le texte attendu) et latence (détection + OCR). Tesseract requis.
+
+Usage:
+    python -m benchmarks.ocr_languages [--repeat 3] [--json out.json]
+"""
+import argparse
+import difflib
+import json
+import os
+import time
+import pytesseract
+from PIL import Image
+from app.utils.ocr_preprocess import preprocess_for_ocr
+from app.utils.script_detection import select_languages, FALLBACK_LANGS
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+# Image -> texte attendu
+SAMPLE_IMAGES = {
+    'test_ocr.png': "Test OCR",
+    'output-1.png': "What are the office hours of professors? Are classes online or in-person?",
+    os.path.join('app', 'uploads', 'test_images_test.png'): "Test de reconnaissance de texte"
+}
+
+def accuracy(text, expected):
+    """Ratio de similarité (0-1) entre le texte reconnu et le texte attendu, espaces normalisés."""
+    return round(difflib.SequenceMatcher(None, ' '.join(text.split()).lower(), expected.lower()).ratio(), 3)
+
+def ocr_fixed(image):
+    return pytesseract.image_to_string(image, lang=FALLBACK_LANGS), FALLBACK_LANGS, None
+
+def ocr_auto(image):
+    image, lang, detection = select_languages(image)
+    return pytesseract.image_to_string(image, lang=lang), lang, detection
+
+def measure(func, image, expected, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text, lang, detection = func(image)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'lang': lang,
+        'detection': detection,
+        'median_ms': round(timings[len(timings) // 2], 1),
+        'accuracy': accuracy(text, expected),
+        'text': ' '.join(text.split())
+    }
+
+def run(repeat=3):
+    results = []
+    for name, expected in SAMPLE_IMAGES.items():
+        path = os.path.join(ROOT, name)
+        if not os.path.exists(path):
+            continue
+        image = preprocess_for_ocr(Image.open(path))
+        results.append({
+            'image': name,
+            'fixed': measure(ocr_fixed, image, expected, repeat),
+            'auto': measure(ocr_auto, image, expected, repeat)
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du choix des langues OCR")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help="Fichier de sortie JSON")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    for entry in results:
+        print(f"\n{entry['image']}")
+        for variant in ('fixed', 'auto'):
+            m = entry[variant]
+            print(f"  {variant:5s} {m['lang']:12s} médiane {m['median_ms']:8.1f} ms  précision {m['accuracy']:.3f}  {m['text'][:60]}")
+        detection = entry['auto']['detection']
+        print(f"  écriture {detection['script']} ({detection['method']}, confiance {detection['confidence']:.2f})")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
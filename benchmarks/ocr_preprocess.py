@@ -0,0 +1,100 @@
+"""
+Benchmark du prétraitement d'image avant OCR.
+
+Compare l'ancien prétraitement (tableau float64 complet) au pipeline partagé
+app.utils.ocr_preprocess sur les images d'exemple du dépôt.
+
+Usage:
+    python -m benchmarks.ocr_preprocess [--repeat 20] [--binarize] [--deskew] [--ocr] [--json out.json]
+"""
+import argparse
+import json
+import os
+import time
+import tracemalloc
+import numpy as np
+from PIL import Image
+from app.utils.ocr_preprocess import preprocess_for_ocr
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+SAMPLE_IMAGES = ['test_ocr.png', 'output-1.png']
+
+def legacy_preprocess(image):
+    """Ancien prétraitement de pdf_processing.py, conservé comme référence."""
+    image = image.convert('L')
+    image = np.array(image)
+    image = (image - np.min(image)) * (255 / (np.max(image) - np.min(image)))
+    return Image.fromarray(image.astype(np.uint8))
+
+def measure(func, image, repeat):
+    """Durées (ms) sur `repeat` exécutions et pic d'allocation Python/NumPy (octets) sur une exécution."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(image)
+        timings.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    func(image)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings.sort()
+    return {
+        'median_ms': round(timings[len(timings) // 2], 3),
+        'min_ms': round(timings[0], 3),
+        'peak_alloc_bytes': peak
+    }
+
+def ocr_time(image):
+    import pytesseract
+    start = time.perf_counter()
+    text = pytesseract.image_to_string(image, lang='fra+eng+ara')
+    return round((time.perf_counter() - start) * 1000, 1), ' '.join(text.split())
+
+def run(repeat=20, binarize=False, deskew=False, ocr=False):
+    results = []
+    for name in SAMPLE_IMAGES:
+        path = os.path.join(ROOT, name)
+        image = Image.open(path)
+        image.load()
+        options = {'binarize': binarize, 'deskew': deskew}
+        entry = {
+            'image': name,
+            'size': image.size,
+            'legacy': measure(legacy_preprocess, image, repeat),
+            'pipeline': measure(lambda img: preprocess_for_ocr(img, **options), image, repeat)
+        }
+        processed, stages = preprocess_for_ocr(image, with_report=True, **options)
+        entry['stages'] = stages
+        entry['output_size'] = processed.size
+        if ocr:
+            entry['ocr_legacy_ms'], entry['ocr_legacy_text'] = ocr_time(legacy_preprocess(image))
+            entry['ocr_pipeline_ms'], entry['ocr_pipeline_text'] = ocr_time(processed)
+        results.append(entry)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du prétraitement OCR")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--binarize', action='store_true')
+    parser.add_argument('--deskew', action='store_true')
+    parser.add_argument('--ocr', action='store_true', help="Mesure aussi le temps d'OCR (Tesseract requis)")
+    parser.add_argument('--json', help="Fichier de sortie JSON")
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.binarize, args.deskew, args.ocr)
+    for entry in results:
+        print(f"\n{entry['image']} {entry['size']} -> {entry['output_size']}")
+        for variant in ('legacy', 'pipeline'):
+            m = entry[variant]
+            print(f"  {variant:9s} médiane {m['median_ms']:9.3f} ms  min {m['min_ms']:9.3f} ms  pic {m['peak_alloc_bytes'] / 1024:10.1f} Ko")
+        for stage in entry['stages']:
+            print(f"    - {stage['stage']:10s} {stage['time_ms']:8.3f} ms  {stage['size']}  {stage['bytes'] / 1024:.1f} Ko")
+        if args.ocr:
+            print(f"  OCR legacy {entry['ocr_legacy_ms']} ms: {entry['ocr_legacy_text'][:80]}")
+            print(f"  OCR pipeline {entry['ocr_pipeline_ms']} ms: {entry['ocr_pipeline_text'][:80]}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
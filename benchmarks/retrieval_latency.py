@@ -0,0 +1,103 @@
+"""
+Benchmark de latence des méthodes de recherche de réponse.
+
+Mesure, pour chaque méthode de get_best_response (knn, cosine, naive_bayes, ensemble),
+la latence de bout en bout (détection de langue et prétraitement compris) et celle du
+seul modèle sur un vecteur déjà calculé, ainsi que la part des questions de la base qui
+retrouvent leur propre réponse. Le surcoût de 'ensemble' par rapport à 'knn' est comparé
+au budget ENSEMBLE_BUDGET_MS.
+
+Usage:
+    python -m benchmarks.retrieval_latency [--lang fr] [--queries 200] [--json out.json]
+"""
+import argparse
+import json
+import sys
+import time
+import numpy as np
+from app.utils import data_manager
+from app.utils.data_manager import initialize_data, get_best_response, RETRIEVAL_METHODS
+from app.utils.preprocess import preprocess_text
+
+# Surcoût médian toléré de 'ensemble' sur 'knn', modèle seul (ms par requête)
+ENSEMBLE_BUDGET_MS = 2.0
+
+def percentiles(timings):
+    timings = np.asarray(timings) * 1000
+    return {
+        'p50_ms': round(float(np.percentile(timings, 50)), 3),
+        'p95_ms': round(float(np.percentile(timings, 95)), 3),
+        'p99_ms': round(float(np.percentile(timings, 99)), 3)
+    }
+
+def model_call(lang, method):
+    """Appel du seul modèle sur un vecteur (même répartition que get_best_response)."""
+    state = data_manager._state[lang]
+    if method == 'ensemble':
+        return lambda vec: state['ensemble'].predict_batch(vec)
+    if method == 'naive_bayes':
+        return lambda vec: (state['svm'].predict(vec), state['naive_bayes'].predict_batch(vec))
+    return lambda vec: (state['svm'].predict(vec), state[method].predict(vec))
+
+def run(lang='fr', queries=200):
+    initialize_data()
+    df = data_manager._state[lang]['df']
+    answer_col = 'Réponse' if lang == 'fr' else 'Response'
+    sample = df.sample(n=min(queries, len(df)), random_state=42)
+    vectorizer = data_manager._state[lang]['vectorizer']
+    vectors = [vectorizer.transform([preprocess_text(q, lang)]) for q in sample['Question']]
+
+    results = {}
+    for method in RETRIEVAL_METHODS:
+        call = model_call(lang, method)
+        model_timings = []
+        for vec in vectors:
+            start = time.perf_counter()
+            call(vec)
+            model_timings.append(time.perf_counter() - start)
+
+        end_to_end, correct = [], 0
+        for question, answer in zip(sample['Question'], sample[answer_col]):
+            start = time.perf_counter()
+            response = get_best_response(question, method=method)
+            end_to_end.append(time.perf_counter() - start)
+            correct += response['answer'] == answer
+        results[method] = {
+            'model': percentiles(model_timings),
+            'end_to_end': percentiles(end_to_end),
+            'self_retrieval': round(correct / len(sample), 3)
+        }
+
+    overhead = results['ensemble']['model']['p50_ms'] - results['knn']['model']['p50_ms']
+    return {
+        'lang': lang,
+        'queries': len(sample),
+        'rows': len(df),
+        'methods': results,
+        'ensemble_overhead_ms': round(overhead, 3),
+        'ensemble_budget_ms': ENSEMBLE_BUDGET_MS,
+        'within_budget': overhead <= ENSEMBLE_BUDGET_MS
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de latence des méthodes de recherche")
+    parser.add_argument('--lang', default='fr', choices=['fr', 'en'])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--json', help="Fichier de sortie JSON")
+    args = parser.parse_args()
+
+    report = run(args.lang, args.queries)
+    print(f"\n{report['lang']}: {report['queries']} requêtes sur {report['rows']} lignes")
+    for method, m in report['methods'].items():
+        print(f"  {method:12s} modèle p50 {m['model']['p50_ms']:7.3f} ms  p95 {m['model']['p95_ms']:7.3f} ms"
+              f"  | bout en bout p50 {m['end_to_end']['p50_ms']:7.3f} ms  p95 {m['end_to_end']['p95_ms']:7.3f} ms"
+              f"  | réponse retrouvée {m['self_retrieval']:.1%}")
+    status = "OK" if report['within_budget'] else "DÉPASSÉ"
+    print(f"  surcoût ensemble/knn: {report['ensemble_overhead_ms']} ms (budget {report['ensemble_budget_ms']} ms) {status}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    sys.exit(0 if report['within_budget'] else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Générateur de bases de questions/réponses synthétiques pour les benchmarks.
+
+Les lignes sont dérivées des CSV réels (app/data) : chaque question et réponse générée
+part d'une ligne réelle dont une partie des mots est remplacée par le vocabulaire de la
+même catégorie, si bien que les corpus gardent les catégories, la longueur des textes et
+le vocabulaire de la vraie base. Génère aussi des PDF numérisés (pages image, sans
+couche texte) pour mesurer l'extraction par OCR.
+
+Usage:
+    python -m benchmarks.synthetic_kb [--sizes 1000 10000 100000] [--out benchmarks/data] [--pdf-pages 1 5]
+"""
+import argparse
+import os
+import random
+import re
+import pandas as pd
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+DATA_DIR = os.path.join(ROOT, 'app', 'data')
+OUT_DIR = os.path.join(ROOT, 'benchmarks', 'data')
+DEFAULT_SIZES = [1000, 10000, 100000]
+COLUMNS = {
+    'fr': ('Question', 'Réponse', 'Lien', 'Catégorie'),
+    'en': ('Question', 'Response', 'Link', 'Category')
+}
+# Part des mots (de plus de 3 lettres) remplacés dans chaque texte dérivé
+MUTATION_RATE = 0.4
+FONTS = ['/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', 'arial.ttf', 'DejaVuSans.ttf']
+
+def kb_dir(size, out_dir=OUT_DIR):
+    return os.path.join(out_dir, f'kb_{size}')
+
+def _vocabulary(texts):
+    return sorted({word for text in texts for word in re.findall(r'\w{4,}', str(text))})
+
+def _mutate(text, vocabulary, rng):
+    """Remplace une partie des mots du texte par des mots du vocabulaire de la catégorie."""
+    def replace(match):
+        return rng.choice(vocabulary) if rng.random() < MUTATION_RATE else match.group(0)
+    return re.sub(r'\w{4,}', replace, str(text))
+
+def generate_kb(lang, size, seed=42, data_dir=DATA_DIR):
+    """DataFrame de `size` lignes au format du CSV réel de la langue."""
+    question_col, answer_col, link_col, category_col = COLUMNS[lang]
+    source = pd.read_csv(os.path.join(data_dir, f'iset_questions_reponses_{lang}.csv'), encoding='utf-8')
+    source = source.dropna(subset=[question_col, answer_col, category_col])
+    rng = random.Random(seed)
+    vocabularies = {
+        category: _vocabulary(pd.concat([group[question_col], group[answer_col]]))
+        for category, group in source.groupby(category_col)
+    }
+    templates = source[[question_col, answer_col, link_col, category_col]].to_dict('records')
+    rows = []
+    for _ in range(size):
+        template = rng.choice(templates)
+        vocabulary = vocabularies[template[category_col]]
+        rows.append({
+            question_col: _mutate(template[question_col], vocabulary, rng),
+            answer_col: _mutate(template[answer_col], vocabulary, rng),
+            link_col: template[link_col] if isinstance(template[link_col], str) else '',
+            category_col: template[category_col],
+            'Rating': rng.choice([0, 0, 0, 0, 1, 2, -1])
+        })
+    return pd.DataFrame(rows)
+
+def write_kb(size, out_dir=OUT_DIR, seed=42):
+    """Écrit les CSV fr et en d'un corpus de `size` lignes ; retourne le dossier (réutilisé s'il existe)."""
+    target = kb_dir(size, out_dir)
+    os.makedirs(target, exist_ok=True)
+    for lang in COLUMNS:
+        path = os.path.join(target, f'iset_questions_reponses_{lang}.csv')
+        if not os.path.exists(path):
+            generate_kb(lang, size, seed).to_csv(path, index=False, encoding='utf-8')
+    return target
+
+def _font(size):
+    for name in FONTS:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+def render_page(lines, rng, size=(1240, 1754)):
+    """Page A4 à 150 dpi imitant un scan : texte noir, léger flou, rotation et bruit."""
+    image = Image.new('L', size, color=245)
+    draw = ImageDraw.Draw(image)
+    font = _font(28)
+    y = 120
+    for line in lines:
+        draw.text((100, y), line, fill=20, font=font)
+        y += 44
+        if y > size[1] - 120:
+            break
+    image = image.rotate(rng.uniform(-1.5, 1.5), fillcolor=245, resample=Image.BICUBIC)
+    image = image.filter(ImageFilter.GaussianBlur(0.6))
+    noise = Image.effect_noise(size, 12)
+    return Image.blend(image, noise, 0.08)
+
+def write_scanned_pdf(pages, out_dir=OUT_DIR, seed=42):
+    """PDF numérisé de `pages` pages de questions/réponses synthétiques ; retourne son chemin."""
+    path = os.path.join(out_dir, 'scanned', f'scan_{pages}p.pdf')
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rng = random.Random(seed)
+    kb = generate_kb('fr', pages * 12, seed)
+    images = []
+    for page in range(pages):
+        lines = []
+        for _, row in kb.iloc[page * 12:(page + 1) * 12].iterrows():
+            lines.append(row['Question'][:70])
+            lines.append('  ' + row['Réponse'][:68])
+        images.append(render_page(lines, rng).convert('RGB'))
+    images[0].save(path, 'PDF', resolution=150, save_all=True, append_images=images[1:])
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère les corpus synthétiques des benchmarks")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--pdf-pages', type=int, nargs='+', default=[1, 5])
+    parser.add_argument('--out', default=OUT_DIR)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    for size in args.sizes:
+        print(f"Corpus {size} lignes: {write_kb(size, args.out, args.seed)}")
+    for pages in args.pdf_pages:
+        print(f"PDF numérisé {pages} page(s): {write_scanned_pdf(pages, args.out, args.seed)}")
+
+if __name__ == '__main__':
+    main()
@@ -1,68 +1,122 @@
-from locust import HttpUser, task, between
+"""
+Load profile of the chatbot for Locust.
+
+Each simulated user logs in (registering the load-test account on first use) and then
+mixes the authenticated /api routes with weights close to real usage: mostly text chats,
+some history views and ratings, occasional PDF/image uploads, KB additions and exports.
+
+Run it headless against a local server with SLA checks:
+    python -m benchmarks.load_test --users 20 --duration 60s
+or directly:
+    locust -f locustfile.py --headless -u 20 -r 5 -t 60s --host http://127.0.0.1:5000
+"""
+import os
 import random
-import json
-import re
-import logging
+import uuid
+from locust import HttpUser, task, between
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
-logger = logging.getLogger(__name__)
+ROOT = os.path.dirname(os.path.abspath(__file__))
+USERNAME = os.environ.get('LOADTEST_USERNAME', 'loadtest')
+PASSWORD = os.environ.get('LOADTEST_PASSWORD', 'loadtest-password')
+# Seconds per request; passed to each call, the HTTP session itself has no default timeout
+TIMEOUT = float(os.environ.get('LOADTEST_TIMEOUT', 30))
 
-# Test questions
-TEST_QUESTIONS = [
+QUESTIONS = [
+    "Quels sont les horaires des cours d'informatique ?",
+    "Quand commence le semestre ?",
+    "Comment s'inscrire à un cours optionnel ?",
+    "Comment obtenir un financement pour un club ?",
+    "Où se trouve la bibliothèque ?",
+    "Quels sont les services informatiques de l'ISET ?",
     "What are the schedules for computer science courses?",
     "When does the semester start?",
     "How to enroll in a course?",
     "What is the weather today?"
 ]
 
+def _read(name):
+    with open(os.path.join(ROOT, name), 'rb') as f:
+        return f.read()
+
+SAMPLE_PDF = _read('What are the office hours of professors.pdf')
+SAMPLE_IMAGE = _read('test_ocr.png')
+
 class ChatbotUser(HttpUser):
-    wait_time = between(1, 5)
-    host = "http://192.168.100.201:5000"  # No trailing slash
+    wait_time = between(1, 4)
+    host = os.environ.get('LOADTEST_HOST', 'http://127.0.0.1:5000')
 
     def on_start(self):
-        # Set timeout for requests
-        self.client.timeout = 10  # 10 seconds
-        # Fetch CSRF token
-        try:
-            response = self.client.get("/", name="GET / (fetch CSRF)")
-            if response.status_code == 200:
-                match = re.search(r'<input[^>]*name="csrf_token"[^>]*value="([^"]*)"[^>]*>', response.text)
-                self.csrf_token = match.group(1) if match else None
-                if not self.csrf_token:
-                    logger.error("Failed to extract CSRF token from HTML")
-                    self.csrf_token = "dummy_csrf_token"
-                else:
-                    logger.debug("Extracted CSRF token: %s", self.csrf_token)
-            else:
-                logger.error("GET / failed with status %d: %s", response.status_code, response.text)
-                self.csrf_token = "dummy_csrf_token"
-        except Exception as e:
-            logger.error("Error fetching CSRF token: %s", str(e))
-            self.csrf_token = "dummy_csrf_token"
-
-    @task
-    def send_question(self):
-        question = random.choice(TEST_QUESTIONS)
-        payload = {
-            "message": question,
-            "output_lang": "en",
-            "csrf_token": self.csrf_token
-        }
-        headers = {"X-CSRFToken": self.csrf_token}
-        with self.client.post("/chat", data=payload, headers=headers, name="POST /chat", catch_response=True) as response:
-            if response.status_code == 200:
-                try:
-                    data = response.json()
-                    if "error" not in data:
-                        logger.debug("Successful /chat response: %s", data)
-                        response.success()
-                    else:
-                        logger.error("Error in /chat response: %s", data["error"])
-                        response.failure(f"Error in response: {data['error']}")
-                except json.JSONDecodeError:
-                    logger.error("Invalid JSON response from /chat: %s", response.text)
-                    response.failure("Invalid JSON response")
-            else:
-                logger.error("POST /chat failed with status %d: %s", response.status_code, response.text)
-                response.failure(f"HTTP Error: {response.status_code}")
\ No newline at end of file
+        self.response_ids = []
+        self.conversations = []
+        if not self._login():
+            self.client.post('/register', data={'username': USERNAME, 'email': f'{USERNAME}@loadtest.local',
+                                                'password': PASSWORD}, name='/register', allow_redirects=False,
+                             timeout=TIMEOUT)
+            if not self._login():
+                raise RuntimeError(f"Cannot log in as {USERNAME}")
+
+    def _login(self):
+        """Successful logins redirect to the chat page, failed ones back to /login."""
+        response = self.client.post('/login', data={'username': USERNAME, 'password': PASSWORD},
+                                    name='/login', allow_redirects=False, timeout=TIMEOUT)
+        return response.status_code == 302 and '/login' not in response.headers.get('Location', '')
+
+    def _chat(self, name, data, files=None):
+        with self.client.post('/chat', data=data, files=files, name=name, catch_response=True,
+                              timeout=TIMEOUT) as response:
+            if response.status_code != 200:
+                response.failure(f"HTTP {response.status_code}")
+                return
+            try:
+                payload = response.json()
+            except ValueError:
+                response.failure("Invalid JSON response")
+                return
+            if 'error' in payload:
+                response.failure(payload['error'])
+                return
+            self.response_ids = (self.response_ids + [payload['response_id']])[-20:]
+            self.conversations = (self.conversations + [{'question': data.get('message', ''), 'answer': payload['answer']}])[-20:]
+
+    @task(20)
+    def chat_text(self):
+        self._chat('/chat [text]', {'message': random.choice(QUESTIONS)})
+
+    @task(2)
+    def chat_pdf(self):
+        self._chat('/chat [pdf]', {'message': ''},
+                   files={'pdf_file': ('professors.pdf', SAMPLE_PDF, 'application/pdf')})
+
+    @task(2)
+    def chat_image(self):
+        self._chat('/chat [image]', {'message': ''},
+                   files={'image_file': ('test_ocr.png', SAMPLE_IMAGE, 'image/png')})
+
+    @task(5)
+    def history(self):
+        self.client.get('/history?limit=20', name='/history', timeout=TIMEOUT)
+
+    @task(4)
+    def rate(self):
+        if self.response_ids:
+            self.client.post('/rate', json={'response_id': random.choice(self.response_ids),
+                                            'rating': random.choice([1, 1, 1, -1])}, name='/rate', timeout=TIMEOUT)
+
+    @task(1)
+    def add_response(self):
+        # 'flag' keeps the request cheap to repeat: duplicates are reported, not merged
+        self.client.post('/add_response', json={
+            'question': f"Question de charge {uuid.uuid4().hex[:8]} ?",
+            'response': "Réponse ajoutée par le test de charge.",
+            'category': 'Général',
+            'language': 'fr',
+            'on_duplicate': 'flag'
+        }, name='/add_response', timeout=TIMEOUT)
+
+    @task(1)
+    def export(self):
+        if self.conversations:
+            with self.client.post('/export_conversations', json={'conversations': self.conversations},
+                                  name='/export_conversations', catch_response=True, timeout=TIMEOUT) as response:
+                if response.status_code != 200 or response.headers.get('Content-Type') != 'application/pdf':
+                    response.failure(f"HTTP {response.status_code}, {response.headers.get('Content-Type')}")
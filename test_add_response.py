@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from app.utils import data_manager
+from app.utils.data_manager import add_response
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'data')
+QUESTION = "Quand commence le semestre ?"
+ANSWER = "Le semestre commence le 1er septembre. Vérifiez le calendrier universitaire."
+
+class AddResponseTest(unittest.TestCase):
+    """add_response sur une copie des données : les CSV du dépôt ne sont jamais modifiés."""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        for name in os.listdir(DATA_DIR):
+            shutil.copy(os.path.join(DATA_DIR, name), self.data_dir)
+        data_manager.reset_data()
+        data_manager.initialize_data(data_dir=self.data_dir, evaluate=False)
+        self.rows = self.csv_rows()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        data_manager.reset_data()
+        data_manager.initialize_data(evaluate=False)
+
+    def csv_rows(self):
+        return len(pd.read_csv(os.path.join(self.data_dir, 'iset_questions_reponses_fr.csv')))
+
+    def near_duplicate(self, **extra):
+        return dict({'question': QUESTION.replace('?', ' ?'), 'response': ANSWER, 'language': 'fr'}, **extra)
+
+    def test_flag_is_the_default(self):
+        result, status = add_response(self.near_duplicate())
+        self.assertEqual((status, result['status']), (200, 'added'))
+        self.assertEqual(result['duplicate_of'], QUESTION)
+        self.assertEqual(self.csv_rows(), self.rows + 1)
+
+    def test_merge_adds_nothing_and_says_so(self):
+        result, status = add_response(self.near_duplicate(on_duplicate='merge'))
+        self.assertEqual((status, result['status']), (200, 'merged'))
+        self.assertEqual(result['duplicate_of'], QUESTION)
+        self.assertEqual(self.csv_rows(), self.rows)
+
+    def test_allow_skips_the_check(self):
+        result, status = add_response(self.near_duplicate(on_duplicate='allow'))
+        self.assertEqual((status, result), (200, {'success': True, 'status': 'added'}))
+        self.assertEqual(self.csv_rows(), self.rows + 1)
+
+    def test_new_question_is_added_without_report(self):
+        result, _ = add_response({'question': "Le parking de l'institut est-il gratuit ?",
+                                  'response': "Oui, pour les étudiants inscrits.", 'language': 'fr'})
+        self.assertEqual(result['status'], 'added')
+        self.assertNotIn('duplicate_of', result)
+
+    def test_invalid_input_is_rejected_before_any_work(self):
+        self.assertEqual(add_response(None)[1], 400)
+        self.assertEqual(add_response({'question': QUESTION})[1], 400)
+        self.assertEqual(add_response(self.near_duplicate(on_duplicate='replace'))[1], 400)
+        self.assertEqual(self.csv_rows(), self.rows)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,219 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from flask import Flask
+from app.utils.audio_store import AudioStore
+from app.utils import voice
+from app.utils.voice import generate_audio, generate_audio_async, wait_for_audio
+
+class StubSynthesizer:
+    """Synthétiseur local : renvoie des octets déterministes et compte les appels."""
+
+    def __init__(self, size=1000):
+        self.size = size
+        self.calls = []
+
+    def __call__(self, text, lang, voice):
+        self.calls.append((text, lang, voice))
+        seed = f"{voice}|{lang}|{text}".encode('utf-8')
+        return (seed * (self.size // len(seed) + 1))[:self.size]
+
+class AudioStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.store_dir = tempfile.mkdtemp()
+        self.synth = StubSynthesizer()
+        self.store = AudioStore(self.synth, store_dir=self.store_dir, max_bytes=3500)
+
+    def tearDown(self):
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+
+    def test_same_answer_is_synthesized_once(self):
+        key1 = self.store.get_or_create("Le semestre commence le 1er septembre.", 'fr')
+        key2 = self.store.get_or_create("Le semestre  commence le 1er septembre. ", 'fr')
+        self.assertEqual(key1, key2)
+        self.assertEqual(len(self.synth.calls), 1)
+        self.assertTrue(os.path.exists(self.store.path(key1)))
+        stats = self.store.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_language_and_voice_are_part_of_the_key(self):
+        keys = {
+            self.store.get_or_create("Bonjour", 'fr'),
+            self.store.get_or_create("Bonjour", 'en'),
+            self.store.get_or_create("Bonjour", 'fr', voice='ca')
+        }
+        self.assertEqual(len(keys), 3)
+
+    def test_least_recently_used_is_evicted(self):
+        first = self.store.get_or_create("un", 'fr')
+        second = self.store.get_or_create("deux", 'fr')
+        self.store.get_or_create("un", 'fr')  # "deux" devient le moins récent
+        self.store.get_or_create("trois", 'fr')
+        self.store.get_or_create("quatre", 'fr')
+        self.assertTrue(os.path.exists(self.store.path(first)))
+        self.assertFalse(os.path.exists(self.store.path(second)))
+        self.assertLessEqual(self.store.stats()['bytes'], 3500)
+
+    def test_index_survives_restart(self):
+        key = self.store.get_or_create("Persistant", 'fr')
+        restarted = AudioStore(self.synth, store_dir=self.store_dir)
+        self.assertEqual(restarted.get_or_create("Persistant", 'fr'), key)
+        self.assertEqual(len(self.synth.calls), 1)
+
+    def test_synthesis_failure_is_not_stored(self):
+        def failing(text, lang, voice):
+            raise RuntimeError("service indisponible")
+        store = AudioStore(failing, store_dir=self.store_dir)
+        path, error = generate_audio("Bonjour", 'fr', store=store)
+        self.assertIsNone(path)
+        self.assertIn("indisponible", error)
+        self.assertEqual(store.stats()['files'], 0)
+
+    def test_concurrent_misses_share_one_synthesis(self):
+        def slow_synth(text, lang, voice):
+            time.sleep(0.2)
+            return self.synth(text, lang, voice)
+        store = AudioStore(slow_synth, store_dir=self.store_dir)
+        keys = []
+        threads = [threading.Thread(target=lambda: keys.append(store.get_or_create("Annonce", 'fr'))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(keys)), 1)
+        self.assertEqual(len(keys), 5)
+        self.assertEqual(len(self.synth.calls), 1)
+        self.assertEqual(store.stats()['coalesced'], 4)
+
+    def test_generate_audio_rejects_unsupported_language(self):
+        path, error = generate_audio("Hallo", 'de', store=self.store)
+        self.assertIsNone(path)
+        self.assertEqual(self.synth.calls, [])
+
+    def test_async_generation_returns_before_synthesis(self):
+        release = threading.Event()
+        def blocked_synth(text, lang, voice):
+            release.wait(5)
+            return self.synth(text, lang, voice)
+        store = AudioStore(blocked_synth, store_dir=self.store_dir)
+        filename, ready = generate_audio_async("Plus tard", 'fr', store=store)
+        self.assertFalse(ready)
+        self.assertEqual(filename, f"{store.make_key('Plus tard', 'fr')}.mp3")
+        self.assertEqual(wait_for_audio(filename, timeout=0.05), (False, None))
+        release.set()
+        self.assertEqual(wait_for_audio(filename), (True, None))
+        self.assertEqual(generate_audio_async("Plus tard", 'fr', store=store), (filename, True))
+        self.assertEqual(len(self.synth.calls), 1)
+
+    def test_async_generation_failure_is_reported_to_waiter(self):
+        def failing(text, lang, voice):
+            time.sleep(0.1)
+            raise RuntimeError("service indisponible")
+        store = AudioStore(failing, store_dir=self.store_dir)
+        filename, ready = generate_audio_async("Bonjour", 'fr', store=store)
+        self.assertFalse(ready)
+        done, error = wait_for_audio(filename)
+        self.assertTrue(done)
+        self.assertIn("indisponible", error)
+
+class AudioRouteTest(unittest.TestCase):
+    """ETag, requêtes conditionnelles et Range sur les fichiers du store."""
+
+    def setUp(self):
+        self.store_dir = tempfile.mkdtemp()
+        self.store = AudioStore(StubSynthesizer(size=5000), store_dir=self.store_dir)
+        self.key = self.store.get_or_create("Réponse à lire", 'fr')
+        app = Flask(__name__)
+        app.add_url_rule('/audio/<filename>', 'audio', lambda filename: self.store.send(filename) or ('', 404))
+        self.client = app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+
+    def test_full_download_has_etag(self):
+        r = self.client.get(f'/audio/{self.key}.mp3')
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.data), 5000)
+        self.assertIn(self.key, r.headers['ETag'])
+        r.close()
+
+    def test_replay_is_not_modified(self):
+        etag = self.client.get(f'/audio/{self.key}.mp3').headers['ETag']
+        r = self.client.get(f'/audio/{self.key}.mp3', headers={'If-None-Match': etag})
+        self.assertEqual(r.status_code, 304)
+        # Le fichier reste disponible après plusieurs lectures
+        self.assertEqual(self.client.get(f'/audio/{self.key}.mp3').status_code, 200)
+
+    def test_range_request(self):
+        r = self.client.get(f'/audio/{self.key}.mp3', headers={'Range': 'bytes=1000-1999'})
+        self.assertEqual(r.status_code, 206)
+        self.assertEqual(len(r.data), 1000)
+        self.assertEqual(r.headers['Content-Range'], 'bytes 1000-1999/5000')
+        with open(self.store.path(self.key), 'rb') as f:
+            self.assertEqual(r.data, f.read()[1000:2000])
+        r.close()
+
+    def test_invalid_or_unknown_file(self):
+        self.assertEqual(self.client.get('/audio/..%2Fusers.db').status_code, 404)
+        self.assertEqual(self.client.get(f"/audio/{'0' * 64}.mp3").status_code, 404)
+
+class PendingAudioRouteTest(unittest.TestCase):
+    """Route /audio de l'API pendant une synthèse lancée par /chat."""
+
+    def setUp(self):
+        from app.routes import api
+        self.store_dir = tempfile.mkdtemp()
+        self.release = threading.Event()
+        self.synth = StubSynthesizer()
+        self.store = AudioStore(self.blocked_synth, store_dir=self.store_dir)
+        patchers = [
+            mock.patch.object(api, 'get_audio_store', return_value=self.store),
+            mock.patch.object(voice, 'AUDIO_WAIT_TIMEOUT', 0.05)
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        app = Flask(__name__)
+        app.config['LOGIN_DISABLED'] = True
+        app.add_url_rule('/audio/<filename>', 'audio', api.serve_audio)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        self.release.set()
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+
+    def blocked_synth(self, text, lang, voice):
+        self.release.wait(5)
+        return self.synth(text, lang, voice)
+
+    def test_pending_synthesis_asks_to_retry(self):
+        filename, ready = generate_audio_async("Réponse longue", 'fr', store=self.store)
+        self.assertFalse(ready)
+        r = self.client.get(f'/audio/{filename}')
+        self.assertEqual(r.status_code, 503)
+        self.assertEqual(r.headers['Retry-After'], str(voice.AUDIO_RETRY_AFTER))
+        self.release.set()
+        wait_for_audio(filename, timeout=5)
+        r = self.client.get(f'/audio/{filename}')
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.data), 1000)
+        r.close()
+
+    def test_failed_synthesis_is_bad_gateway(self):
+        def failing(text, lang, voice):
+            self.release.wait(5)
+            raise RuntimeError("service indisponible")
+        self.store.synthesizer = failing
+        filename, _ = generate_audio_async("Échec", 'fr', store=self.store)
+        self.release.set()
+        with mock.patch.object(voice, 'AUDIO_WAIT_TIMEOUT', 5):
+            r = self.client.get(f'/audio/{filename}')
+        self.assertEqual(r.status_code, 502)
+        self.assertIn("indisponible", r.get_json()['details'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+from app.utils.models.cosine_model import CosineModel
+from app.utils.models.ensemble_model import EnsembleModel, fit_calibrator, parse_weights
+from app.utils.models.naive_bayes import NaiveBayesModel
+from app.utils.models.svm_model import SVMModel
+from app.utils.preprocess import initialize_vectorizer, preprocess_text
+from test_naive_bayes import ROWS, dataset
+
+# Deux questions par catégorie pour que l'SVM (probability=True) puisse s'entraîner
+EXTRA_ROWS = [
+    ("Quelle est la date des examens de rattrapage ?", "Les rattrapages ont lieu en juin.", 'Examens', 0),
+    ("Quelle est la durée du stage ?", "Le stage dure quatre mois.", 'Stages', 0),
+    ("Le restaurant universitaire est-il ouvert le samedi ?", "Le restaurant est fermé le samedi.", 'Vie étudiante', 0),
+]
+QUERIES = ["horaires bibliothèque", "examens janvier", "durée stage", "mot inconnu"]
+# Base de calibration : des sujets formulés trois fois (réponse partagée, retrouvable hors pli)
+# et des questions formulées une seule fois (aucune bonne réponse hors pli)
+TOPICS = [('bibliothèque', 'étudiants'), ('cantine', 'repas'), ('piscine', 'nageurs'), ('laboratoire', 'chimistes'),
+          ('parking', 'voitures'), ('infirmerie', 'malades'), ('gymnase', 'sportifs'), ('amphithéâtre', 'conférences')]
+SINGLES = ['bourse', 'diplôme', 'logement', 'transport', 'stage', 'club', 'absence', 'badge', 'wifi', 'imprimante']
+CATEGORIES = ['Horaires', 'Services', 'Vie étudiante', 'Scolarité']
+
+def calibration_dataset():
+    rows = []
+    for i, (place, people) in enumerate(TOPICS):
+        answer, category = f"La {place} accueille les {people} de 8h à 18h.", CATEGORIES[i % 4]
+        rows += [(f"Quand ouvre la {place} pour les {people} ?", answer, category, 0),
+                 (f"Horaires de la {place} des {people} ?", answer, category, 0),
+                 (f"À quelle heure la {place} reçoit les {people} ?", answer, category, 0)]
+    rows += [(f"Comment obtenir un {word} ?", f"Voir le service {word}.", CATEGORIES[i % 4], 0) for i, word in enumerate(SINGLES)]
+    return dataset(rows)
+
+class EnsembleModelTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.df = dataset(ROWS + EXTRA_ROWS)
+        cls.vectorizer, cls.X = initialize_vectorizer(cls.df, 'fr')
+        cls.svm = SVMModel(cls.df, cls.X, lang='fr')
+        cls.naive_bayes = NaiveBayesModel(cls.df, cls.vectorizer, cls.X, lang='fr')
+        cls.queries = cls.vectorizer.transform([preprocess_text(q, 'fr') for q in QUERIES])
+
+    def ensemble(self, **weights):
+        return EnsembleModel(self.X, self.svm, self.naive_bayes, self.df, lang='fr',
+                             weights=dict(parse_weights(''), **weights) if weights else None)
+
+    def test_score_is_the_weighted_sum_of_the_signals(self):
+        ensemble = self.ensemble(similarity=2, naive_bayes=1, intent=1)
+        np.testing.assert_allclose(ensemble.weights, [0.5, 0.25, 0.25])
+        similarity = cosine_similarity(self.queries, self.X)
+        answer_probs = self.naive_bayes.model.predict_proba(self.queries)[:, self.naive_bayes.row_classes]
+        intent_probs = self.svm.model.predict_proba(self.queries)
+        row_intents = [list(self.svm.label_encoder.inverse_transform(self.svm.model.classes_)).index(c)
+                       for c in self.df['Catégorie']]
+        expected = 0.5 * similarity + 0.25 * answer_probs + 0.25 * intent_probs[:, row_intents]
+        scores, _ = ensemble.scores(self.queries)
+        np.testing.assert_allclose(scores, expected)
+
+    def test_confidence_stays_in_unit_interval(self):
+        indices, confidences, intents = self.ensemble().predict_batch(self.queries)
+        self.assertTrue(((confidences >= 0) & (confidences <= 1)).all())
+        self.assertEqual(self.df.loc[indices[1], 'Catégorie'], 'Examens')
+        self.assertEqual(self.df.loc[indices[2], 'Catégorie'], 'Stages')
+        # L'intention est la catégorie de la ligne retournée, jamais celle d'une autre réponse
+        self.assertEqual(list(intents), list(self.df.loc[indices, 'Catégorie']))
+
+    def test_similarity_only_matches_cosine_model(self):
+        ensemble = self.ensemble(similarity=1, naive_bayes=0, intent=0)
+        indices, confidences, _ = ensemble.predict_batch(self.queries[:3])
+        cosine_indices, cosine_confidences = CosineModel(self.X).predict_batch(self.queries[:3])
+        np.testing.assert_array_equal(indices, cosine_indices)
+        np.testing.assert_allclose(confidences, cosine_confidences)
+
+    def test_answer_signal_breaks_similarity_ties(self):
+        # Les deux paraphrases des horaires partagent leur probabilité Naive Bayes :
+        # seule la similarité les départage
+        scores, _ = self.ensemble(similarity=0, naive_bayes=1, intent=0).scores(self.queries[:1])
+        self.assertEqual(scores[0, 0], scores[0, 1])
+
+    def test_invalid_weights(self):
+        with self.assertRaises(ValueError):
+            parse_weights("similarity:0.5,popularity:0.5")
+        with self.assertRaises(ValueError):
+            self.ensemble(similarity=0, naive_bayes=0, intent=0)
+        self.assertEqual(parse_weights("intent:0.6")['intent'], 0.6)
+
+class CalibrationTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.df = calibration_dataset()
+        cls.vectorizer, cls.X = initialize_vectorizer(cls.df, 'fr')
+        cls.svm = SVMModel(cls.df, cls.X, lang='fr')
+        cls.naive_bayes = NaiveBayesModel(cls.df, cls.vectorizer, cls.X, lang='fr')
+        cls.calibrator = fit_calibrator(cls.df, cls.vectorizer, cls.X, lang='fr')
+
+    def test_calibrated_confidence_is_monotonic_in_the_fused_score(self):
+        self.assertIsNotNone(self.calibrator)
+        probabilities = self.calibrator.predict_proba(np.linspace(0, 1, 11).reshape(-1, 1))[:, 1]
+        self.assertTrue((np.diff(probabilities) > 0).all())
+        self.assertTrue(((probabilities > 0) & (probabilities < 1)).all())
+
+    def test_threshold_applies_to_calibrated_confidence(self):
+        raw = EnsembleModel(self.X, self.svm, self.naive_bayes, self.df, lang='fr')
+        calibrated = EnsembleModel(self.X, self.svm, self.naive_bayes, self.df, lang='fr', calibrator=self.calibrator)
+        queries = self.vectorizer.transform([preprocess_text(q, 'fr') for q in ["horaires piscine nageurs", "mot inconnu"]])
+        raw_indices, raw_confidences, _ = raw.predict_batch(queries)
+        indices, confidences, _ = calibrated.predict_batch(queries)
+        # Même ligne retournée, seule la confiance passe par le calibrateur
+        np.testing.assert_array_equal(indices, raw_indices)
+        np.testing.assert_allclose(confidences, self.calibrator.predict_proba(raw_confidences.reshape(-1, 1))[:, 1])
+        self.assertGreaterEqual(confidences[0], 0.3)
+        self.assertLess(confidences[1], confidences[0])
+
+    def test_no_calibrator_without_enough_outcomes(self):
+        # Aucune réponse partagée : aucune prédiction hors pli ne peut être correcte
+        df = dataset(ROWS[2:] + EXTRA_ROWS)
+        vectorizer, X = initialize_vectorizer(df, 'fr')
+        self.assertIsNone(fit_calibrator(df, vectorizer, X, lang='fr'))
+
+if __name__ == '__main__':
+    unittest.main()
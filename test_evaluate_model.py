@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+from app.utils import data_manager, evaluate_model
+
+# Sujets reformulés (réponse partagée, retrouvable hors pli) et questions isolées, sur
+# des catégories qui se recoupent pour que les modèles ne soient pas tous exacts
+FR_TOPICS = [
+    ("bibliothèque", "Horaires", ["Quand ouvre la bibliothèque ?", "Horaires de la bibliothèque ?", "La bibliothèque ouvre à quelle heure ?"]),
+    ("cantine", "Vie étudiante", ["Où se trouve la cantine ?", "Comment accéder à la cantine ?", "La cantine est dans quel bloc ?"]),
+    ("examens", "Scolarité", ["Quand ont lieu les examens ?", "Date des examens du semestre ?", "Calendrier des examens ?"]),
+    ("stage", "Stages", ["Comment trouver un stage ?", "Où chercher un stage d'été ?", "Le stage est-il obligatoire ?"]),
+    ("inscription", "Scolarité", ["Comment faire l'inscription ?", "Documents pour l'inscription ?", "Inscription en ligne possible ?"]),
+]
+FR_SINGLES = [
+    ("Quand ouvre la cantine le samedi ?", "Horaires"), ("Les horaires des examens de rattrapage ?", "Horaires"),
+    ("Bourse de stage à l'étranger ?", "Stages"), ("Club de robotique de l'institut ?", "Vie étudiante"),
+    ("Attestation d'inscription en ligne ?", "Scolarité"), ("Parking de la bibliothèque ?", "Vie étudiante"),
+]
+EN_TOPICS = [
+    ("library", "Schedules", ["When does the library open?", "Library opening hours?", "What time is the library open?"]),
+    ("exams", "Studies", ["When are the exams?", "Exam dates this semester?", "Exam calendar?"]),
+    ("internship", "Internships", ["How to find an internship?", "Where to look for an internship?", "Is the internship mandatory?"]),
+]
+EN_SINGLES = [("Library parking?", "Campus"), ("Exam retake schedule?", "Schedules"), ("Internship grant abroad?", "Internships")]
+
+def write_dataset(data_dir):
+    """CSV fr/en synthétiques au format de app/data."""
+    fr = [{'Question': q, 'Réponse': f"Réponse sur {topic}.", 'Lien': '', 'Catégorie': category, 'Rating': 0}
+          for topic, category, questions in FR_TOPICS for q in questions]
+    fr += [{'Question': q, 'Réponse': f"Réponse isolée {i}.", 'Lien': '', 'Catégorie': c, 'Rating': 0} for i, (q, c) in enumerate(FR_SINGLES)]
+    en = [{'Question': q, 'Response': f"Answer about {topic}.", 'Link': '', 'Category': category, 'Rating': 0}
+          for topic, category, questions in EN_TOPICS for q in questions]
+    en += [{'Question': q, 'Response': f"Single answer {i}.", 'Link': '', 'Category': c, 'Rating': 0} for i, (q, c) in enumerate(EN_SINGLES)]
+    pd.DataFrame(fr).to_csv(os.path.join(data_dir, 'iset_questions_reponses_fr.csv'), index=False, encoding='utf-8')
+    pd.DataFrame(en).to_csv(os.path.join(data_dir, 'iset_questions_reponses_en.csv'), index=False, encoding='utf-8')
+
+# Résultats de l'ancienne boucle ligne par ligne sur ces données (5 plis, sans SBERT) :
+# exactitude des réponses, puis exactitude et F1 pondéré moyens des intentions
+REFERENCE = {
+    'fr': {'knn': (0.285714, 0.42, 0.403333), 'cosine': (0.285714, 0.42, 0.403333),
+           'naive_bayes': (0.238095, 0.56, 0.562857), 'svm': (0.0, 0.43, 0.455),
+           'ensemble': (0.238095, 0.42, 0.403333)},
+    'en': {'knn': (0.583333, 0.666667, 0.666667), 'cosine': (0.583333, 0.666667, 0.666667),
+           'naive_bayes': (0.416667, 0.5, 0.477778), 'svm': (0.0, 0.6, 0.577778),
+           'ensemble': (0.416667, 0.5, 0.477778)}
+}
+
+class CrossValidationTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.data_dir = tempfile.mkdtemp()
+        write_dataset(cls.data_dir)
+        data_manager.reset_data()
+        data_manager.initialize_data(data_dir=cls.data_dir, evaluate=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.data_dir, ignore_errors=True)
+        data_manager.reset_data()
+        data_manager.initialize_data(evaluate=False)
+
+    def summary(self, results):
+        return {model: (result['mean_accuracy'], result['mean_classification_report']['accuracy'],
+                        result['mean_classification_report']['weighted avg']['f1-score'])
+                for model, result in results.items()}
+
+    def assert_matches_reference(self, lang, summary):
+        self.assertEqual(sorted(summary), sorted(REFERENCE[lang]))
+        for model, values in REFERENCE[lang].items():
+            for value, expected in zip(summary[model], values):
+                self.assertAlmostEqual(value, expected, places=6, msg=f"{lang} {model}")
+
+    def test_serial_and_parallel_folds_match_the_row_loop(self):
+        for lang in ('fr', 'en'):
+            with mock.patch.object(evaluate_model, 'EVAL_N_JOBS', 1):
+                serial = self.summary(evaluate_model.cross_validate_model(lang, use_sbert=False))
+            parallel = self.summary(evaluate_model.cross_validate_model(lang, use_sbert=False))
+            self.assert_matches_reference(lang, serial)
+            self.assert_matches_reference(lang, parallel)
+
+if __name__ == '__main__':
+    unittest.main()
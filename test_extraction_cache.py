@@ -0,0 +1,81 @@
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from app.utils import extraction_cache, pdf_processing
+from app.utils.extraction_cache import ExtractionCache
+
+SETTINGS = {'extractor': 'pdf', 'ocr_lang': 'fra+eng'}
+
+class ExtractionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = ExtractionCache(cache_dir=self.cache_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_identical_bytes_hit(self):
+        key = self.cache.make_key(b'%PDF-1.4 contenu', SETTINGS)
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, {'text': "Horaires"})
+        self.assertEqual(self.cache.make_key(bytearray(b'%PDF-1.4 contenu'), SETTINGS), key)
+        self.assertEqual(self.cache.get(key, source_size=16), {'text': "Horaires"})
+        stats = self.cache.stats()
+        self.assertEqual((stats['memory_hits'], stats['misses'], stats['bytes_saved']), (1, 1, 16))
+
+    def test_key_depends_on_content_and_settings(self):
+        key = self.cache.make_key(b'contenu', SETTINGS)
+        self.assertNotEqual(self.cache.make_key(b'contenu!', SETTINGS), key)
+        self.assertNotEqual(self.cache.make_key(b'contenu', dict(SETTINGS, ocr_lang='ara')), key)
+
+    def test_extractor_version_bump_misses(self):
+        key = self.cache.make_key(b'contenu', SETTINGS)
+        self.cache.put(key, {'text': "Ancienne extraction"})
+        with mock.patch.object(extraction_cache, 'EXTRACTOR_VERSION', extraction_cache.EXTRACTOR_VERSION + 1):
+            new_key = self.cache.make_key(b'contenu', SETTINGS)
+        self.assertNotEqual(new_key, key)
+        self.assertIsNone(self.cache.get(new_key))
+
+    def test_disk_tier_survives_restart(self):
+        key = self.cache.make_key(b'contenu', SETTINGS)
+        self.cache.put(key, {'text': "Persistant"})
+        restarted = ExtractionCache(cache_dir=self.cache_dir)
+        self.assertEqual(restarted.get(key), {'text': "Persistant"})
+        self.assertEqual(restarted.stats()['disk_hits'], 1)
+
+    def test_disk_eviction_keeps_newest(self):
+        cache = ExtractionCache(cache_dir=self.cache_dir, max_memory_entries=1, max_disk_bytes=100)
+        keys = [cache.make_key(bytes([i]), SETTINGS) for i in range(3)]
+        for key in keys:
+            cache.put(key, {'text': 'x' * 60})
+        self.assertEqual(cache.stats()['disk_entries'], 1)
+        self.assertIsNone(cache.get(keys[0]))
+        self.assertIsNotNone(cache.get(keys[2]))
+
+class PDFExtractionCacheTest(unittest.TestCase):
+    """process_pdf ne réextrait pas un PDF déjà vu."""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = ExtractionCache(cache_dir=self.cache_dir)
+        patcher = mock.patch.object(pdf_processing, 'get_extraction_cache', return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with open('What are the office hours of professors.pdf', 'rb') as f:
+            self.data = f.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_same_upload_is_extracted_once(self):
+        with mock.patch.object(pdf_processing, 'extract_pdf_pages', wraps=pdf_processing.extract_pdf_pages) as extract:
+            first = pdf_processing.process_pdf(self.data, with_report=True, filename='a.pdf')
+            second = pdf_processing.process_pdf(bytes(self.data), with_report=True, filename='b.pdf')
+        self.assertEqual(extract.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertTrue(first[0])
+        self.assertEqual(self.cache.stats()['memory_hits'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
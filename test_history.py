@@ -0,0 +1,103 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from app.utils.history import ConversationLog
+
+def conversation(i, session_id='s1'):
+    return {'session_id': session_id, 'question': f"Question {i}", 'answer': f"Réponse {i}", 'link': '',
+            'category': 'Général', 'response_id': str(i), 'rating': 'Non évalué'}
+
+class ConversationLogTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'conversations.json')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump([conversation(0)], f, ensure_ascii=False, indent=2)
+        self.log = ConversationLog(self.path, flush_interval=60)  # Flushed explicitly
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def read_file(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_readable_before_written(self):
+        self.log.append(conversation(1))
+        self.log.append(conversation(2, session_id='s2'))
+        self.assertEqual(len(self.read_file()), 1)
+        self.assertEqual([c['response_id'] for c in self.log.get('s1')], ['0', '1'])
+        self.assertEqual(self.log.get(limit=1)[0]['session_id'], 's2')
+
+    def test_flush_appends_batch_in_place(self):
+        for i in range(1, 4):
+            self.log.append(conversation(i))
+        self.assertEqual(self.log.flush(), 3)
+        self.assertEqual(self.log.flush(), 0)
+        saved = self.read_file()
+        self.assertEqual([c['response_id'] for c in saved], ['0', '1', '2', '3'])
+        self.assertEqual(saved[1]['answer'], "Réponse 1")
+
+    def test_corrupt_file_is_set_aside(self):
+        self.log.get()  # Loaded before the file is damaged
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('{')
+        self.log.append(conversation(1))
+        self.assertEqual(self.log.flush(), 1)
+        self.assertEqual([c['response_id'] for c in self.read_file()], ['1'])
+        self.assertTrue(os.path.exists(self.path + '.corrupt'))
+        self.assertEqual([c['response_id'] for c in self.log.get('s1')], ['0', '1'])
+
+class BoundedConversationLogTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'conversations.json')
+        self.log = ConversationLog(self.path, flush_interval=60, tail=3, max_sessions=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def ids(self, conversations):
+        return [c['response_id'] for c in conversations]
+
+    def test_memory_keeps_only_a_tail_per_session(self):
+        for i in range(10):
+            self.log.append(conversation(i))
+        self.assertEqual(len(self.log._sessions['s1']), 3)
+        self.assertEqual(len(self.log._recent), 3)
+        with mock.patch.object(self.log, '_read_file', side_effect=AssertionError("file read")):
+            self.assertEqual(self.ids(self.log.get('s1', limit=2)), ['8', '9'])
+
+    def test_longer_history_is_read_from_file_and_pending(self):
+        for i in range(6):
+            self.log.append(conversation(i))
+        self.log.flush()
+        self.log.append(conversation(6))  # Not written yet
+        self.assertEqual(self.ids(self.log.get('s1', limit=5)), ['2', '3', '4', '5', '6'])
+        self.assertEqual(self.ids(self.log.get('s1')), [str(i) for i in range(7)])
+        self.assertEqual(self.ids(self.log.get(limit=4)), ['3', '4', '5', '6'])
+
+    def test_least_recently_used_sessions_are_evicted(self):
+        self.log.append(conversation(0, 'a'))
+        self.log.append(conversation(1, 'b'))
+        self.log.get('a')  # 'b' is now the least recently used
+        self.log.append(conversation(2, 'c'))
+        self.log.append(conversation(3, 'b'))  # Evicted: history stays on disk only
+        self.assertEqual(list(self.log._sessions), ['a', 'c'])
+        self.log.flush()
+        self.assertEqual(self.ids(self.log.get('b')), ['1', '3'])
+        self.assertEqual(self.ids(self.log.get('unknown')), [])
+
+    def test_history_is_reloaded_after_restart(self):
+        for i in range(5):
+            self.log.append(conversation(i, 'a' if i % 2 else 'b'))
+        self.log.flush()
+        restarted = ConversationLog(self.path, flush_interval=60, tail=3, max_sessions=2)
+        self.assertEqual(self.ids(restarted.get('a')), ['1', '3'])
+        self.assertEqual(self.ids(restarted.get('b', limit=3)), ['0', '2', '4'])
+
+if __name__ == '__main__':
+    unittest.main()
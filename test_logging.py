@@ -0,0 +1,39 @@
+import json
+import logging
+import unittest
+from app.utils.logging import JsonFormatter, SamplingFilter
+
+def _record(name='app', level=logging.DEBUG, lineno=10, module='data_manager', msg='Processing %s', args=('x',)):
+    record = logging.LogRecord(name, level, f'/app/utils/{module}.py', lineno, msg, args, None)
+    return record
+
+class SamplingFilterTest(unittest.TestCase):
+    def test_keeps_one_record_in_n_per_call_site(self):
+        sampler = SamplingFilter(SamplingFilter.parse('data_manager=0.25'))
+        kept = [sampler.filter(_record()) for _ in range(8)]
+        self.assertEqual(kept, [True, False, False, False, True, False, False, False])
+        # Another call site of the same module has its own count
+        self.assertTrue(sampler.filter(_record(lineno=20)))
+
+    def test_fractional_rates_keep_their_share(self):
+        for rate, expected in ((0.7, 70), (0.6, 60), (0.1, 10), (0.33, 33)):
+            sampler = SamplingFilter({'data_manager': rate})
+            self.assertEqual(sum(sampler.filter(_record()) for _ in range(100)), expected, rate)
+
+    def test_warnings_and_unsampled_loggers_are_kept(self):
+        sampler = SamplingFilter(SamplingFilter.parse('app.utils.pdf_processing=0'))
+        self.assertFalse(sampler.filter(_record(name='app.utils.pdf_processing', module='pdf_processing')))
+        self.assertTrue(sampler.filter(_record(name='app.utils.pdf_processing', module='pdf_processing', level=logging.WARNING)))
+        self.assertTrue(sampler.filter(_record(name='app.utils.web_search', module='web_search')))
+
+class JsonFormatterTest(unittest.TestCase):
+    def test_record_is_one_json_object_with_extra_fields(self):
+        record = _record(level=logging.INFO)
+        record.request_id = 'abc'
+        payload = json.loads(JsonFormatter().format(record))
+        self.assertEqual(payload['message'], 'Processing x')
+        self.assertEqual((payload['level'], payload['logger'], payload['line']), ('INFO', 'app', 10))
+        self.assertEqual(payload['request_id'], 'abc')
+
+if __name__ == '__main__':
+    unittest.main()
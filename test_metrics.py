@@ -0,0 +1,113 @@
+import unittest
+from unittest.mock import patch
+from flask import Flask
+from flask_login import LoginManager, login_user
+from app.utils import metrics
+from app.utils.metrics import MetricsRegistry, init_metrics, server_timing, stage
+
+class MetricsRegistryTest(unittest.TestCase):
+    def test_counters_and_histograms_render_in_prometheus_format(self):
+        registry = MetricsRegistry(buckets=(0.01, 0.1))
+        registry.inc('requests_total', endpoint='api.chat_handler', status='200')
+        registry.inc('requests_total', endpoint='api.chat_handler', status='200')
+        registry.observe('stage_duration_seconds', 0.005, stage='ocr')
+        registry.observe('stage_duration_seconds', 0.05, stage='ocr')
+        registry.observe('stage_duration_seconds', 3.0, stage='ocr')
+        text = registry.render()
+        self.assertIn('# TYPE chatbot_requests_total counter', text)
+        self.assertIn('chatbot_requests_total{endpoint="api.chat_handler",status="200"} 2', text)
+        self.assertIn('chatbot_stage_duration_seconds_bucket{stage="ocr",le="0.01"} 1', text)
+        self.assertIn('chatbot_stage_duration_seconds_bucket{stage="ocr",le="0.1"} 2', text)
+        self.assertIn('chatbot_stage_duration_seconds_bucket{stage="ocr",le="+Inf"} 3', text)
+        self.assertIn('chatbot_stage_duration_seconds_count{stage="ocr"} 3', text)
+        self.assertEqual(registry.get('stage_duration_seconds', stage='ocr')[1], 3)
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.inc('fallbacks_total', kind='a"b\\c')
+        self.assertIn('kind="a\\"b\\\\c"', registry.render())
+
+    def test_server_timing_header(self):
+        self.assertEqual(server_timing({'langdetect': 0.0012, 'retrieval': 0.003}, total=0.01),
+                         'langdetect;dur=1.20, retrieval;dur=3.00, total;dur=10.00')
+
+class ServerTimingTest(unittest.TestCase):
+    def test_request_stages_are_summed_in_header(self):
+        app = Flask(__name__)
+        init_metrics(app)
+
+        @app.route('/work')
+        def work():
+            with stage('preprocess'):
+                pass
+            with stage('preprocess'):
+                pass
+            with stage('retrieval'):
+                pass
+            return 'ok'
+
+        header = app.test_client().get('/work').headers['Server-Timing']
+        names = [entry.split(';')[0] for entry in header.split(', ')]
+        self.assertEqual(names, ['preprocess', 'retrieval', 'total'])
+        self.assertGreaterEqual(metrics.get_metrics().get('requests_total', endpoint='work', method='GET', status='200'), 1)
+
+    def test_stage_outside_request_only_feeds_histogram(self):
+        before = metrics.get_metrics().get('stage_duration_seconds', stage='standalone')[1]
+        with stage('standalone'):
+            pass
+        self.assertEqual(metrics.get_metrics().get('stage_duration_seconds', stage='standalone')[1], before + 1)
+
+class MetricsAccessTest(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.add_url_rule('/metrics', 'metrics', lambda: ('ok', 200) if metrics.metrics_access_allowed() else ('forbidden', 403))
+        self.client = self.app.test_client()
+
+    def get(self, addr, **headers):
+        return self.client.get('/metrics', headers=headers, environ_base={'REMOTE_ADDR': addr}).status_code
+
+    def test_allowlisted_addresses_only_without_token(self):
+        with patch.object(metrics, 'METRICS_TOKEN', ''):
+            self.assertEqual(self.get('127.0.0.1'), 200)
+            self.assertEqual(self.get('203.0.113.7'), 403)
+            self.assertEqual(self.get('203.0.113.7', Authorization='Bearer '), 403)
+
+    def test_bearer_token_grants_access_from_anywhere(self):
+        with patch.object(metrics, 'METRICS_TOKEN', 's3cret'), patch.object(metrics, 'METRICS_ALLOWED_IPS', set()):
+            self.assertEqual(self.get('203.0.113.7', Authorization='Bearer s3cret'), 200)
+            self.assertEqual(self.get('203.0.113.7', Authorization='Bearer wrong'), 403)
+            self.assertEqual(self.get('127.0.0.1'), 403)
+
+class StatsAccessTest(unittest.TestCase):
+    """Les routes /.../stats de l'API sont réservées aux administrateurs."""
+    STATS_VIEWS = ['extraction_cache_stats', 'ocr_stats', 'web_search_stats', 'audio_store_stats',
+                   'user_db_stats', 'session_index_stats']
+
+    def setUp(self):
+        from app.routes import api
+        from app.models import user
+        self.app = Flask(__name__)
+        self.app.config['SECRET_KEY'] = 'test'
+        login_manager = LoginManager(self.app)
+        users = {str(i): user.User(i, name, f"{name}@iset.tn", '') for i, name in enumerate(['admin', 'etudiant'])}
+        login_manager.user_loader(users.get)
+        self.app.add_url_rule('/login/<user_id>', 'login', lambda user_id: ('ok', 200) if login_user(users[user_id]) else ('', 500))
+        for name in self.STATS_VIEWS:
+            self.app.add_url_rule(f'/{name}', name, getattr(api, name))
+        patcher = patch.object(user, 'ADMIN_USERS', frozenset(['admin']))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = self.app.test_client()
+
+    def statuses(self):
+        return {self.client.get(f'/{name}').status_code for name in self.STATS_VIEWS}
+
+    def test_stats_require_an_admin(self):
+        self.assertEqual(self.statuses(), {401})
+        self.client.get('/login/1')
+        self.assertEqual(self.statuses(), {403})
+        self.client.get('/login/0')
+        self.assertEqual(self.statuses(), {200})
+
+if __name__ == '__main__':
+    unittest.main()
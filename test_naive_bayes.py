@@ -0,0 +1,60 @@
+import unittest
+import numpy as np
+import pandas as pd
+from app.utils.models.naive_bayes import NaiveBayesModel
+from app.utils.preprocess import initialize_vectorizer, preprocess_text
+
+HOURS = "La bibliothèque est ouverte de 8h à 18h."
+ROWS = [
+    ("Quels sont les horaires de la bibliothèque ?", HOURS, 'Horaires', 0),
+    ("À quelle heure ouvre la bibliothèque ?", HOURS, 'Horaires', 2),  # Paraphrase, mieux notée
+    ("Quand ont lieu les examens ?", "Les examens ont lieu en janvier.", 'Examens', 0),
+    ("Comment s'inscrire au stage ?", "L'inscription au stage se fait en ligne.", 'Stages', 0),
+    ("Où se trouve le restaurant universitaire ?", "Le restaurant est à côté du bloc B.", 'Vie étudiante', 0),
+]
+
+def dataset(rows=ROWS):
+    return pd.DataFrame([{'Question': q, 'Réponse': a, 'Lien': '', 'Catégorie': c, 'Rating': r} for q, a, c, r in rows])
+
+class NaiveBayesModelTest(unittest.TestCase):
+    def setUp(self):
+        self.df = dataset()
+        self.vectorizer, self.X = initialize_vectorizer(self.df, 'fr')
+        self.model = NaiveBayesModel(self.df, self.vectorizer, self.X, lang='fr')
+
+    def query(self, text):
+        return self.vectorizer.transform([preprocess_text(text, 'fr')])
+
+    def test_paraphrases_share_one_class(self):
+        self.assertEqual(len(self.model.model.classes_), 4)
+        self.assertEqual(self.model.row_classes[0], self.model.row_classes[1])
+        # La réponse est représentée par sa ligne la mieux notée
+        self.assertEqual(self.model.class_rows[self.model.row_classes[0]], 1)
+        rows, _ = self.model.predict_batch(self.query("horaires bibliothèque"))
+        self.assertEqual(rows[0], 1)
+
+    def test_probabilities_are_normalized(self):
+        queries = self.vectorizer.transform([preprocess_text(q, 'fr') for q in ["horaires bibliothèque", "examens janvier", "mot inconnu"]])
+        probabilities = self.model.model.predict_proba(queries)
+        np.testing.assert_allclose(probabilities.sum(axis=1), 1.0)
+        rows, confidences = self.model.predict(queries, k=4)
+        self.assertEqual(confidences.shape, (3, 4))
+        np.testing.assert_allclose(confidences.sum(axis=1), 1.0)  # Chaque réponse une fois
+        self.assertTrue(((confidences >= 0) & (confidences <= 1)).all())
+        self.assertEqual([len(set(r)) for r in rows], [4, 4, 4])
+
+    def test_uniform_prior(self):
+        # Une réponse partagée par plusieurs questions n'a pas d'a priori plus élevé
+        np.testing.assert_allclose(np.exp(self.model.model.class_log_prior_), 0.25)
+        rows, confidences = self.model.predict_batch(self.query("mot inconnu"))
+        self.assertAlmostEqual(confidences[0], 0.25, places=6)
+
+    def test_get_response(self):
+        response = self.model.get_response("Quand ont lieu les examens ?")
+        self.assertEqual(response['answer'], "Les examens ont lieu en janvier.")
+        self.assertEqual(response['category'], 'Examens')
+        self.assertTrue(0 < response['confidence'] <= 1)
+        self.assertTrue(self.model.get_response("")['ask_for_response'])
+
+if __name__ == '__main__':
+    unittest.main()
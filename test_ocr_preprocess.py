@@ -0,0 +1,47 @@
+import unittest
+from PIL import Image, ImageDraw
+from app.utils.ocr_preprocess import _otsu_threshold, estimate_skew, estimate_text_height, preprocess_for_ocr
+
+def text_lines_image(size=(800, 400), line_height=10, spacing=30):
+    """Page synthétique : lignes de blocs noirs (mots) séparés par des espaces."""
+    image = Image.new('L', size, 255)
+    draw = ImageDraw.Draw(image)
+    word = max(20, size[0] // 20)
+    for y in range(40, size[1] - 40, spacing):
+        for x in range(50, size[0] - 50 - word, word + word // 2):
+            draw.rectangle([x, y, x + word - 1, y + line_height - 1], fill=0)
+    return image
+
+class OCRPreprocessTest(unittest.TestCase):
+    def test_otsu_threshold_separates_ink(self):
+        image = text_lines_image()
+        threshold = _otsu_threshold(image.histogram())
+        self.assertTrue(0 < threshold <= 255)
+
+    def test_text_height(self):
+        self.assertAlmostEqual(estimate_text_height(text_lines_image(line_height=12)), 12, delta=1)
+
+    def test_skew_is_estimated(self):
+        image = text_lines_image()
+        for angle in (3, -2, 1.5):
+            self.assertAlmostEqual(estimate_skew(image.rotate(angle, expand=True, fillcolor=255)), -angle, delta=0.5)
+
+    def test_straight_image_is_not_rotated(self):
+        # Image droite : ni rotation ni agrandissement du canevas (régression 300x100 -> 302x106)
+        image = Image.open('test_ocr.png')
+        processed, report = preprocess_for_ocr(image, deskew=True, with_report=True)
+        self.assertEqual(processed.size, image.size)
+        self.assertEqual(report[-1]['stage'], 'deskew')
+        self.assertEqual(report[-1]['angle'], 0.0)
+        self.assertEqual(preprocess_for_ocr(text_lines_image(), deskew=True).size, (800, 400))
+
+    def test_large_text_is_downscaled_in_uint8(self):
+        image = text_lines_image(size=(2000, 1600), line_height=80, spacing=200).convert('RGB')
+        processed, report = preprocess_for_ocr(image, binarize=True, with_report=True)
+        self.assertEqual(processed.mode, 'L')
+        self.assertLess(processed.width, 2000)
+        self.assertEqual([s['stage'] for s in report], ['grayscale', 'downscale', 'contrast', 'binarize'])
+        self.assertLessEqual({level for _, level in processed.getcolors()}, {0, 255})
+
+if __name__ == '__main__':
+    unittest.main()
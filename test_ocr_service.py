@@ -0,0 +1,72 @@
+import os
+import subprocess
+import types
+import unittest
+from unittest import mock
+from PIL import Image
+from app.utils import ocr_service
+from app.utils.ocr_service import OCRService
+
+class FakeTessBaseAPI:
+    """API tesserocr simulée : compte les instances créées (chargements de modèles)."""
+    instances = []
+
+    def __init__(self, lang, psm):
+        self.lang, self.psm = lang, psm
+        self.images = 0
+        FakeTessBaseAPI.instances.append(self)
+
+    def SetImage(self, image):
+        self.images += 1
+
+    def GetUTF8Text(self):
+        return f" texte {self.lang} \n"
+
+class OCRServiceEngineTest(unittest.TestCase):
+    def setUp(self):
+        FakeTessBaseAPI.instances = []
+        self.image = Image.new('L', (40, 20), 255)
+
+    def test_tesserocr_workers_reuse_loaded_models(self):
+        fake = types.SimpleNamespace(PyTessBaseAPI=FakeTessBaseAPI)
+        with mock.patch.object(ocr_service, 'tesserocr', fake), \
+                mock.patch.object(ocr_service.subprocess, 'run') as subprocess_ocr:
+            service = OCRService(lang='fra+eng', workers=1)
+            texts = service.ocr_batch([self.image] * 3, psm=3)
+            texts.append(service.ocr_image(self.image, lang='ara', psm=3))
+        self.assertEqual(texts, ["texte fra+eng"] * 3 + ["texte ara"])
+        subprocess_ocr.assert_not_called()
+        # Un chargement par combinaison (langues, psm) et par worker, préchargement compris
+        self.assertEqual([(api.lang, api.images) for api in FakeTessBaseAPI.instances], [('fra+eng', 3), ('ara', 1)])
+        stats = service.stats()
+        self.assertEqual((stats['engine'], stats['persistent_engine'], stats['processed']), ('tesserocr', True, 4))
+
+    def test_cli_fallback_is_reported(self):
+        environ = dict(os.environ)
+        done = subprocess.CompletedProcess([], 0, stdout=" Bonjour \n".encode(), stderr=b'')
+        with mock.patch.object(ocr_service, 'tesserocr', None), \
+                mock.patch.object(ocr_service.subprocess, 'run', return_value=done) as subprocess_ocr:
+            service = OCRService(lang='fra', workers=2)
+            self.assertEqual(service.ocr_batch([self.image] * 2, psm=6), ["Bonjour", "Bonjour"])
+        self.assertEqual(subprocess_ocr.call_count, 2)
+        command, kwargs = subprocess_ocr.call_args.args[0], subprocess_ocr.call_args.kwargs
+        self.assertEqual(command[1:], ['stdin', 'stdout', '-l', 'fra', '--psm', '6'])
+        self.assertTrue(kwargs['input'].startswith(b'\x89PNG'))
+        # La limite OpenMP n'est transmise qu'au processus tesseract
+        self.assertEqual(kwargs['env']['OMP_THREAD_LIMIT'], str(ocr_service.OMP_THREAD_LIMIT))
+        self.assertEqual(dict(os.environ), environ)
+        stats = service.stats()
+        self.assertEqual((stats['engine'], stats['persistent_engine']), ('tesseract-cli', False))
+        self.assertEqual(FakeTessBaseAPI.instances, [])
+
+    def test_errors_are_returned_through_the_future(self):
+        failed = subprocess.CompletedProcess([], 1, stdout=b'', stderr=b"Failed loading language 'fra'")
+        with mock.patch.object(ocr_service, 'tesserocr', None), \
+                mock.patch.object(ocr_service.subprocess, 'run', return_value=failed):
+            service = OCRService(lang='fra', workers=1)
+            with self.assertRaises(ocr_service.pytesseract.TesseractError):
+                service.ocr_image(self.image)
+        self.assertEqual(service.stats()['errors'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from unittest import mock
+from app.utils import data_manager
+from app.utils.passages import PASSAGE_MAX_CHARS, detect_questions, split_document, split_passages
+
+QUESTIONS = ["Quand commence le semestre ?", "Qui enseigne le cours de Python ?", "Où se trouve la bibliothèque ?"]
+
+class PassagesTest(unittest.TestCase):
+    def test_questions_are_detected_once(self):
+        text = "Bienvenue à l'ISET. Quand commence le semestre ? Merci. quand commence le semestre ? Ok ?"
+        self.assertEqual(detect_questions(text), ["Quand commence le semestre ?"])
+        self.assertEqual(split_document(text), (["Quand commence le semestre ?"], 'questions'))
+
+    def test_passages_respect_max_chars(self):
+        text = ' '.join(f"Phrase numéro {i} du règlement intérieur." for i in range(40))
+        passages = split_passages(text)
+        self.assertGreater(len(passages), 1)
+        self.assertTrue(all(len(p) <= PASSAGE_MAX_CHARS for p in passages))
+        self.assertEqual(' '.join(passages), text)
+        self.assertEqual(split_document(text)[1], 'passages')
+
+    def test_unpunctuated_text_is_cut_on_spaces(self):
+        passages = split_passages("mot " * 300)
+        self.assertTrue(all(len(p) <= PASSAGE_MAX_CHARS for p in passages))
+        self.assertEqual(sum(p.count('mot') for p in passages), 300)
+
+class BatchedRetrievalTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        data_manager.initialize_data()
+
+    def test_batch_matches_single_questions(self):
+        for method in ('knn', 'cosine'):
+            responses = data_manager.get_best_responses(QUESTIONS, method=method)
+            self.assertEqual(sorted(r['passage'] for r in responses), sorted(QUESTIONS))
+            confidences = [r['confidence'] for r in responses]
+            self.assertEqual(confidences, sorted(confidences, reverse=True))
+            for response in responses:
+                single = data_manager.get_best_response(response['passage'], method=method)
+                self.assertEqual(response['answer'], single['answer'])
+
+    def test_empty_and_invalid_input(self):
+        self.assertEqual(data_manager.get_best_responses(['', '  ', None]), [])
+        with self.assertRaises(ValueError):
+            data_manager.get_best_responses(QUESTIONS, method='inconnue')
+
+    def test_unknown_method_is_rejected_before_any_work(self):
+        with mock.patch.object(data_manager, '_detect_language') as detect:
+            with self.assertRaises(ValueError):
+                data_manager.get_best_response(QUESTIONS[0], method='inconnue')
+            with self.assertRaises(ValueError):
+                data_manager.get_best_responses(QUESTIONS, method='inconnue')
+        detect.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import io
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import Future
+from unittest import mock
+import fitz
+from PIL import Image, ImageDraw
+from app.utils import pdf_processing
+from app.utils.extraction_cache import ExtractionCache
+
+PARAGRAPH = ("Les cours du semestre d'automne commencent le lundi 15 septembre. Les emplois du temps "
+             "sont affichés dans le hall du bloc A et publiés sur l'espace numérique de l'institut.")
+SCANNED_TEXT = "Horaires de la bibliothèque : de 8h à 18h du lundi au vendredi."
+
+class FakeOCRService:
+    """Service OCR simulé : retourne un texte fixe et garde les images reçues."""
+
+    def __init__(self):
+        self.images = []
+
+    def submit(self, image, lang=None, psm=3):
+        self.images.append((image, lang, psm))
+        future = Future()
+        future.set_result({'text': SCANNED_TEXT, 'lang': 'fra', 'script': 'Latin', 'queue_ms': 1.0, 'ocr_ms': 12.5})
+        return future
+
+def _scanned_image():
+    """Image d'une page numérisée (aucune couche texte une fois insérée dans le PDF)."""
+    image = Image.new('L', (600, 200), 255)
+    ImageDraw.Draw(image).text((20, 90), SCANNED_TEXT, fill=0)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+COLUMNS = [
+    ("Inscriptions : les dossiers sont déposés au service de scolarité avant la fin du mois.",
+     "Stages : la convention est signée par l'entreprise et le directeur des études."),
+    ("Examens : le calendrier des épreuves est publié deux semaines à l'avance.",
+     "Bourses : les demandes sont instruites par l'office des œuvres universitaires.")
+]
+
+def build_pdf():
+    """PDF de trois pages : texte simple, texte sur deux colonnes, page numérisée."""
+    doc = fitz.open()
+    doc.new_page().insert_textbox(fitz.Rect(72, 72, 520, 300), PARAGRAPH, fontsize=11)
+    columns = doc.new_page()
+    for row, (left, right) in enumerate(COLUMNS):
+        top = 72 + row * 150
+        columns.insert_textbox(fitz.Rect(72, top, 280, top + 100), left, fontsize=11)
+        columns.insert_textbox(fitz.Rect(320, top, 528, top + 100), right, fontsize=11)
+    doc.new_page().insert_image(fitz.Rect(72, 72, 520, 220), stream=_scanned_image())
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+class ExtractPdfPagesTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.data = build_pdf()
+
+    def setUp(self):
+        self.ocr = FakeOCRService()
+        patcher = mock.patch.object(pdf_processing, 'get_ocr_service', return_value=self.ocr)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_each_page_uses_the_cheapest_method(self):
+        pages = pdf_processing.extract_pdf_pages(self.data)
+        self.assertEqual([page['method'] for page in pages], ['pymupdf', 'pdfplumber', 'ocr'])
+        self.assertIn("semestre d'automne", pages[0]['text'])
+        self.assertIn("Inscriptions", pages[1]['text'])
+        self.assertIn("Bourses", pages[1]['text'])
+        # Seule la page numérisée est envoyée à l'OCR, rendue à OCR_DPI
+        self.assertEqual(len(self.ocr.images), 1)
+        image, lang, _ = self.ocr.images[0]
+        self.assertEqual(lang, pdf_processing.OCR_LANG)
+        self.assertAlmostEqual(image.width, 595 * pdf_processing.OCR_DPI / 72, delta=1)  # Page A4, 595 pt
+
+    def test_image_only_page_text_is_kept(self):
+        pages = pdf_processing.extract_pdf_pages(self.data)
+        self.assertEqual(pages[2]['text'], SCANNED_TEXT)
+        full_text, _ = pdf_processing._join_pages(pages)
+        self.assertIn(PARAGRAPH.split('.')[0], full_text)
+        self.assertTrue(full_text.endswith(SCANNED_TEXT))
+
+    def test_report_fields(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, True)
+        with mock.patch.object(pdf_processing, 'get_extraction_cache', return_value=ExtractionCache(cache_dir=cache_dir)):
+            text, _, report = pdf_processing.process_pdf(self.data, with_report=True, filename='horaires.pdf')
+        self.assertIn(SCANNED_TEXT, text)
+        self.assertEqual([page['page'] for page in report], [1, 2, 3])
+        for page in report:
+            self.assertNotIn('text', page)
+            self.assertGreater(page['chars'], 0)
+            self.assertGreaterEqual(page['time_ms'], 0)
+        # La durée d'une page OCR inclut la reconnaissance ; sa langue et son attente sont rapportées
+        self.assertEqual(report[2]['chars'], len(SCANNED_TEXT))
+        self.assertGreaterEqual(report[2]['time_ms'], 12.5)
+        self.assertEqual((report[2]['lang'], report[2]['queue_ms']), ('fra', 1.0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from app.utils.profiling import ProfileStore, StackSampler, summarize_stacks
+
+def _write(content):
+    def write(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+    return write
+
+class ProfileStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+    def test_oldest_profiles_are_evicted(self):
+        store = ProfileStore(self.profile_dir, max_entries=2)
+        ids = [store.save({'created': f'2024-01-01T00:00:0{i}', 'kind': 'sampling'}, _write(f'a;b {i}\n')) for i in range(3)]
+        self.assertEqual([meta['id'] for meta in store.list()], [ids[2], ids[1]])
+        self.assertIsNone(store.data_path(ids[0]))
+        self.assertEqual(len(os.listdir(self.profile_dir)), 4)
+        # The ring is rebuilt from disk after a restart
+        self.assertEqual([meta['id'] for meta in ProfileStore(self.profile_dir, max_entries=2).list()], [ids[2], ids[1]])
+
+class StackSamplerTest(unittest.TestCase):
+    def test_samples_registered_thread(self):
+        sampler = StackSampler(interval=0.001)
+        result = {}
+
+        def busy_wait():
+            deadline = time.perf_counter() + 0.1
+            while time.perf_counter() < deadline:
+                pass
+
+        def work():
+            sampler.start(threading.get_ident())
+            busy_wait()
+            result['stacks'] = sampler.stop(threading.get_ident())
+
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+        self.assertGreater(sum(result['stacks'].values()), 5)
+        top = [entry['function'] for entry in summarize_stacks(result['stacks'])]
+        self.assertIn('test_profiling.py:busy_wait', top)
+
+if __name__ == '__main__':
+    unittest.main()
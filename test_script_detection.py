@@ -0,0 +1,46 @@
+import unittest
+from unittest import mock
+from PIL import Image
+from app.utils import script_detection
+from app.utils.script_detection import detect_script, select_languages
+
+OSD_ARABIC = {'script': 'Arabic', 'script_conf': 12.0, 'rotate': 0}
+
+class ScriptDetectionTest(unittest.TestCase):
+    def setUp(self):
+        self.image = Image.open('test_ocr.png')
+        patcher = mock.patch.object(script_detection.pytesseract, 'image_to_osd', return_value=OSD_ARABIC)
+        self.osd = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_latin_page_skips_osd(self):
+        image, lang, detection = select_languages(self.image)
+        self.assertEqual((detection['script'], detection['method'], lang), ('Latin', 'baseline', 'fra+eng'))
+        self.assertEqual(image.size, self.image.size)
+        self.osd.assert_not_called()
+
+    def test_ambiguous_page_falls_back_to_osd(self):
+        with mock.patch.object(script_detection, '_detect_with_baseline', return_value=None):
+            detection = detect_script(self.image)
+        self.assertEqual((detection['script'], detection['method']), ('Arabic', 'osd'))
+        self.osd.assert_called_once()
+
+    def test_osd_always_runs_first(self):
+        with mock.patch.object(script_detection, 'SCRIPT_OSD', 'always'):
+            self.assertEqual(detect_script(self.image)['method'], 'osd')
+        self.osd.assert_called_once()
+
+    def test_osd_never(self):
+        with mock.patch.object(script_detection, 'SCRIPT_OSD', 'never'), \
+                mock.patch.object(script_detection, '_detect_with_baseline', return_value=None):
+            image, lang, detection = select_languages(self.image)
+        self.assertEqual((detection['method'], lang), ('none', script_detection.FALLBACK_LANGS))
+        self.osd.assert_not_called()
+
+    def test_osd_failure_keeps_full_language_set(self):
+        self.osd.side_effect = RuntimeError("osd.traineddata absent")
+        with mock.patch.object(script_detection, '_detect_with_baseline', return_value=None):
+            self.assertEqual(select_languages(self.image)[1], script_detection.FALLBACK_LANGS)
+
+if __name__ == '__main__':
+    unittest.main()
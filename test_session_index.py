@@ -0,0 +1,131 @@
+import io
+import types
+import unittest
+from unittest import mock
+from flask import Flask
+from app.utils import session_index
+from app.utils.session_index import SessionDocumentIndex
+
+TOPICS = ["La bibliothèque ouvre de 8h à 18h du lundi au vendredi.",
+          "Les examens du semestre ont lieu en janvier dans l'amphithéâtre A.",
+          "Le stage de fin d'études dure quatre mois et commence en février."]
+# Chaque sujet remplit un passage (PASSAGE_MAX_CHARS)
+DOCUMENT = ' '.join(' '.join([topic] * 5) for topic in TOPICS)
+
+class Clock:
+    """Horloge manuelle remplaçant time.monotonic."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class SessionDocumentIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(session_index.time, 'monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_search_returns_best_passage(self):
+        index = SessionDocumentIndex()
+        self.assertEqual(index.add('s1', DOCUMENT, 'fr', filename='guide.pdf'), len(TOPICS))
+        result = index.search('s1', "Quand ont lieu les examens ?")
+        self.assertIn("examens", result['passage'])
+        self.assertEqual(result['filename'], 'guide.pdf')
+        self.assertGreater(result['score'], 0)
+        self.assertIsNone(index.search('autre', "examens"))
+
+    def test_entries_expire_after_ttl_without_access(self):
+        index = SessionDocumentIndex(ttl=60)
+        index.add('s1', DOCUMENT, 'fr')
+        self.clock.now += 50
+        self.assertIsNotNone(index.search('s1', "bibliothèque"))  # Refreshes last_access
+        self.clock.now += 50
+        self.assertIsNotNone(index.search('s1', "bibliothèque"))
+        self.clock.now += 61
+        self.assertIsNone(index.search('s1', "bibliothèque"))
+        stats = index.stats()
+        self.assertEqual((stats['sessions'], stats['bytes'], stats['expired']), (0, 0, 1))
+
+    def test_expired_entries_are_purged_on_add(self):
+        index = SessionDocumentIndex(ttl=60)
+        index.add('s1', DOCUMENT, 'fr')
+        self.clock.now += 61
+        index.add('s2', DOCUMENT, 'fr')
+        self.assertEqual(index.stats()['sessions'], 1)
+
+    def test_byte_cap_evicts_least_recently_used(self):
+        index = SessionDocumentIndex()
+        index.add('s1', DOCUMENT, 'fr')
+        one_document = index.stats()['bytes']
+        index.max_bytes = int(one_document * 2.5)
+        index.add('s2', DOCUMENT, 'fr')
+        self.clock.now += 1
+        index.search('s1', "stage")  # s2 devient la moins récemment utilisée
+        index.add('s3', DOCUMENT, 'fr')
+        stats = index.stats()
+        self.assertEqual((stats['sessions'], stats['evicted']), (2, 1))
+        self.assertLessEqual(stats['bytes'], index.max_bytes)
+        self.assertIsNone(index.search('s2', "stage"))
+        self.assertIsNotNone(index.search('s1', "stage"))
+
+    def test_new_upload_replaces_previous_document(self):
+        index = SessionDocumentIndex()
+        index.add('s1', DOCUMENT, 'fr')
+        index.add('s1', "Le restaurant universitaire est fermé le dimanche.", 'fr', filename='menu.png')
+        stats = index.stats()
+        self.assertEqual((stats['sessions'], stats['documents']), (1, 2))
+        self.assertEqual(index.search('s1', "examens")['filename'], 'menu.png')
+
+    def test_files_uploaded_together_are_both_indexed(self):
+        index = SessionDocumentIndex()
+        count = index.add_documents('s1', [('guide.pdf', DOCUMENT),
+                                           ('menu.png', "Le restaurant universitaire est fermé le dimanche.")], 'fr')
+        self.assertEqual(count, len(TOPICS) + 1)
+        self.assertEqual(index.search('s1', "examens amphithéâtre")['filename'], 'guide.pdf')
+        result = index.search('s1', "restaurant dimanche")
+        self.assertEqual(result['filename'], 'menu.png')
+        self.assertIn("restaurant", result['passage'])
+
+class ChatUploadIndexTest(unittest.TestCase):
+    """Route /chat de l'API avec un PDF et une image envoyés ensemble."""
+
+    def setUp(self):
+        from app.routes import api
+        self.index = SessionDocumentIndex()
+        answer = {'answer': "Réponse", 'confidence': 0.9, 'language': 'fr', 'response_id': 'r1', 'category': 'Général'}
+        patchers = [
+            mock.patch.object(api, 'process_pdf', return_value=(DOCUMENT, [], [])),
+            mock.patch.object(api, 'extract_text', return_value="Le restaurant universitaire est fermé le dimanche."),
+            mock.patch.object(api, 'get_best_responses', side_effect=lambda segments, method: [dict(answer, passage=p) for p in segments]),
+            mock.patch.object(api, 'save_conversation'),
+            mock.patch.object(api, 'current_user', types.SimpleNamespace(username='etudiant')),
+            mock.patch('app.utils.data_manager.get_session_index', return_value=self.index)
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.save_conversation = api.save_conversation
+        app = Flask(__name__)
+        app.config.update(LOGIN_DISABLED=True, SECRET_KEY='test', MAX_CONTENT_LENGTH=5 * 1024 * 1024)
+        app.add_url_rule('/chat', 'chat', api.chat_handler, methods=['POST'])
+        self.client = app.test_client()
+
+    def test_pdf_and_image_are_both_indexed(self):
+        r = self.client.post('/chat', content_type='multipart/form-data', data={
+            'pdf_file': (io.BytesIO(b'%PDF-1.4'), 'guide.pdf', 'application/pdf'),
+            'image_file': (io.BytesIO(b'png'), 'menu.png', 'image/png')
+        })
+        self.assertEqual(r.status_code, 200)
+        body = r.get_json()
+        self.assertIn("restaurant", body['extracted_text'])
+        self.assertIn("amphithéâtre", body['extracted_text'])
+        session_id = next(iter(self.index._entries))
+        self.assertEqual(self.index.search(session_id, "examens amphithéâtre")['filename'], 'guide.pdf')
+        self.assertEqual(self.index.search(session_id, "restaurant dimanche")['filename'], 'menu.png')
+        self.assertEqual(self.save_conversation.call_args.kwargs['question'], 'guide.pdf, menu.png')
+
+if __name__ == '__main__':
+    unittest.main()
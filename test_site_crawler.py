@@ -0,0 +1,135 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.utils.site_crawler import SiteIndex, crawl
+from app.utils.web_search import get_web_response
+
+# Site de test : chemin -> HTML
+FIXTURE_PAGES = {
+    '/': """<html><head><title>ISET - Accueil</title></head><body>
+        <nav><a href="/inscription">Inscription</a> <a href="/examens">Examens</a></nav>
+        <p>Bienvenue sur le site de l'Institut Supérieur des Études Technologiques.</p>
+        <a href="https://externe.example.com/page">Lien externe</a>
+        </body></html>""",
+    '/inscription': """<html><head><title>Inscription</title></head><body>
+        <script>var tracking = 1;</script>
+        <p>Les inscriptions universitaires se font en ligne du 1er au 15 septembre.</p>
+        <p>Les frais d'inscription sont payables à la scolarité.</p>
+        <a href="/examens#calendrier">Calendrier</a>
+        </body></html>""",
+    '/examens': """<html><head><title>Examens</title></head><body>
+        <p>La session principale des examens commence le 2 janvier.</p>
+        <p>Les résultats sont affichés sur le portail étudiant.</p>
+        </body></html>"""
+}
+
+class FixtureSiteHandler(BaseHTTPRequestHandler):
+    """Sert FIXTURE_PAGES avec ETag et réponses 304 aux requêtes conditionnelles."""
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get('If-None-Match')))
+        html = self.server.pages.get(self.path)
+        if html is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        etag = '"%s"' % hashlib.md5(html.encode('utf-8')).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        data = html.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+class SiteCrawlerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureSiteHandler)
+        cls.server.daemon_threads = True
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.pages = dict(FIXTURE_PAGES)
+        self.server.requests = []
+        self.index_dir = tempfile.mkdtemp()
+        self.index = SiteIndex(os.path.join(self.index_dir, 'site.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.index_dir, ignore_errors=True)
+
+    def crawl(self):
+        return crawl([f"{self.base_url}/"], index=self.index)
+
+    def test_initial_crawl_follows_internal_links_only(self):
+        summary = self.crawl()
+        self.assertEqual(summary['indexed'], 3)
+        self.assertEqual(summary['errors'], 0)
+        self.assertEqual(sorted(path for path, _ in self.server.requests), ['/', '/examens', '/inscription'])
+        self.assertEqual(self.index.stats()['pages'], 3)
+
+    def test_recrawl_uses_conditional_get(self):
+        self.crawl()
+        self.server.requests.clear()
+        summary = self.crawl()
+        self.assertEqual(summary['not_modified'], 3)
+        self.assertEqual(summary['indexed'], 0)
+        self.assertTrue(all(etag for _, etag in self.server.requests))
+
+    def test_changed_and_removed_pages_are_reindexed(self):
+        self.crawl()
+        self.server.pages['/examens'] = FIXTURE_PAGES['/examens'].replace('2 janvier', '9 janvier')
+        del self.server.pages['/inscription']
+        summary = self.crawl()
+        self.assertEqual(summary['indexed'], 1)
+        self.assertEqual(summary['removed'], 1)
+        self.assertIn('9 janvier', self.index.search("Quand commencent les examens ?")[0]['snippet'])
+        self.assertEqual(self.index.search("frais d'inscription"), [])
+
+    def test_search_returns_clean_passages(self):
+        self.crawl()
+        start = time.perf_counter()
+        results = self.index.search("Quand sont les inscriptions universitaires ?")
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.assertTrue(results)
+        self.assertEqual(results[0]['link'], f"{self.base_url}/inscription")
+        self.assertIn('1er au 15 septembre', results[0]['snippet'])
+        self.assertNotIn('tracking', results[0]['snippet'])
+        self.assertLess(elapsed_ms, 50)
+
+    def test_unrelated_question_finds_nothing(self):
+        self.crawl()
+        self.assertEqual(self.index.search("météo de demain à Paris"), [])
+
+    def test_low_confidence_fallback_uses_local_index(self):
+        self.crawl()
+        self.server.requests.clear()
+        response = get_web_response("Quand commencent les examens ?", 0.1, providers=[], learn=False,
+                                    cache=False, site_index=self.index)
+        self.assertIsNotNone(response)
+        self.assertEqual(response['source'], 'Site ISET')
+        self.assertIn('2 janvier', response['answer'])
+        self.assertEqual(self.server.requests, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import io
+import tempfile
+import unittest
+from werkzeug.datastructures import FileStorage
+from app.utils.pdf_processing import process_pdf
+from app.utils.uploads import open_upload
+
+def spooled_upload(content, max_size):
+    """FileStorage comme Werkzeug le construit : en mémoire jusqu'à max_size, puis sur disque."""
+    stream = tempfile.SpooledTemporaryFile(max_size=max_size)
+    stream.write(content)
+    stream.seek(0)
+    return FileStorage(stream=stream, filename='document.pdf', content_type='application/pdf')
+
+class OpenUploadTest(unittest.TestCase):
+    def test_in_memory_upload_is_a_view(self):
+        # Werkzeug garde les petits envois dans un BytesIO
+        upload = FileStorage(stream=io.BytesIO(b'%PDF-1.4 petit'), filename='document.pdf')
+        with open_upload(upload) as data:
+            self.assertIsInstance(data, memoryview)
+            self.assertEqual(bytes(data), b'%PDF-1.4 petit')
+        # La vue est libérée : le tampon peut de nouveau être redimensionné
+        upload.stream.seek(0, io.SEEK_END)
+        upload.stream.write(b'!')
+        upload.stream.close()
+
+    def test_file_upload_is_read_once(self):
+        content = b'%PDF-1.4 ' + b'x' * 4096
+        for upload in (spooled_upload(content, max_size=1024), spooled_upload(content, max_size=1024 * 1024)):
+            upload.stream.read(10)  # La position courante n'a pas d'importance
+            with open_upload(upload) as data:
+                self.assertIsInstance(data, bytes)
+                self.assertEqual(data, content)
+            upload.stream.close()
+
+    def test_pdf_is_extracted_from_memory(self):
+        with open('What are the office hours of professors.pdf', 'rb') as f:
+            upload = spooled_upload(f.read(), max_size=10 * 1024 * 1024)
+        with open_upload(upload) as data:
+            text, questions = process_pdf(data, filename='document.pdf')
+        self.assertFalse(text.startswith("Erreur"))
+        with open_upload(spooled_upload(b'pas un PDF', max_size=1024)) as data:
+            self.assertEqual(process_pdf(data)[0], "Erreur : type de fichier non supporté.")
+
+if __name__ == '__main__':
+    unittest.main()
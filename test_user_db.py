@@ -0,0 +1,89 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import json
+import unittest
+from app.utils.db import UserDB
+from app.utils.json_db import append_user_json, export_users_json
+
+class UserDBTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db = UserDB(os.path.join(self.tmp, 'users.db'), cache_ttl=60)
+        with self.db.connect() as conn:
+            conn.execute('CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL UNIQUE, '
+                         'email TEXT NOT NULL UNIQUE, password TEXT NOT NULL)')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_users_are_cached_by_id(self):
+        user_id = self.db.create_user('alice', 'alice@iset.tn', 'hash')
+        first = self.db.get_user(str(user_id))
+        self.assertIs(self.db.get_user(user_id), first)
+        stats = self.db.stats()
+        self.assertEqual((stats['cache_hits'], stats['cache_misses'], stats['connections']), (1, 1, 1))
+        self.assertIsNone(self.db.get_user('not-an-id'))
+
+    def test_invalidate_reloads_user(self):
+        user_id = self.db.create_user('alice', 'alice@iset.tn', 'hash')
+        self.db.get_user(user_id)
+        with self.db.connect() as conn:
+            conn.execute('UPDATE users SET email = ? WHERE id = ?', ('new@iset.tn', user_id))
+        self.assertEqual(self.db.get_user(user_id).email, 'alice@iset.tn')
+        self.db.invalidate(user_id)
+        self.assertEqual(self.db.get_user(user_id).email, 'new@iset.tn')
+
+    def test_duplicates_raise_and_connections_are_per_thread(self):
+        self.db.create_user('alice', 'alice@iset.tn', 'hash')
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.db.create_user('alice', 'other@iset.tn', 'hash')
+        self.assertEqual(self.db.connect().execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        found = {}
+        thread = threading.Thread(target=lambda: found.update(user=self.db.find_by_username('alice')))
+        thread.start()
+        thread.join()
+        self.assertEqual(found['user'].email, 'alice@iset.tn')
+        self.assertEqual(self.db.stats()['connections'], 2)
+
+    def test_list_users_pages_searches_and_sorts(self):
+        for name in ['carol', 'alice', 'bob', 'Alfred', 'al_x']:
+            self.db.create_user(name, f'{name.lower()}@iset.tn', 'hash')
+        users, total = self.db.list_users(per_page=2)
+        self.assertEqual(([u['username'] for u in users], total), (['al_x', 'Alfred'], 5))
+        users, _ = self.db.list_users(page=3, per_page=2)
+        self.assertEqual([u['username'] for u in users], ['carol'])
+        users, total = self.db.list_users(search='AL', sort='id', descending=True)
+        self.assertEqual(([u['username'] for u in users], total), (['al_x', 'Alfred', 'alice'], 3))
+        # LIKE wildcards in the search are literal
+        self.assertEqual(self.db.list_users(search='al_')[1], 1)
+        self.assertNotIn('password', users[0])
+
+class UsersJsonTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'users.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_append_keeps_a_valid_indented_array(self):
+        users = [{'id': i, 'username': f'user{i}', 'email': f'user{i}@iset.tn', 'password': 'hash'} for i in range(1, 4)]
+        with open(self.path, 'w') as f:
+            json.dump([], f)
+        append_user_json(self.path, users[0])
+        append_user_json(self.path, users[1])
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), users[:2])
+        export_users_json(self.path, users)
+        with open(self.path) as f:
+            exported = f.read()
+        self.assertEqual(exported, json.dumps(users, indent=2))
+        append_user_json(self.path, {'id': 4, 'username': 'dan', 'email': 'dan@iset.tn', 'password': 'hash'})
+        with open(self.path) as f:
+            self.assertEqual([u['id'] for u in json.load(f)], [1, 2, 3, 4])
+
+if __name__ == '__main__':
+    unittest.main()
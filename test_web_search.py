@@ -0,0 +1,284 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from app.utils import web_search
+from app.utils.web_search import SearchProvider, get_web_response as _get_web_response
+from app.utils.web_cache import WebResultCache, normalize_query
+
+RESULT_PAGE = """<html><body>
+<div class="g"><a href="{link}"><h3>{title}</h3></a><div class="VwiC3b">{snippet}</div></div>
+</body></html>"""
+
+class StubSearchHandler(BaseHTTPRequestHandler):
+    """
+    Moteur de recherche local. Le chemin choisit le comportement :
+    /fast (réponse immédiate), /slow (2 s), /error (500), /empty (aucun résultat).
+    """
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query).get('q', [''])[0]
+        self.server.requests.append((url.path, self.client_address[1]))
+        if url.path == '/error':
+            return self._reply(500, "erreur")
+        if url.path == '/slow':
+            time.sleep(2)
+        if url.path == '/empty':
+            return self._reply(200, "<html><body></body></html>")
+        self._reply(200, RESULT_PAGE.format(
+            link=f"http://iset.rnu.tn{url.path}", title="Résultat", snippet=f"Réponse {url.path[1:]} pour {query}"))
+
+    def _reply(self, status, body):
+        data = body.encode('utf-8')
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client parti après son délai (/slow)
+
+    def log_message(self, *args):
+        pass
+
+class WebSearchTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubSearchHandler)
+        cls.server.daemon_threads = True
+        cls.server.requests = []
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests.clear()
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = WebResultCache(os.path.join(self.cache_dir, 'web.db'), positive_ttl=60, negative_ttl=0.3)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def get_web_response(self, *args, **kwargs):
+        kwargs.setdefault('cache', False)
+        kwargs.setdefault('site_index', False)
+        return _get_web_response(*args, learn=False, **kwargs)
+
+    def provider(self, path, name=None):
+        return SearchProvider(name or path, f"Stub {path}", f"[{path}] ", 0.2, url=f"{self.base_url}/{path}")
+
+    def test_preferred_result_does_not_wait_for_slower_fallback(self):
+        start = time.monotonic()
+        response = self.get_web_response("horaires", 0.1, providers=[self.provider('fast'), self.provider('slow')])
+        elapsed = time.monotonic() - start
+        self.assertIsNotNone(response)
+        self.assertEqual(response['source'], "Stub fast")
+        self.assertTrue(response['answer'].startswith("[fast] Réponse fast"))
+        self.assertLess(elapsed, 1.0)
+
+    def test_preferred_provider_beats_faster_fallback(self):
+        # Le site de l'ISET passe avant Google, même quand Google répond en premier
+        response = self.get_web_response("horaires", 0.1, providers=[self.provider('slow'), self.provider('fast')])
+        self.assertEqual(response['source'], "Stub slow")
+
+    def test_fallback_is_used_at_the_deadline(self):
+        start = time.monotonic()
+        response = self.get_web_response("horaires", 0.1, providers=[self.provider('slow'), self.provider('fast')],
+                                         deadline=0.5)
+        self.assertEqual(response['source'], "Stub fast")
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    def test_cached_fallback_waits_for_preferred_provider(self):
+        self.cache.put('fast', "horaires", [{'title': "T", 'link': "http://x", 'snippet': "en cache", 'source': "Stub fast"}])
+        response = self.get_web_response("horaires", 0.1, providers=[self.provider('empty'), self.provider('fast')],
+                                         cache=self.cache)
+        self.assertEqual(response['answer'], "[fast] en cache")
+        self.assertEqual([path for path, _ in self.server.requests], ['/empty'])
+
+    def test_google_response_keeps_its_label(self):
+        self.assertEqual(web_search.GOOGLE_PROVIDER.response_source, "Recherche Google")
+        self.assertEqual(web_search.GOOGLE_PROVIDER.source, "Google")
+
+    def test_empty_result_falls_through_to_next_provider(self):
+        response = self.get_web_response("horaires", 0.1, providers=[self.provider('empty'), self.provider('fast')])
+        self.assertEqual(response['source'], "Stub fast")
+
+    def test_overall_deadline(self):
+        start = time.monotonic()
+        response = self.get_web_response("horaires", 0.1, providers=[self.provider('slow'), self.provider('slow', 'slow2')],
+                                    deadline=0.5)
+        self.assertIsNone(response)
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    def test_high_confidence_skips_search(self):
+        self.assertIsNone(self.get_web_response("horaires", 0.8, providers=[self.provider('fast')]))
+        self.assertEqual(self.server.requests, [])
+
+    def test_disabled_search_makes_no_request(self):
+        with mock.patch.object(web_search, 'WEB_SEARCH_ENABLED', False):
+            self.assertIsNone(self.get_web_response("horaires", 0.1, providers=[self.provider('fast')]))
+        self.assertEqual(self.server.requests, [])
+
+    def test_circuit_breaker_skips_failing_provider(self):
+        failing = self.provider('error')
+        failing.breaker.cooldown = 0.3
+        for _ in range(failing.breaker.failures):
+            self.assertIsNone(self.get_web_response("horaires", 0.1, providers=[failing]))
+        self.assertEqual(failing.breaker.state, 'open')
+        calls = len(self.server.requests)
+        self.assertIsNone(self.get_web_response("horaires", 0.1, providers=[failing]))
+        self.assertEqual(len(self.server.requests), calls)  # Aucun appel pendant l'ouverture
+        time.sleep(0.35)
+        self.assertEqual(failing.breaker.state, 'half-open')
+        self.get_web_response("horaires", 0.1, providers=[failing])
+        self.assertEqual(len(self.server.requests), calls + 1)  # Une requête d'essai
+        self.assertEqual(failing.breaker.state, 'open')
+
+    def test_breaker_closes_after_success(self):
+        provider = self.provider('fast')
+        provider.breaker.record_failure()
+        provider.breaker.record_failure()
+        self.assertIsNotNone(self.get_web_response("horaires", 0.1, providers=[provider]))
+        self.assertEqual(provider.breaker.state, 'closed')
+        self.assertEqual(provider.breaker._consecutive, 0)
+
+    def test_connections_are_reused(self):
+        provider = self.provider('fast')
+        for _ in range(5):
+            self.assertIsNotNone(self.get_web_response("horaires", 0.1, providers=[provider]))
+        ports = {port for _, port in self.server.requests}
+        self.assertLess(len(ports), 5)
+
+    def test_cached_result_avoids_upstream_call(self):
+        provider = self.provider('fast')
+        first = self.get_web_response("Quel temps fait-il ?", 0.1, providers=[provider], cache=self.cache)
+        second = self.get_web_response("quel  temps fait-il", 0.1, providers=[provider], cache=self.cache)
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.server.requests), 1)
+        stats = self.cache.stats()
+        self.assertEqual(stats['upstream_calls_avoided'], 1)
+        self.assertEqual(stats['hit_ratio'], 0.5)
+
+    def test_negative_result_expires_quickly(self):
+        provider = self.provider('empty')
+        for _ in range(3):
+            self.assertIsNone(self.get_web_response("introuvable", 0.1, providers=[provider], cache=self.cache))
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.cache.stats()['negative_hits'], 2)
+        time.sleep(0.35)
+        self.get_web_response("introuvable", 0.1, providers=[provider], cache=self.cache)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_errors_are_not_cached(self):
+        provider = self.provider('error')
+        self.get_web_response("panne", 0.1, providers=[provider], cache=self.cache)
+        self.assertIsNone(self.cache.get(provider.name, "panne"))
+
+    def test_cache_is_shared_across_instances_and_bounded(self):
+        other = WebResultCache(self.cache.path, max_entries=3)
+        for i in range(5):
+            other.put('fast', f"question {i}", [{'snippet': str(i)}])
+        self.assertEqual(other.stats()['entries'], 3)
+        self.assertEqual(self.cache.get('fast', "Question 4"), [{'snippet': '4'}])
+        self.assertIsNone(self.cache.get('fast', "question 0"))
+
+    def test_concurrent_identical_questions_share_one_search(self):
+        provider = self.provider('slow')
+        responses = []
+        threads = [threading.Thread(target=lambda: responses.append(
+            self.get_web_response("Annonce des examens ?", 0.1, providers=[provider], cache=self.cache)))
+            for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(len(responses), 5)
+        self.assertTrue(all(r == responses[0] and r is not None for r in responses))
+
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("  Où est   l'ÉCOLE ? "), "ou est l ecole")
+
+class LearnedAnswerWriterTest(unittest.TestCase):
+    HEADER = "Question,Réponse,Lien,Catégorie,Rating,Processed_Question\n"
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.data_dir, web_search.LEARNED_FILE)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(self.HEADER)
+            f.write("Quand commence le semestre ?,Le semestre commence le 1er septembre.,http://iset,Horaires,0,quand\n")
+        patcher = mock.patch.object(web_search, 'get_data_dir', return_value=self.data_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.writer = web_search.LearnedAnswerWriter(flush_interval=60)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def row(self, question, answer):
+        return {'Question': question, 'Réponse': answer, 'Lien': 'http://iset', 'Catégorie': 'Auto-apprentissage',
+                'Rating': 0, 'Source': 'Google', 'Date_Ajout': '2024-01-01 00:00:00', 'response_id': question}
+
+    def rows(self):
+        return web_search.pd.read_csv(self.path)
+
+    def test_add_does_not_touch_the_file_until_flush(self):
+        with open(self.path, 'rb') as f:
+            before = f.read()
+        self.writer.add(self.row("Où est la bibliothèque ?", "La bibliothèque est au bloc B."))
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual(self.writer.flush(), 1)
+        self.assertEqual(self.rows()['Question'].tolist()[-1], "Où est la bibliothèque ?")
+
+    def test_near_duplicates_are_skipped(self):
+        self.writer.add(self.row("Quand commence le semestre ?", "Le semestre commence le 1er septembre."))
+        self.writer.add(self.row("Où est la bibliothèque ?", "La bibliothèque est au bloc B."))
+        self.writer.add(self.row("Où est la bibliothèque ?", "La bibliothèque est au bloc B."))
+        self.assertEqual(self.writer.flush(), 1)
+        self.assertEqual(len(self.rows()), 2)
+
+    def test_new_columns_are_written_once_then_rows_are_appended(self):
+        self.writer.add(self.row("Où est la bibliothèque ?", "La bibliothèque est au bloc B."))
+        self.writer.flush()
+        self.assertIn('response_id', self.rows().columns)
+        with open(self.path, 'rb') as f:
+            header = f.readline()
+        self.writer.add(self.row("Comment payer les frais ?", "Les frais se paient à la scolarité."))
+        self.writer.flush()
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.readline(), header)
+        rows = self.rows()
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows['response_id'].tolist()[-1], "Comment payer les frais ?")
+
+    def test_external_change_rebuilds_the_index(self):
+        self.writer.add(self.row("Où est la bibliothèque ?", "La bibliothèque est au bloc B."))
+        self.writer.flush()
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(self.HEADER)  # Fichier réécrit par ailleurs : la paire n'y figure plus
+        self.writer.add(self.row("Où est la bibliothèque ?", "La bibliothèque est au bloc B."))
+        self.assertEqual(self.writer.flush(), 1)
+        self.assertEqual(len(self.rows()), 1)
+
+    def test_auto_learn_queues_on_the_shared_writer(self):
+        with mock.patch.object(web_search, '_learn_writer', self.writer):
+            web_search.auto_learn("Où est la bibliothèque ?", "La bibliothèque est au bloc B.", 'Google', 'http://iset')
+            self.assertEqual(self.writer.flush(), 1)
+        self.assertEqual(self.rows()['Catégorie'].tolist()[-1], 'Auto-apprentissage')
+
+if __name__ == '__main__':
+    unittest.main()